@@ -0,0 +1,126 @@
+"""
+Compares object detection backends on a folder of local images.
+
+The PyTorch model at 640px (the assistant's original path) is the reference.
+Every other configuration is scored against its detections, so no labelled
+dataset is needed: mAP@0.5 here measures agreement with the reference, not
+accuracy against ground truth.
+
+Usage:
+    python -m benchmarks.detection_benchmark path/to/images --backends pytorch onnx openvino --imgsz 320 640 --int8
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+import cv2
+from src.object_detection import ObjectDetector
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+def box_iou(a, b):
+    """Intersection over union of two (x1, y1, x2, y2) boxes."""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+def mean_average_precision(reference, candidate, iou_threshold=0.5):
+    """
+    Scores candidate detections against reference detections, image by image.
+    :param reference: A list (one entry per image) of lists of Detections used as ground truth.
+    :param candidate: A list of lists of Detections from the configuration being tested.
+    :return: The mean over classes of the all-point interpolated average precision.
+    """
+    classes = {d.name for image in reference for d in image}
+    if not classes:
+        return 1.0 if not any(candidate) else 0.0
+
+    average_precisions = []
+    for name in classes:
+        truths = [[d for d in image if d.name == name] for image in reference]
+        total = sum(len(t) for t in truths)
+        predictions = sorted(
+            ((d, i) for i, image in enumerate(candidate) for d in image if d.name == name),
+            key=lambda item: item[0].confidence, reverse=True)
+        matched = [set() for _ in truths]
+        hits = []
+        for detection, image_index in predictions:
+            best, best_iou = None, iou_threshold
+            for j, truth in enumerate(truths[image_index]):
+                iou = box_iou(detection.box, truth.box)
+                if j not in matched[image_index] and iou >= best_iou:
+                    best, best_iou = j, iou
+            if best is not None: matched[image_index].add(best)
+            hits.append(best is not None)
+
+        # Precision/recall curve, then area under its monotone envelope
+        precisions, recalls, tp = [], [], 0
+        for rank, hit in enumerate(hits, start=1):
+            tp += hit
+            precisions.append(tp / rank)
+            recalls.append(tp / total)
+        for k in range(len(precisions) - 2, -1, -1):
+            precisions[k] = max(precisions[k], precisions[k + 1])
+        ap, previous_recall = 0.0, 0.0
+        for precision, recall in zip(precisions, recalls):
+            ap += (recall - previous_recall) * precision
+            previous_recall = recall
+        average_precisions.append(ap)
+    return sum(average_precisions) / len(average_precisions)
+
+def load_images(folder):
+    """Loads every image in a folder, sorted by filename."""
+    paths = sorted(p for p in glob.glob(os.path.join(folder, "*")) if p.lower().endswith(IMAGE_EXTENSIONS))
+    images = [cv2.imread(p) for p in paths]
+    return [image for image in images if image is not None]
+
+def run_detector(detector, images, warmup=2):
+    """Runs a detector over all images, returning per-image latencies (ms) and detections."""
+    for image in images[:warmup]:
+        detector.detect(image)
+    latencies, detections = [], []
+    for image in images:
+        start = time.perf_counter()
+        detections.append(detector.detect(image))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, detections
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark YOLO detection backends on local images.")
+    parser.add_argument("images", help="Folder of .jpg/.png images to run detection on.")
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--backends", nargs="+", default=["pytorch", "onnx", "openvino"])
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[640, 320])
+    parser.add_argument("--int8", action="store_true", help="Also benchmark int8-quantized exports.")
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+    if not images:
+        print(f"No images found in '{args.images}'.")
+        return
+    print(f"Loaded {len(images)} images.")
+
+    reference = ObjectDetector(args.model, backend="pytorch", imgsz=640)
+    _, reference_detections = run_detector(reference, images)
+
+    configurations = [(backend, imgsz, False) for backend in args.backends for imgsz in args.imgsz]
+    if args.int8:
+        configurations += [(backend, imgsz, True) for backend in args.backends if backend != "pytorch" for imgsz in args.imgsz]
+
+    print(f"{'backend':<10}{'imgsz':>6}{'int8':>6}{'mean ms':>10}{'p95 ms':>10}{'mAP@0.5':>10}")
+    for backend, imgsz, int8 in configurations:
+        try:
+            detector = ObjectDetector(args.model, backend=backend, imgsz=imgsz, int8=int8)
+        except Exception as e:
+            print(f"{backend:<10}{imgsz:>6}{str(int8):>6}  skipped: {e}")
+            continue
+        latencies, detections = run_detector(detector, images)
+        p95 = sorted(latencies)[max(0, int(len(latencies) * 0.95) - 1)]
+        score = mean_average_precision(reference_detections, detections)
+        print(f"{backend:<10}{imgsz:>6}{str(int8):>6}{statistics.mean(latencies):>10.1f}{p95:>10.1f}{score:>10.3f}")
+
+if __name__ == '__main__':
+    main()
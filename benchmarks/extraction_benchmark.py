@@ -0,0 +1,106 @@
+"""
+Compares the page text extractors on a corpus of saved HTML pages.
+
+"html.parser" is how get_page_content used to work: BeautifulSoup's pure-Python
+parser, then every <p> in <main>, <article> or <body>. "lxml" is
+html_extraction.extract_main_text. Each page is extracted --repeat times and
+the median is kept; the table shows time per page, throughput, and how much
+text came out.
+
+Without --corpus, synthetic pages of several sizes are generated: paragraphs
+of article text wrapped in a navigation bar, scripts, a sidebar, share
+buttons and a footer, the boilerplate words of which all start with "chrome".
+"leaked" counts those words in the output, i.e. boilerplate mistaken for text.
+
+Usage:
+    python -m benchmarks.extraction_benchmark --corpus saved_pages/
+    python -m benchmarks.extraction_benchmark --sizes 10 100 1000 --repeat 5 --json results.json
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+import numpy as np
+from bs4 import BeautifulSoup
+from src.html_extraction import extract_main_text
+
+WORDS = "the of and to in a is that for it as was with be by on not he this are or his from at which".split()
+
+def html_parser_text(html):
+    """The extraction get_page_content used before html_extraction."""
+    soup = BeautifulSoup(html, 'html.parser')
+    main_content = soup.find('main') or soup.find('article') or soup.find('body')
+    return ' '.join([p.get_text() for p in main_content.find_all('p')])
+
+EXTRACTORS = {"html.parser": html_parser_text, "lxml": extract_main_text}
+
+def synthetic_page(kilobytes, seed=0):
+    """A page of about the given size: article paragraphs among the usual boilerplate."""
+    rng = np.random.default_rng(seed)
+    def chrome(count):
+        return " ".join(f"chrome{i}" for i in rng.integers(0, 1000, count))
+    head = (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{chrome(3)}</title>"
+            f"<script>var tracking = '{chrome(200)}';</script><style>.ad {{ color: red; }}</style></head><body>"
+            f"<header><p>{chrome(5)}</p></header><nav><ul>{''.join(f'<li><a href=#>{chrome(1)}</a></li>' for _ in range(30))}</ul></nav>"
+            f"<div class='page'><div class='sidebar'><p>{chrome(50)}</p></div><div id='content'>")
+    tail = (f"<div class='share-buttons'><p>{chrome(10)}</p></div></div></div>"
+            f"<footer><p>{chrome(40)}</p></footer><script>{chrome(100)}</script></body></html>")
+    paragraphs, size = [], len(head) + len(tail)
+    while size < kilobytes * 1024:
+        words = rng.choice(WORDS, int(rng.integers(40, 120)))
+        paragraph = f"<p>{' '.join(words)}.</p>\n"
+        paragraphs.append(paragraph)
+        size += len(paragraph)
+    return (head + "".join(paragraphs) + tail).encode("utf-8")
+
+def load_corpus(directory):
+    """:return: (name, bytes) for every .html and .htm file in the directory."""
+    paths = sorted(glob.glob(os.path.join(directory, "*.html")) + glob.glob(os.path.join(directory, "*.htm")))
+    pages = []
+    for path in paths:
+        with open(path, "rb") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+def run_benchmark(pages, repeat=3):
+    """:param pages: (name, bytes) pairs. :return: One row per page and extractor."""
+    results = []
+    for name, html in pages:
+        for extractor, extract in EXTRACTORS.items():
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                text = extract(html)
+                times.append(time.perf_counter() - start)
+            elapsed = statistics.median(times)
+            results.append({"page": name, "extractor": extractor, "kilobytes": len(html) / 1024, "ms": elapsed * 1000,
+                            "mb_per_second": len(html) / 2**20 / elapsed, "text_chars": len(text),
+                            "leaked": sum(word.startswith("chrome") for word in text.split())})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML text extraction.")
+    parser.add_argument("--corpus", help="A folder of saved .html pages; synthetic pages by default.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000, 5000],
+                        help="Sizes in KB of the synthetic pages.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    if args.corpus:
+        pages = load_corpus(args.corpus)
+    else:
+        pages = [(f"synthetic-{size}KB", synthetic_page(size, seed=size)) for size in args.sizes]
+    results = run_benchmark(pages, args.repeat)
+    print(f"{'page':<24}{'extractor':>12}{'KB':>10}{'ms':>10}{'MB/s':>8}{'text chars':>12}{'leaked':>8}")
+    for row in results:
+        print(f"{row['page'][:23]:<24}{row['extractor']:>12}{row['kilobytes']:>10.0f}{row['ms']:>10.1f}"
+              f"{row['mb_per_second']:>8.1f}{row['text_chars']:>12}{row['leaked']:>8}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == '__main__':
+    main()
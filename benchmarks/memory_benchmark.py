@@ -0,0 +1,162 @@
+"""
+Measures memory search recall, latency and size on synthetic embeddings.
+
+A million clustered vectors stand in for a long-lived memory. Exact float32
+(flat) search is the reference; every other index - 8-bit scalar quantized,
+the IVF index the memory switches to with and without quantization, and HNSW
+for comparison - is scored against it. Recall@k is the fraction of the exact
+top-k that each index also returns. Bytes per entry is the size of the saved
+index divided by its entries. Eviction cost is the time to remove a tenth of
+the entries. Text storage compares the entry arena with Python dicts.
+
+Usage:
+    python -m benchmarks.memory_benchmark --entries 1000000 --dim 384
+    python -m benchmarks.memory_benchmark --entries 200000 --json results.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import faiss
+import numpy as np
+from src.memory_arena import EntryArena
+from src.memory_manager import build_ivf_index, new_flat_index
+
+WORDS = ("open", "chrome", "what", "is", "the", "weather", "like", "in", "paris", "remind", "me", "to",
+         "call", "mum", "tomorrow", "play", "some", "music", "yes", "no", "thanks", "how", "are", "you")
+
+def synthetic_embeddings(count, dimension, clusters=1000, seed=0):
+    """Unit vectors scattered around random topic centres, like sentence embeddings of many conversations."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dimension)).astype('float32')
+    vectors = centres[rng.integers(0, clusters, count)] + 0.6 * rng.standard_normal((count, dimension)).astype('float32')
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+def synthetic_texts(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [("User: " if i % 2 == 0 else "Nora: ") + " ".join(rng.choice(WORDS, rng.integers(1, 12)))
+            for i in range(count)]
+
+def recall_at_k(reference, candidate):
+    """The mean fraction of each query's reference neighbours that the candidate also found."""
+    hits = [len(set(r) & set(c)) / len(r) for r, c in zip(reference, candidate)]
+    return float(np.mean(hits))
+
+def time_search(index, queries, k):
+    """Searches one query at a time, as the assistant does. :return: (ids, mean ms, p95 ms)"""
+    results, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        timings.append((time.perf_counter() - start) * 1000)
+        results.append(ids[0])
+    return np.array(results), float(np.mean(timings)), float(np.percentile(timings, 95))
+
+def time_eviction(index, ids, fraction=0.1):
+    start = time.perf_counter()
+    index.remove_ids(ids[:int(len(ids) * fraction)])
+    return (time.perf_counter() - start) * 1000
+
+def bytes_per_entry(index):
+    """Saves the index to a temporary file rather than serializing it in RAM next to the original."""
+    handle, path = tempfile.mkstemp(suffix=".faiss")
+    os.close(handle)
+    try:
+        faiss.write_index(index, path)
+        return os.path.getsize(path) / index.ntotal
+    finally:
+        os.remove(path)
+
+def text_storage(count):
+    """:return: Bytes per entry holding count texts as dicts of Python objects and in the entry arena."""
+    sizes = {}
+    for name in ("dicts", "arena"):
+        tracemalloc.start()
+        texts = synthetic_texts(count)
+        if name == "dicts":
+            held = {i: {"id": i, "text": text, "time": time.time(), "importance": 1.0} for i, text in enumerate(texts)}
+        else:
+            held = EntryArena()
+            for i, text in enumerate(texts):
+                held.append(i, text, time.time())
+        del texts
+        sizes[name] = tracemalloc.get_traced_memory()[0] / count
+        tracemalloc.stop()
+        del held
+    return sizes
+
+def run_benchmark(entries, dimension, queries=200, k=10, nprobes=(1, 4, 16, 64), ef_searches=(16, 64, 128),
+                  quantizations=(None, "sq8", "pq"), text_entries=100000):
+    vectors = synthetic_embeddings(entries, dimension)
+    ids = np.arange(entries, dtype='int64')
+    # Queries are perturbed copies of stored memories, like a rephrased question
+    rng = np.random.default_rng(1)
+    query_vectors = vectors[rng.choice(entries, queries, replace=False)] + 0.05 * rng.standard_normal((queries, dimension)).astype('float32')
+    results = {"entries": entries, "dimension": dimension, "k": k, "indexes": [], "text_bytes_per_entry": text_storage(text_entries)}
+    reference = None
+
+    for quantization in (None, "sq8"):
+        start = time.perf_counter()
+        flat = new_flat_index(dimension, quantization)
+        flat.add_with_ids(vectors, ids)
+        build = time.perf_counter() - start
+        found, mean_ms, p95_ms = time_search(flat, query_vectors, k)
+        reference = found if reference is None else reference
+        results["indexes"].append({"index": f"flat {quantization or 'f32'}", "build_s": build, "bytes_per_entry": bytes_per_entry(flat),
+                                   "recall": recall_at_k(reference, found), "mean_ms": mean_ms, "p95_ms": p95_ms,
+                                   "evict_ms": time_eviction(flat, ids)})
+        del flat
+
+    for quantization in quantizations:
+        start = time.perf_counter()
+        ivf = build_ivf_index(vectors, ids, quantization)
+        build = time.perf_counter() - start
+        size = bytes_per_entry(ivf)
+        for nprobe in nprobes:
+            ivf.nprobe = nprobe
+            found, mean_ms, p95_ms = time_search(ivf, query_vectors, k)
+            results["indexes"].append({"index": f"ivf{ivf.nlist} {quantization or 'f32'} nprobe={nprobe}", "build_s": build,
+                                       "bytes_per_entry": size, "recall": recall_at_k(reference, found),
+                                       "mean_ms": mean_ms, "p95_ms": p95_ms})
+        results["indexes"][-1]["evict_ms"] = time_eviction(ivf, ids)
+        del ivf
+
+    start = time.perf_counter()
+    hnsw = faiss.IndexHNSWFlat(dimension, 32)
+    hnsw.add(vectors)
+    build = time.perf_counter() - start
+    size = bytes_per_entry(hnsw)
+    for ef_search in ef_searches:
+        hnsw.hnsw.efSearch = ef_search
+        found, mean_ms, p95_ms = time_search(hnsw, query_vectors, k)
+        results["indexes"].append({"index": f"hnsw32 f32 ef={ef_search}", "build_s": build, "bytes_per_entry": size,
+                                   "recall": recall_at_k(reference, found), "mean_ms": mean_ms, "p95_ms": p95_ms})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memory index recall, latency and size on synthetic data.")
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--dim", type=int, default=384, help="Embedding size (all-MiniLM-L6-v2 is 384).")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.entries, args.dim, args.queries, args.k)
+    print(f"{results['entries']} entries, {results['dimension']} dims, recall@{results['k']} against exact float32 search")
+    print(f"{'index':<30}{'build s':>9}{'B/entry':>9}{'recall':>8}{'mean ms':>9}{'p95 ms':>9}{'evict 10% ms':>14}")
+    for row in results["indexes"]:
+        evict = f"{row['evict_ms']:.0f}" if "evict_ms" in row else "-"
+        print(f"{row['index']:<30}{row['build_s']:>9.1f}{row['bytes_per_entry']:>9.0f}{row['recall']:>8.3f}"
+              f"{row['mean_ms']:>9.2f}{row['p95_ms']:>9.2f}{evict:>14}")
+    text = results["text_bytes_per_entry"]
+    print(f"Text and metadata: {text['dicts']:.0f} B/entry as dicts, {text['arena']:.0f} B/entry in the arena")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == '__main__':
+    main()
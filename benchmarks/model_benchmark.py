@@ -0,0 +1,148 @@
+"""
+Compares the chitchat and summarization models as float32 and with dynamic int8 quantization.
+
+The float32 model is the reference. For each optimization and thread count,
+the same prompts are decoded greedily to a fixed length, and the output is
+compared token by token with the reference's: similarity is the mean
+difflib ratio between the two token sequences, exact the fraction that
+match outright. Size is the serialized weights; RSS is how much the process
+grew while the model was prepared.
+
+--random-weights builds the same architectures untrained from their configs,
+with random prompts, for machines that can't download the models. Latency
+and size are still representative; similarity then only shows how far
+quantization noise moves an untrained model.
+
+Usage:
+    python -m benchmarks.model_benchmark --models chitchat summarization --threads 1 4
+    python -m benchmarks.model_benchmark --random-weights --prompts 5 --json results.json
+"""
+import argparse
+import copy
+import difflib
+import io
+import json
+import statistics
+import time
+import psutil
+import torch
+from transformers import (AutoModelForCausalLM, AutoModelForSeq2SeqLM, AutoTokenizer, BartConfig,
+                          BartForConditionalGeneration, GPT2Config, GPT2LMHeadModel)
+from src.model_optimization import OPTIMIZATIONS, configure_threads, optimize_model
+
+MODELS = {
+    "chitchat": ("microsoft/DialoGPT-small", AutoModelForCausalLM),
+    "summarization": ("sshleifer/distilbart-cnn-12-6", AutoModelForSeq2SeqLM),
+}
+PROMPTS = {
+    "chitchat": ["Hi, how are you today?", "What do you like to do at the weekend?", "Can you recommend a good book?",
+                 "I'm feeling a bit tired.", "Tell me something interesting about space."],
+    "summarization": [("The city council met on Tuesday to discuss the new transport plan. Officials said bus routes "
+                       "would be extended to the northern suburbs, and that cycling lanes would be added along the "
+                       "river. Residents raised concerns about the cost, which is expected to exceed forty million "
+                       "pounds over five years. The council will vote on the plan next month. ") * 4],
+}
+
+def untrained_model(name):
+    """The architecture of each model, built from its published config without downloading weights."""
+    torch.manual_seed(0)
+    if name == "chitchat":
+        return GPT2LMHeadModel(GPT2Config(vocab_size=50257, n_positions=1024))
+    return BartForConditionalGeneration(BartConfig(vocab_size=50264, d_model=1024, encoder_layers=12, decoder_layers=6,
+                                                   encoder_attention_heads=16, decoder_attention_heads=16,
+                                                   encoder_ffn_dim=4096, decoder_ffn_dim=4096))
+
+def load(name, random_weights=False):
+    """:return: (tokenizer or None, float32 model)"""
+    if random_weights:
+        return None, untrained_model(name)
+    model_name, model_class = MODELS[name]
+    return AutoTokenizer.from_pretrained(model_name), model_class.from_pretrained(model_name)
+
+def encode_prompts(name, tokenizer, count, vocab_size):
+    if tokenizer is None:
+        generator = torch.Generator().manual_seed(1)
+        length = 16 if name == "chitchat" else 400
+        return [torch.randint(3, vocab_size, (1, length), generator=generator) for _ in range(count)]
+    texts = (PROMPTS[name] * count)[:count]
+    if name == "chitchat":
+        return [torch.tensor([tokenizer.encode(text) + [tokenizer.eos_token_id]]) for text in texts]
+    return [tokenizer(text, truncation=True, return_tensors="pt")["input_ids"] for text in texts]
+
+def serialized_size(model):
+    """Bytes of the saved weights, which includes the packed int8 ones that parameters() doesn't list."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+def rss():
+    return psutil.Process().memory_info().rss
+
+@torch.inference_mode()
+def generate(model, prompts, new_tokens):
+    """Greedily decodes exactly new_tokens per prompt. :return: (outputs, per-prompt seconds)"""
+    outputs, timings = [], []
+    for input_ids in prompts:
+        start = time.perf_counter()
+        output = model.generate(input_ids, attention_mask=torch.ones_like(input_ids), max_new_tokens=new_tokens,
+                                min_new_tokens=new_tokens, do_sample=False, num_beams=1)
+        timings.append(time.perf_counter() - start)
+        outputs.append(output[0, input_ids.shape[1]:].tolist() if not model.config.is_encoder_decoder else output[0].tolist())
+    return outputs, timings
+
+def similarity(reference, candidate):
+    """:return: (mean difflib ratio, fraction of identical outputs)"""
+    ratios = [difflib.SequenceMatcher(None, r, c).ratio() for r, c in zip(reference, candidate)]
+    return statistics.mean(ratios), sum(r == c for r, c in zip(reference, candidate)) / len(reference)
+
+def run_benchmark(names=("chitchat", "summarization"), optimizations=OPTIMIZATIONS, threads=(None,), prompts=5,
+                  new_tokens=32, random_weights=False):
+    results = []
+    for name in names:
+        tokenizer, base = load(name, random_weights)
+        inputs = encode_prompts(name, tokenizer, prompts, base.config.vocab_size)
+        reference = None
+        for optimization in optimizations:
+            before = rss()
+            start = time.perf_counter()
+            model = optimize_model(copy.deepcopy(base), optimization)
+            prepare = time.perf_counter() - start
+            grown = rss() - before
+            size = serialized_size(model)
+            for thread_count in threads:
+                if thread_count:
+                    configure_threads(thread_count)
+                generate(model, inputs[:1], 2) # Warm up
+                outputs, timings = generate(model, inputs, new_tokens)
+                reference = outputs if reference is None else reference
+                ratio, exact = similarity(reference, outputs)
+                results.append({"model": name, "optimization": optimization or "float32", "threads": torch.get_num_threads(),
+                                "prepare_s": prepare, "size_mb": size / 2**20, "rss_mb": grown / 2**20,
+                                "mean_ms": statistics.mean(timings) * 1000, "p95_ms": sorted(timings)[int(0.95 * (len(timings) - 1))] * 1000,
+                                "ms_per_token": statistics.mean(timings) * 1000 / new_tokens,
+                                "similarity": ratio, "exact": exact})
+            del model
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark float32 against int8 chitchat and summarization models.")
+    parser.add_argument("--models", nargs="+", default=list(MODELS), choices=list(MODELS))
+    parser.add_argument("--threads", nargs="+", type=int, default=[None], help="Intra-op thread counts to try.")
+    parser.add_argument("--prompts", type=int, default=5)
+    parser.add_argument("--new-tokens", type=int, default=32)
+    parser.add_argument("--random-weights", action="store_true", help="Use untrained models instead of downloading them.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.models, threads=args.threads, prompts=args.prompts, new_tokens=args.new_tokens,
+                            random_weights=args.random_weights)
+    print(f"{'model':<15}{'mode':<9}{'threads':>8}{'size MB':>9}{'RSS MB':>8}{'mean ms':>9}{'p95 ms':>9}{'ms/tok':>8}{'similar':>9}{'exact':>7}")
+    for row in results:
+        print(f"{row['model']:<15}{row['optimization']:<9}{row['threads']:>8}{row['size_mb']:>9.0f}{row['rss_mb']:>8.0f}"
+              f"{row['mean_ms']:>9.0f}{row['p95_ms']:>9.0f}{row['ms_per_token']:>8.1f}{row['similarity']:>9.3f}{row['exact']:>7.2f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Measures summarization throughput on long inputs.
+
+Synthetic documents of 1k, 10k and 100k words are summarized end to end: split
+into sentence-aligned chunks, summarized in batches, and reduced level by level
+to one summary. Throughput is input words per second; the table also shows how
+many chunks the document made and how many generate() calls that took.
+The extractive summary of the same document is timed alongside.
+
+--random-weights builds distilbart's architecture untrained, with a word-level
+tokenizer over a synthetic vocabulary, for machines that can't download the
+model. Its eos embedding is blanked so that, like the trained model on long
+input, it writes summaries of full length rather than stopping at once.
+
+Usage:
+    python -m benchmarks.summarization_benchmark --words 1000 10000 100000
+    python -m benchmarks.summarization_benchmark --random-weights --optimization int8 --num-beams 1 --json results.json
+"""
+import argparse
+import json
+import time
+import numpy as np
+import torch
+from tokenizers import Tokenizer, models, pre_tokenizers, processors
+from transformers import PreTrainedTokenizerFast
+from benchmarks.model_benchmark import untrained_model
+from src.summarizer import Summarizer, extractive_summary, split_sentences
+
+SPECIAL_TOKENS = ["<s>", "<pad>", "</s>", "<unk>"]
+
+def synthetic_document(words, vocabulary, seed=0):
+    """Sentences of 8 to 30 words drawn from the vocabulary, each ending in a full stop."""
+    rng = np.random.default_rng(seed)
+    sentences, total = [], 0
+    while total < words:
+        length = min(int(rng.integers(8, 31)), words - total)
+        sentences.append(" ".join(rng.choice(vocabulary, length)) + ".")
+        total += length
+    return " ".join(sentences)
+
+def word_tokenizer(vocab_size, max_length=1024):
+    """A fast tokenizer with one token per synthetic word, sized to match the model's vocabulary."""
+    words = [f"w{i}" for i in range((vocab_size - len(SPECIAL_TOKENS)) // 2)]
+    vocab = {token: i for i, token in enumerate(SPECIAL_TOKENS + words + [word + "." for word in words])}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+    tokenizer.post_processor = processors.TemplateProcessing(single="<s> $A </s>", special_tokens=[("<s>", 0), ("</s>", 2)])
+    fast = PreTrainedTokenizerFast(tokenizer_object=tokenizer, bos_token="<s>", pad_token="<pad>", eos_token="</s>",
+                                   unk_token="<unk>", model_max_length=max_length)
+    return fast, words
+
+def make_summarizer(optimization, batch_size, num_beams, random_weights):
+    if not random_weights:
+        summarizer = Summarizer(optimization=optimization, batch_size=batch_size, num_beams=num_beams)
+        summarizer._load()
+        return summarizer, None
+    model = untrained_model("summarization")
+    with torch.no_grad():
+        model.model.shared.weight[model.config.eos_token_id].zero_()
+    tokenizer, words = word_tokenizer(model.config.vocab_size)
+    return Summarizer(optimization=optimization, batch_size=batch_size, num_beams=num_beams, model=model, tokenizer=tokenizer), words
+
+class CallCounter:
+    """Wraps generate() to count calls."""
+    def __init__(self, model):
+        self.calls = 0
+        self._generate = model.generate
+        model.generate = self
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self._generate(*args, **kwargs)
+
+def run_benchmark(word_counts=(1000, 10000, 100000), optimization=None, batch_size=4, num_beams=None,
+                  max_length=150, min_length=50, random_weights=False):
+    summarizer, vocabulary = make_summarizer(optimization, batch_size, num_beams, random_weights)
+    if vocabulary is None:
+        vocabulary = "the of and to in a is that for it as was with be by on not he this are or his from at which".split()
+    counter = CallCounter(summarizer.model)
+    results = []
+    for words in word_counts:
+        document = synthetic_document(words, vocabulary)
+        chunks = len(summarizer._chunks(split_sentences(document)))
+        counter.calls = 0
+        start = time.perf_counter()
+        summary = summarizer.summarize(document, max_length, min_length)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        extractive_summary(document)
+        extractive = time.perf_counter() - start
+        results.append({"words": words, "chunks": chunks, "generate_calls": counter.calls, "seconds": elapsed,
+                        "words_per_second": words / elapsed, "summary_words": len(summary.split()),
+                        "extractive_ms": extractive * 1000})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark summarization throughput on long documents.")
+    parser.add_argument("--words", nargs="+", type=int, default=[1000, 10000, 100000])
+    parser.add_argument("--optimization", choices=["int8"], help="Quantize the model (float32 by default).")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--num-beams", type=int, help="Beam width; the model's own by default.")
+    parser.add_argument("--max-length", type=int, default=150)
+    parser.add_argument("--min-length", type=int, default=50)
+    parser.add_argument("--random-weights", action="store_true", help="Use an untrained model instead of downloading it.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.words, args.optimization, args.batch_size, args.num_beams, args.max_length,
+                            args.min_length, args.random_weights)
+    print(f"{'words':>8}{'chunks':>8}{'generate calls':>16}{'seconds':>10}{'words/s':>10}{'extractive ms':>15}")
+    for row in results:
+        print(f"{row['words']:>8}{row['chunks']:>8}{row['generate_calls']:>16}{row['seconds']:>10.1f}{row['words_per_second']:>10.0f}"
+              f"{row['extractive_ms']:>15.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == '__main__':
+    main()
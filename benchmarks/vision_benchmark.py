@@ -0,0 +1,114 @@
+"""
+Replays a recorded clip (or a directory of images) through every vision task
+and reports per-task latency, CPU time, throughput and memory. No camera or
+display is needed, so it runs on a headless Linux box.
+
+Usage:
+    python -m benchmarks.vision_benchmark recording.mp4 --frames 300
+    python -m benchmarks.vision_benchmark path/to/images --json results.json
+"""
+import argparse
+import json
+import statistics
+import time
+import numpy as np
+import psutil
+from src.frame_source import open_frame_source
+from src.vision_system import VisionSystem
+
+def _detect_faces(vision, frame, state):
+    state["faces"] = vision.face_detector.detect(frame)
+
+# Task name -> callable(vision, frame, state). Recognition and emotion reuse
+# the faces found by face_detection, exactly as the live vision loop does.
+TASKS = {
+    "presence": lambda vision, frame, state: vision._process_presence(frame),
+    "face_detection": _detect_faces,
+    "recognition": lambda vision, frame, state: vision._process_recognition(state["faces"]),
+    "emotion": lambda vision, frame, state: vision._process_emotions(state["faces"]),
+    "gestures": lambda vision, frame, state: vision._process_gestures(frame),
+    "objects": lambda vision, frame, state: vision._process_object_detection(frame),
+}
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def run_benchmark(source, task_names, max_frames=None, warmup=3):
+    """
+    Runs each selected task on every frame of the source.
+    :return: A dict with per-task statistics and overall throughput and memory.
+    """
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    vision = VisionSystem()
+    if not vision.known_face_encodings:
+        # Give recognition something to compare against so its full path is timed
+        vision.known_face_encodings = [np.zeros(128)]
+        vision.known_face_names = ["benchmark"]
+
+    frames = open_frame_source(source)
+    if not frames.open():
+        raise SystemExit(f"Could not open '{source}'.")
+
+    wall = {name: [] for name in task_names}
+    cpu = {name: [] for name in task_names}
+    peak_rss = process.memory_info().rss
+    sequence, frame_count = 0, 0
+    start = time.perf_counter()
+    while max_frames is None or frame_count < max_frames + warmup:
+        frame, _, sequence = frames.wait_for_frame(sequence)
+        if frame is None:
+            break
+        if frame_count == warmup:
+            start = time.perf_counter()
+        state = {"faces": []}
+        if "face_detection" not in task_names and ("recognition" in task_names or "emotion" in task_names):
+            _detect_faces(vision, frame, state)
+        for name in task_names:
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            TASKS[name](vision, frame, state)
+            if frame_count >= warmup:
+                wall[name].append((time.perf_counter() - wall_start) * 1000)
+                cpu[name].append((time.process_time() - cpu_start) * 1000)
+        frame_count += 1
+        peak_rss = max(peak_rss, process.memory_info().rss)
+    elapsed = time.perf_counter() - start
+    frames.release()
+
+    measured = max(0, frame_count - warmup)
+    return {
+        "frames": measured,
+        "throughput_fps": measured / elapsed if measured and elapsed > 0 else 0.0,
+        "rss_before_mb": rss_before / 2**20,
+        "rss_peak_mb": peak_rss / 2**20,
+        "tasks": {
+            name: {
+                "mean_ms": statistics.mean(wall[name]),
+                "p95_ms": percentile(wall[name], 0.95),
+                "cpu_ms": statistics.mean(cpu[name]),
+            } for name in task_names if wall[name]
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vision tasks on a recorded clip.")
+    parser.add_argument("source", help="A video file or a directory of images.")
+    parser.add_argument("--tasks", nargs="+", choices=list(TASKS), default=list(TASKS))
+    parser.add_argument("--frames", type=int, default=None, help="Stop after this many measured frames.")
+    parser.add_argument("--warmup", type=int, default=3, help="Frames to run before measuring.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.source, args.tasks, args.frames, args.warmup)
+    print(f"Frames: {results['frames']}  Throughput: {results['throughput_fps']:.2f} frames/s (all tasks per frame)")
+    print(f"Memory: {results['rss_before_mb']:.0f} MB before models, {results['rss_peak_mb']:.0f} MB peak")
+    print(f"{'task':<16}{'mean ms':>10}{'p95 ms':>10}{'cpu ms':>10}")
+    for name, stats in results["tasks"].items():
+        print(f"{name:<16}{stats['mean_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['cpu_ms']:>10.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@ from src.plugin_interface import Plugin
 import os
 import shutil
 import glob
+from src import batch_ocr
 
 class FileManagerPlugin(Plugin):
     """
@@ -10,6 +11,7 @@ class FileManagerPlugin(Plugin):
     def get_intent_map(self):
         return {
             "find_files": self.handle,
+            "find_text_in_files": self.handle,
             "move_files": self.handle
         }
 
@@ -45,6 +47,23 @@ class FileManagerPlugin(Plugin):
 
         return files
 
+    def find_files_containing(self, assistant, text):
+        """Finds scanned images and PDFs whose OCR text contains the given words."""
+        store = batch_ocr.OCRTextStore()
+        try:
+            files = store.search(text)
+        finally:
+            store.close()
+
+        if not files:
+            assistant.speak(f"I couldn't find any scanned files containing '{text}'.")
+        else:
+            assistant.speak(f"I found {len(files)} files containing '{text}'. Here are the first 5:")
+            for f in files[:5]:
+                assistant.speak(os.path.basename(f))
+
+        return files
+
     def move_files(self, assistant, file_type, source_folder, dest_folder):
         """Moves files of a certain type from a source to a destination."""
         source_path = self._resolve_folder_path(source_folder)
@@ -74,6 +93,9 @@ class FileManagerPlugin(Plugin):
             folder = parts[1] if len(parts) > 1 else None
             self.find_files(assistant, file_type=file_type, folder=folder)
 
+        elif intent == "find_text_in_files":
+            self.find_files_containing(assistant, args)
+
         elif intent == "move_files":
             # Example args: "PDFs from Downloads to Documents"
             parts = args.split(" from ")
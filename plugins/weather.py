@@ -1,4 +1,3 @@
-import requests
 from src.plugin_interface import Plugin
 
 class WeatherPlugin(Plugin):
@@ -15,9 +14,9 @@ class WeatherPlugin(Plugin):
             assistant.speak("I'm sorry, I don't have a weather API key configured. Please add one to your config.json file.")
             return
 
-        url = f"https://api.openweathermap.org/data/2.5/weather?q={location}&appid={api_key}&units=metric"
+        url = "https://api.openweathermap.org/data/2.5/weather"
         try:
-            response = requests.get(url)
+            response = assistant.http.get(url, params={"q": location, "appid": api_key, "units": "metric"})
             data = response.json()
             if data["cod"] == 200:
                 weather_desc = data["weather"][0]["description"]
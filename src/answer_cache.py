@@ -0,0 +1,146 @@
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import wikipedia
+from .disk_cache import DiskCache
+from .summary_cache import normalize
+
+SNAPSHOT_FILE = "wikipedia_leads.db"
+LEADING_ARTICLE = re.compile(r"^(?:the|a|an)\s+")
+
+def title_key(text):
+    """A title or question as it is matched: normalized, case-folded, without punctuation or a leading article."""
+    text = re.sub(r"[^\w\s]", " ", normalize(text).casefold())
+    return LEADING_ARTICLE.sub("", " ".join(text.split()))
+
+class AnswerCache(DiskCache):
+    """
+    Wikipedia answers kept on disk by question, so a repeated question is
+    answered without a round trip. Questions Wikipedia has no page for are
+    remembered too, for a shorter time. Expired answers are kept until
+    evicted: when Wikipedia can't be reached, a stale answer beats none.
+    """
+    def __init__(self, directory="answer_cache", max_bytes=10 * 2**20, ttl=7 * 86400, negative_ttl=86400):
+        """
+        :param ttl: Seconds an answer is used before asking Wikipedia again.
+        :param negative_ttl: Seconds a question without a page is answered with None.
+        """
+        super().__init__(directory, max_bytes, suffix=".json")
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+    @staticmethod
+    def key(query):
+        """Questions differing only in case, punctuation or a leading article share a key."""
+        return hashlib.blake2b(title_key(query).encode("utf-8"), digest_size=20).hexdigest()
+
+    def get(self, key):
+        """:return: The entry, {"answer": str or None, "stored": time}, or None."""
+        data = super().get(key)
+        return json.loads(data) if data is not None else None
+
+    def put(self, key, answer):
+        """:param answer: The answer, or None for a question without a page."""
+        super().put(key, json.dumps({"answer": answer, "stored": time.time()}).encode("utf-8"))
+
+    def is_fresh(self, entry):
+        ttl = self.ttl if entry["answer"] is not None else self.negative_ttl
+        return time.time() - entry["stored"] < ttl
+
+class LeadSnapshot:
+    """
+    A local index of Wikipedia article leads, so popular questions are answered
+    offline in about a millisecond. Articles are found by title or by any of
+    their redirects, compared by title_key.
+    """
+    def __init__(self, db_file=SNAPSHOT_FILE):
+        self.db_file = db_file
+        self._lock = threading.Lock() # The connection is shared by the voice and GUI threads
+        self.connection = sqlite3.connect(db_file, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS leads (key TEXT PRIMARY KEY, title TEXT NOT NULL, summary TEXT NOT NULL)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS aliases (alias TEXT PRIMARY KEY, key TEXT NOT NULL)")
+        self.connection.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+
+    def _insert(self, title, summary, aliases):
+        key = title_key(title)
+        self.connection.execute("INSERT OR REPLACE INTO leads (key, title, summary) VALUES (?, ?, ?)", (key, title, summary))
+        self.connection.executemany("INSERT OR REPLACE INTO aliases (alias, key) VALUES (?, ?)",
+                                    [(title_key(alias), key) for alias in aliases])
+
+    def add(self, title, summary, aliases=()):
+        """
+        :param summary: The answer to give, e.g. the first sentences of the lead.
+        :param aliases: Other names the article is asked about by, such as its redirects.
+        """
+        with self._lock:
+            self._insert(title, summary, aliases)
+            self.connection.commit()
+
+    def lookup(self, query):
+        """:return: The lead of the article the query names, or None."""
+        key = title_key(query)
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT summary FROM leads WHERE key = ? UNION ALL "
+                "SELECT leads.summary FROM aliases JOIN leads ON leads.key = aliases.key WHERE aliases.alias = ? LIMIT 1",
+                (key, key)).fetchone()
+        return row[0] if row is not None else None
+
+    def import_jsonl(self, path):
+        """
+        Adds the articles of a JSON lines file, one {"title", "summary", "aliases"} object per line.
+        :return: How many were added.
+        """
+        count = 0
+        with open(path, encoding="utf-8") as f:
+            with self._lock:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    article = json.loads(line)
+                    self._insert(article["title"], article["summary"], article.get("aliases", ()))
+                    count += 1
+                self.connection.commit()
+        return count
+
+    def close(self):
+        self.connection.close()
+
+def fetch_leads(snapshot, titles, sentences=3):
+    """Downloads the leads of the given articles from Wikipedia into the snapshot. :return: How many were added."""
+    count = 0
+    for title in titles:
+        try:
+            snapshot.add(title, wikipedia.summary(title, sentences=sentences))
+            count += 1
+        except Exception as e:
+            print(f"Could not fetch '{title}': {e}")
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local snapshot of Wikipedia leads used for instant answers.")
+    parser.add_argument("--db", default=SNAPSHOT_FILE)
+    parser.add_argument("--jsonl", help="Import articles from a JSON lines file of {title, summary, aliases}.")
+    parser.add_argument("--titles", help="Download the leads of the articles listed in this file, one title per line.")
+    args = parser.parse_args()
+
+    snapshot = LeadSnapshot(args.db)
+    if args.jsonl:
+        print(f"Imported {snapshot.import_jsonl(args.jsonl)} articles.")
+    if args.titles:
+        with open(args.titles, encoding="utf-8") as f:
+            titles = [line.strip() for line in f if line.strip()]
+        print(f"Downloaded {fetch_leads(snapshot, titles)} of {len(titles)} articles.")
+    print(f"The snapshot holds {len(snapshot)} articles.")
+    snapshot.close()
+
+if __name__ == '__main__':
+    main()
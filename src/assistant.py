@@ -12,6 +12,7 @@ import struct
 import pyautogui
 import json
 import importlib.util
+import queue
 import threading
 import time
 import shutil
@@ -24,6 +25,13 @@ from . import task_planner
 from . import memory_manager
 from . import document_reader
 from . import llm_handler
+from . import batch_ocr
+from . import model_optimization
+from .summarizer import Summarizer, requested_mode
+from .summary_cache import SummaryCache
+from .answer_cache import AnswerCache, LeadSnapshot
+from .http_client import HttpClient
+from .text_stream import SentenceSplitter
 
 load_dotenv()
 
@@ -33,32 +41,105 @@ if sys.platform == "win32":
     import win32api
 
 class Assistant:
-    def __init__(self, output_callback=None, status_callback=None):
+    def __init__(self, output_callback=None, status_callback=None, stream_callback=None):
         # ... (most init is the same)
         self.config = self.load_config()
         self.assistant_name = self.config.get("assistant_name", "Nora")
         self.wake_word = self.config.get("wake_word", "porcupine")
         self.output_callback = output_callback
         self.status_callback = status_callback
+        self.stream_callback = stream_callback # Called with (piece, done) while a reply is generated
         self.apps = app_discovery.load_cached_apps()
         self.custom_commands = custom_commands.load_commands()
+        http_settings = self.config.get("http_settings", {})
+        self.http = HttpClient( # Shared by web lookups and plugins
+            cache_dir=http_settings.get("cache_dir", "http_cache"),
+            max_cache_bytes=http_settings.get("cache_size_mb", 100) * 2**20,
+            timeout=(http_settings.get("connect_timeout", 3.05), http_settings.get("read_timeout", 10)),
+            pool_size=http_settings.get("pool_size", 10),
+            retries=http_settings.get("retries", 2)
+        )
+        self.fetch_options = { # For fetching several pages at once
+            "max_workers": http_settings.get("max_parallel_fetches", 8),
+            "max_per_host": http_settings.get("max_per_host", 4),
+            "deadline": http_settings.get("fetch_deadline", 30.0),
+            "max_bytes": int(http_settings.get("max_page_mb", 2) * 2**20)
+        }
+        self.llm = llm_handler.LLMClient.from_settings(self.config.get("llm_settings", {})) # Kept for every request
+        answer_settings = self.config.get("answer_settings", {})
+        self.answer_cache = AnswerCache(
+            directory=answer_settings.get("cache_dir", "answer_cache"),
+            max_bytes=answer_settings.get("cache_size_mb", 10) * 2**20,
+            ttl=answer_settings.get("ttl_hours", 168) * 3600,
+            negative_ttl=answer_settings.get("negative_ttl_hours", 24) * 3600
+        )
+        snapshot_file = answer_settings.get("snapshot_file") # Built with python -m src.answer_cache
+        self.lead_snapshot = LeadSnapshot(snapshot_file) if snapshot_file else None
         self.plugins, self.plugin_command_map = self.load_plugins()
 
         # Cognitive Core
         self.planner = task_planner.TaskPlanner(self)
-        self.memory = memory_manager.MemoryManager()
+        memory_settings = self.config.get("memory_settings", {})
+        self.memory = memory_manager.MemoryManager(
+            storage_dir=memory_settings.get("storage_dir", "memory_store"),
+            flush_interval=memory_settings.get("flush_interval", 5.0),
+            checkpoint_interval=memory_settings.get("checkpoint_interval", 300.0),
+            max_entries=memory_settings.get("max_entries"),
+            ann_threshold=memory_settings.get("ann_threshold", 100000),
+            nprobe=memory_settings.get("nprobe", 16),
+            quantization=memory_settings.get("quantization"),
+            cache_size=memory_settings.get("cache_size", 4096),
+            keyword_fraction=memory_settings.get("keyword_fraction", 0.01),
+            compact_fraction=memory_settings.get("compact_fraction", 0.5),
+            search_timeout=memory_settings.get("search_timeout", 10.0)
+        )
         self.last_summary = None # To pass context between plan steps
 
         # Voice Engine, SR, and other setups...
         self.engine = pyttsx3.init()
         self.engine.setProperty('rate', 150)
+        self.speech_lock = threading.Lock() # The TTS engine can't be driven from two threads at once
+        self.speech_queue = queue.Queue() # Sentences of streamed replies, spoken in order
         self.recognizer = sr.Recognizer()
         self.waiting_for_confirmation = False
         self.pending_web_search_query = None
         self.pending_file_move = None
         self.pending_text_summarization = None
-        self.conversation_history = None
-        self.vision = vision_system.VisionSystem()
+        performance_settings = self.config.get("performance_settings", {})
+        model_optimization.configure_threads(
+            intra_op_threads=performance_settings.get("intra_op_threads"),
+            inter_op_threads=performance_settings.get("inter_op_threads")
+        )
+        self.model_optimization = performance_settings.get("model_optimization") # None or "int8"
+        summarization_settings = self.config.get("summarization_settings", {})
+        cache_size_mb = summarization_settings.get("cache_size_mb", 50) # 0 turns the cache off
+        self.summarizer = Summarizer( # The model itself loads on first use
+            model_name=summarization_settings.get("model_name", "sshleifer/distilbart-cnn-12-6"),
+            optimization=self.model_optimization,
+            batch_size=summarization_settings.get("batch_size", 4),
+            num_beams=summarization_settings.get("num_beams"),
+            mode=summarization_settings.get("mode", "abstractive"),
+            extractive_sentences=summarization_settings.get("extractive_sentences", 3),
+            # Extractive summaries can rank sentences with the memory's MiniLM encoder instead of TF-IDF
+            embed=self.memory.model.encode if summarization_settings.get("extractive_embeddings") else None,
+            cache=SummaryCache(summarization_settings.get("cache_dir", "summary_cache"), cache_size_mb * 2**20) if cache_size_mb else None
+        )
+        chitchat_settings = self.config.get("chitchat_settings", {})
+        self.chitchat = chitchat.ChitchatEngine(
+            model_name=chitchat_settings.get("model_name", "microsoft/DialoGPT-small"),
+            max_context_tokens=chitchat_settings.get("max_context_tokens", 512),
+            max_new_tokens=chitchat_settings.get("max_new_tokens", 64),
+            optimization=self.model_optimization
+        )
+        vision_settings = self.config.get("vision_settings", {})
+        self.vision = vision_system.VisionSystem(
+            use_worker_processes=vision_settings.get("use_worker_processes", False),
+            object_detection=vision_settings.get("object_detection"),
+            camera=vision_settings.get("camera"),
+            source=vision_settings.get("source", 0),
+            gestures=vision_settings.get("gestures"),
+            ocr=vision_settings.get("ocr")
+        )
         self.vision.start()
 
         # Start all background threads
@@ -67,7 +148,8 @@ class Assistant:
             "greeting": threading.Thread(target=self._greeting_loop, daemon=True),
             "gesture": threading.Thread(target=self._gesture_control_loop, daemon=True),
             "mood": threading.Thread(target=self._mood_awareness_loop, daemon=True),
-            "context": threading.Thread(target=self._context_awareness_loop, daemon=True)
+            "context": threading.Thread(target=self._context_awareness_loop, daemon=True),
+            "speech": threading.Thread(target=self._speech_loop, daemon=True)
         }
         for thread in self.threads.values():
             thread.start()
@@ -77,8 +159,43 @@ class Assistant:
         if is_error: text = f"Error: {text}"
         if self.output_callback: self.output_callback(text)
         else: print(f"{self.assistant_name}: {text}")
-        try: self.engine.say(text); self.engine.runAndWait()
-        except Exception as e: print(f"TTS Error: {e}")
+        self._say(text)
+
+    def _say(self, text):
+        with self.speech_lock:
+            try: self.engine.say(text); self.engine.runAndWait()
+            except Exception as e: print(f"TTS Error: {e}")
+
+    def _speech_loop(self):
+        while True:
+            sentence = self.speech_queue.get()
+            try: self._say(sentence)
+            finally: self.speech_queue.task_done()
+
+    def speak_streaming(self, generate):
+        """
+        Shows a reply as it is generated and starts speaking it at the end of its
+        first sentence, rather than once the whole reply is written.
+        :param generate: Called with a callback for each new piece of text; returns the full text.
+        :return: The full text.
+        """
+        sentences, streamed = SentenceSplitter(), []
+        def on_text(piece):
+            streamed.append(piece)
+            if self.stream_callback: self.stream_callback(piece, False)
+            for sentence in sentences.feed(piece):
+                self.speech_queue.put(sentence)
+        text = generate(on_text)
+        if not streamed: # Nothing was generated, e.g. an error message came back instead
+            if text: self.speak(text)
+            return text
+        rest = sentences.flush()
+        if rest: self.speech_queue.put(rest)
+        if self.stream_callback: self.stream_callback("", True)
+        elif self.output_callback: self.output_callback(text)
+        else: print(f"{self.assistant_name}: {text}")
+        self.speech_queue.join() # Finish speaking before anything else is said
+        return text
 
     def listen_for_command(self):
         """Uses the microphone to listen for a command and returns the recognized text."""
@@ -113,14 +230,14 @@ class Assistant:
             if "yes" in command_str:
                 self.waiting_for_confirmation = False
                 if hasattr(self, 'pending_summarization_url'):
-                    self.summarize_page(self.pending_summarization_url, from_plan=True)
+                    self.summarize_page(self.pending_summarization_url, from_plan=True, mode=requested_mode(command_str)) # Plain "yes" uses the planner's mode
                 elif self.pending_web_search_query:
                     self.perform_web_search(self.pending_web_search_query)
                 elif self.pending_file_move:
                     self.execute_file_move()
                 elif self.pending_text_summarization:
-                    summary = web_interaction.summarize_text(self.pending_text_summarization)
-                    self.speak(summary)
+                    text, mode = self.pending_text_summarization, requested_mode(command_str) # e.g. "yes, quickly"
+                    summary = self.speak_streaming(lambda on_text: web_interaction.summarize_text(text, on_text=on_text, summarizer=self.summarizer, mode=mode))
                     self.last_summary = summary # Save for planner
                     self.pending_text_summarization = None
             elif "no" in command_str:
@@ -169,8 +286,7 @@ class Assistant:
         # Placeholder - a real implementation would use LLM with context
 
         # 5. Chitchat Fallback (Lowest Priority)
-        response, self.conversation_history = chitchat.get_chitchat_response(command_str, self.conversation_history)
-        self.speak(response)
+        response = self.speak_streaming(lambda on_text: self.chitchat.respond(command_str, on_text=on_text))
         self.memory.add_to_memory(f"Nora: {response}")
         if self.status_callback: self.status_callback("Ready")
         return True
@@ -193,6 +309,7 @@ class Assistant:
             "answer_question": self.answer_question,
             "learn_face": lambda a: self.speak(self.vision.learn_current_user_face(a)),
             "read_text": self.handle_read_text,
+            "ocr_folder": self.handle_ocr_folder,
             "identify_objects": self.handle_identify_objects,
             "explain_document": self.explain_document
         }
@@ -207,15 +324,37 @@ class Assistant:
             return True
         return False
 
-    # ... (Other command implementations: answer_question, teach_command, etc.)
+    # ... (Other command implementations: teach_command, etc.)
+    def answer_question(self, query):
+        """Answers from the local snapshot or cache when it can, else from Wikipedia."""
+        answer = web_interaction.get_instant_answer(query, cache=self.answer_cache, snapshot=self.lead_snapshot)
+        if answer: self.speak(answer)
+        else: self.speak(f"Sorry, I couldn't find an answer about {query}.")
+
     # Minor modifications needed for planner integration
-    def summarize_page(self, url, from_plan=False):
+    def summarize_page(self, url, from_plan=False, mode=None):
+        """:param mode: "abstractive" or "extractive"; None for the planner's mode in a plan, else the default."""
         self.speak("Okay, summarizing the page.")
-        content = web_interaction.get_page_content(url)
+        content = web_interaction.get_page_content(url, client=self.http, max_bytes=self.fetch_options["max_bytes"])
         if not content: self.speak("I couldn't get the content."); return
-        summary = web_interaction.summarize_text(content)
+        mode = mode or (self.planner.summary_mode if from_plan else None)
+        summary = self.speak_streaming(lambda on_text: web_interaction.summarize_text(content, on_text=on_text, summarizer=self.summarizer, mode=mode))
         self.last_summary = summary # Save for planner
-        self.speak(summary)
+
+    def summarize_pages(self, urls, from_plan=False, mode=None):
+        """
+        Summarizes several pages, fetched concurrently: each is summarized as soon as
+        it arrives, while the rest are still downloading.
+        :param mode: "abstractive" or "extractive"; None for the planner's mode in a plan, else the default.
+        """
+        self.speak(f"Okay, summarizing {len(urls)} pages.")
+        mode = mode or (self.planner.summary_mode if from_plan else None)
+        summaries = []
+        for url, content in web_interaction.fetch_many(urls, client=self.http, **self.fetch_options):
+            if not content: continue
+            summaries.append(self.speak_streaming(lambda on_text: web_interaction.summarize_text(content, on_text=on_text, summarizer=self.summarizer, mode=mode)))
+        if not summaries: self.speak("I couldn't get the content."); return
+        self.last_summary = "\n\n".join(summaries) # Save for planner
 
     def handle_read_text(self, args):
         self.speak("Okay, please hold the text up to the camera.")
@@ -224,10 +363,26 @@ class Assistant:
             self.speak(extracted_text, is_error=True)
         else:
             self.speak("I found the following text:"); self.speak(extracted_text[:150] + "...")
-            self.speak("Would you like me to summarize this text?")
+            self.speak("Would you like me to summarize this text? Say 'yes, quickly' for just the key sentences.")
             self.waiting_for_confirmation = True
             self.pending_text_summarization = extracted_text
 
+    def handle_ocr_folder(self, folder_name):
+        """OCRs a folder's images and scanned PDFs in the background so their text can be searched."""
+        folder = folder_name if os.path.isdir(folder_name) else os.path.join(os.path.expanduser("~"), folder_name.capitalize())
+        if not os.path.isdir(folder):
+            self.speak(f"I couldn't find the folder '{folder_name}'."); return
+        self.speak(f"Scanning the images in {os.path.basename(folder)}. I'll let you know when I'm done.")
+
+        def progress(done, total, path):
+            if self.status_callback: self.status_callback(f"OCR {done}/{total}")
+
+        def run():
+            result = batch_ocr.ocr_folder(folder, progress_callback=progress)
+            if self.status_callback: self.status_callback("Ready")
+            self.speak(f"Finished scanning. {result['processed']} files read, {result['skipped']} already up to date.")
+        threading.Thread(target=run, daemon=True).start()
+
     def handle_identify_objects(self, args):
         objects = self.vision.detected_objects
         if not objects: self.speak("I don't see any recognizable objects.")
@@ -257,16 +412,18 @@ class Assistant:
             return
 
         # 3. Get the explanation from the LLM handler
+        if not self.llm.configured:
+            self.speak(llm_handler.NOT_CONFIGURED_MESSAGE)
+            return
         self.speak("The document is being sent for explanation. This may take a moment.")
-        result = llm_handler.get_llm_explanation(content)
-
-        # 4. Speak the result
-        if result["status"] == "success":
-            self.speak("Here is the explanation:")
-            self.speak(result["explanation"])
-        elif result["status"] == "not_configured":
-            self.speak(result["message"])
-        else: # Handle errors
+        result = {}
+        def explain(on_text):
+            result.update(llm_handler.get_llm_explanation(content, client=self.llm, on_text=on_text))
+            return result.get("explanation", "")
+
+        # 4. Speak the explanation as it arrives
+        self.speak_streaming(explain)
+        if result["status"] != "success": # Handle errors
             self.speak(result["message"], is_error=True)
 
 
@@ -330,9 +487,9 @@ class Assistant:
             time.sleep(3)
     def _gesture_control_loop(self):
         while True:
-            if self.vision.detected_gesture == "open_palm":
+            event = self.vision.gesture_events.get() # Blocks until a gesture is confirmed
+            if event.name == "open_palm":
                 self.speak("Open palm detected, pausing media."); pyautogui.press('space'); self.vision.detected_gesture = None
-            time.sleep(1)
     def _mood_awareness_loop(self):
         suggestion_made = False
         while True:
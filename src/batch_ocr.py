@@ -0,0 +1,161 @@
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2
+import numpy as np
+import PyPDF2
+from .ocr_pipeline import ocr_region, text_regions
+
+# Beside config.json in the project folder, so every caller finds the same store whatever its working directory
+STORE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ocr_text.db")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+PDF_EXTENSION = ".pdf"
+# PDF pages with less extractable text than this are treated as scanned
+MIN_PDF_PAGE_TEXT = 20
+
+def escape_like(text):
+    """Escapes text to be matched literally in a LIKE pattern with ESCAPE '\\'."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+class OCRTextStore:
+    """
+    Keeps extracted text on disk, keyed by file path and modification time, so a
+    file is only OCR'd again after it changes. Text is stored zlib-compressed.
+    """
+    def __init__(self, db_file=STORE_FILE):
+        self.db_file = db_file
+        self.connection = sqlite3.connect(db_file)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS texts (path TEXT PRIMARY KEY, mtime REAL NOT NULL, text BLOB NOT NULL)")
+        self.connection.commit()
+
+    def get(self, path):
+        """Returns the stored text for a file, or None if it is missing or the file has changed."""
+        row = self.connection.execute("SELECT mtime, text FROM texts WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        if row is None or not os.path.exists(path) or row[0] != os.path.getmtime(path):
+            return None
+        return zlib.decompress(row[1]).decode("utf-8")
+
+    def is_current(self, path, mtime):
+        row = self.connection.execute("SELECT mtime FROM texts WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        return row is not None and row[0] == mtime
+
+    def put(self, path, mtime, text):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO texts (path, mtime, text) VALUES (?, ?, ?)",
+            (os.path.abspath(path), mtime, zlib.compress(text.encode("utf-8"))))
+        self.connection.commit()
+
+    def search(self, query, folder=None):
+        """Returns the paths whose stored text contains the query (case-insensitive), within folder if given."""
+        query = query.lower()
+        prefix = escape_like(os.path.join(os.path.abspath(folder), "")) if folder else ""
+        matches = []
+        for path, blob in self.connection.execute("SELECT path, text FROM texts WHERE path LIKE ? ESCAPE '\\'", (prefix + "%",)):
+            if query in zlib.decompress(blob).decode("utf-8").lower():
+                matches.append(path)
+        return sorted(matches)
+
+    def close(self):
+        self.connection.close()
+
+def ocr_image(image):
+    """OCRs a BGR image region by region."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return "\n".join(text for text in map(ocr_region, text_regions(gray)) if text)
+
+def ocr_file(path):
+    """
+    Extracts the text of an image or PDF. PDF pages that carry their own text
+    layer are read directly; scanned pages are OCR'd from their embedded images.
+    """
+    if path.lower().endswith(PDF_EXTENSION):
+        pages = []
+        with open(path, 'rb') as f:
+            reader = PyPDF2.PdfReader(f)
+            for page in reader.pages:
+                text = page.extract_text() or ""
+                if len(text.strip()) < MIN_PDF_PAGE_TEXT:
+                    scans = []
+                    for embedded in page.images:
+                        image = cv2.imdecode(np.frombuffer(embedded.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                        if image is not None: scans.append(ocr_image(image))
+                    text = "\n".join(scans) or text
+                pages.append(text)
+        return "\n".join(pages)
+
+    image = cv2.imread(path)
+    if image is None:
+        raise ValueError(f"Could not decode image '{os.path.basename(path)}'.")
+    return ocr_image(image)
+
+def _init_worker():
+    # Each worker runs one Tesseract at a time; stop Tesseract's own threads oversubscribing the cores
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+def _ocr_job(path, mtime):
+    try:
+        return path, mtime, ocr_file(path), None
+    except Exception as e:
+        return path, mtime, None, str(e)
+
+def find_ocr_files(folder, recursive=True):
+    """Lists the images and PDFs in a folder."""
+    found = []
+    for root, dirs, files in os.walk(folder):
+        for name in files:
+            if name.lower().endswith(IMAGE_EXTENSIONS + (PDF_EXTENSION,)):
+                found.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return sorted(found)
+
+def ocr_folder(folder, store=None, workers=None, recursive=True, progress_callback=None):
+    """
+    OCRs every image and PDF in a folder with a process pool, skipping files whose
+    text is already stored for their current modification time.
+    :param progress_callback: Called as progress_callback(done, total, path) after each file.
+    :return: A dict with the number of files processed, skipped and failed.
+    """
+    own_store = store is None
+    store = store or OCRTextStore()
+    paths = find_ocr_files(folder, recursive)
+    pending = []
+    for path in paths:
+        mtime = os.path.getmtime(path)
+        if not store.is_current(path, mtime):
+            pending.append((path, mtime))
+    summary = {"processed": 0, "skipped": len(paths) - len(pending), "failed": 0}
+
+    try:
+        if pending:
+            # Spawned, not forked: the assistant starts this from a thread of a process already running many
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = [executor.submit(_ocr_job, path, mtime) for path, mtime in pending]
+                for done, future in enumerate(as_completed(futures), start=1):
+                    path, mtime, text, error = future.result()
+                    if error:
+                        print(f"OCR failed for '{path}': {error}")
+                        summary["failed"] += 1
+                    else:
+                        store.put(path, mtime, text)
+                        summary["processed"] += 1
+                    if progress_callback: progress_callback(done, len(pending), path)
+    finally:
+        if own_store: store.close()
+    return summary
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="OCR every image and scanned PDF in a folder.")
+    parser.add_argument("folder")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-recursive", action="store_true")
+    args = parser.parse_args()
+
+    result = ocr_folder(args.folder, workers=args.workers, recursive=not args.no_recursive,
+                        progress_callback=lambda done, total, path: print(f"[{done}/{total}] {path}"))
+    print(f"Processed {result['processed']}, skipped {result['skipped']} unchanged, {result['failed']} failed.")
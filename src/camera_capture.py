@@ -0,0 +1,113 @@
+import cv2
+import threading
+import time
+
+class CameraCapture:
+    """
+    Owns the camera device and drains it continuously on a grabber thread, so
+    every consumer gets the most recent frame instead of a stale buffered one.
+    All access to the underlying cv2.VideoCapture goes through this class.
+    """
+    def __init__(self, index=0, width=None, height=None, fourcc="MJPG", fps=None):
+        """
+        :param index: The camera index (or any source cv2.VideoCapture accepts).
+        :param width: Requested frame width; None keeps the device default.
+        :param height: Requested frame height; None keeps the device default.
+        :param fourcc: Requested pixel format. MJPG lets USB cameras deliver higher
+                       resolutions at full rate with cheaper decoding than raw YUYV.
+        :param fps: Requested frame rate; None keeps the device default.
+        """
+        self.index = index
+        self.width = width
+        self.height = height
+        self.fourcc = fourcc
+        self.fps = fps
+        self._capture = None
+        self._device_lock = threading.Lock()
+        self._frame_condition = threading.Condition()
+        self._frame = None
+        self._timestamp = 0.0
+        self._sequence = 0
+        self._running = False
+        self._thread = None
+
+    def open(self):
+        """Opens the device, negotiates the capture format and starts the grabber thread."""
+        with self._device_lock:
+            if self._capture is not None:
+                return True
+            capture = cv2.VideoCapture(self.index)
+            if not capture.isOpened():
+                capture.release()
+                return False
+            if self.fourcc:
+                capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+            if self.width: capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            if self.height: capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            if self.fps: capture.set(cv2.CAP_PROP_FPS, self.fps)
+            # Keep the driver queue as short as possible; the grabber drains the rest
+            capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            self._capture = capture
+            print(f"Camera opened at {int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))}x"
+                  f"{int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))}.")
+        self._running = True
+        self._thread = threading.Thread(target=self._grab_loop, daemon=True)
+        self._thread.start()
+        return True
+
+    def isOpened(self):
+        return self._capture is not None and self._running
+
+    def _grab_loop(self):
+        """Reads frames as fast as the device delivers them, keeping only the latest."""
+        while self._running:
+            with self._device_lock:
+                if self._capture is None: break
+                success, frame = self._capture.read()
+            if not success:
+                time.sleep(0.05)
+                continue
+            with self._frame_condition:
+                self._frame = frame
+                self._timestamp = time.time()
+                self._sequence += 1
+                self._frame_condition.notify_all()
+
+    def get_latest(self):
+        """
+        Returns the latest frame as (frame, timestamp, sequence).
+        The frame is shared between consumers and must not be modified in place.
+        Returns (None, 0.0, 0) before the first frame arrives.
+        """
+        with self._frame_condition:
+            return self._frame, self._timestamp, self._sequence
+
+    def wait_for_frame(self, after_sequence=0, timeout=1.0):
+        """
+        Waits for a frame newer than after_sequence.
+        :return: (frame, timestamp, sequence), or (None, 0.0, after_sequence) on timeout.
+        """
+        with self._frame_condition:
+            if not self._frame_condition.wait_for(lambda: self._sequence > after_sequence or not self._running, timeout):
+                return None, 0.0, after_sequence
+            if self._sequence <= after_sequence:
+                return None, 0.0, after_sequence
+            return self._frame, self._timestamp, self._sequence
+
+    def read(self, timeout=1.0):
+        """Returns (success, frame) like cv2.VideoCapture.read, using the latest frame."""
+        frame, _, _ = self.get_latest()
+        if frame is None:
+            frame, _, _ = self.wait_for_frame(0, timeout)
+        return frame is not None, frame
+
+    def release(self):
+        """Stops the grabber thread and releases the device."""
+        self._running = False
+        with self._frame_condition:
+            self._frame_condition.notify_all()
+        if self._thread: self._thread.join(timeout=2); self._thread = None
+        with self._device_lock:
+            if self._capture is not None:
+                self._capture.release()
+                self._capture = None
@@ -1,36 +1,148 @@
-from transformers import pipeline, Conversation
+from transformers import AutoModelForCausalLM, AutoTokenizer
+import collections
+import threading
+import time
+import torch
+from .model_optimization import optimize_model
 
-# Initialize the conversational model once
-# Using a smaller, more efficient model suitable for a desktop assistant
-conversational_pipeline = pipeline("conversational", model="microsoft/DialoGPT-small")
-
-def get_chitchat_response(text, conversation_history=None):
+class ChitchatEngine:
     """
-    Generates a conversational response using a pre-trained model.
-    :param text: The user's input.
-    :param conversation_history: A transformers.Conversation object.
-    :return: A tuple of (response_text, updated_conversation_history).
+    Holds a conversation with a causal language model (DialoGPT by default).
+
+    Only a sliding window of recent turns is kept, bounded by a token budget,
+    and the model's key/value cache for that window is kept between turns. Each
+    reply then only encodes the new user turn, rather than the whole history
+    again. When the window overflows, the oldest turns are dropped until it is
+    half full and the cache is rebuilt once, so the cost of re-encoding is
+    spread over many turns and response time stays flat over a long session.
     """
-    if conversation_history is None:
-        conversation_history = Conversation()
+    def __init__(self, model_name="microsoft/DialoGPT-small", max_context_tokens=512, max_new_tokens=64,
+                 optimization=None, model=None, tokenizer=None):
+        """
+        :param model_name: The Hugging Face model to load, unless a model and tokenizer are given.
+        :param max_context_tokens: The most tokens of history, the new turn and the reply
+                                   together; must fit within the model's context length.
+        :param max_new_tokens: The longest reply, in tokens (counting the one that ends it).
+        :param optimization: None to run the model as float32, or "int8" for dynamic quantization.
+        """
+        if not 1 < max_new_tokens < max_context_tokens:
+            raise ValueError(f"max_new_tokens ({max_new_tokens}) must be at least 2 and below max_context_tokens ({max_context_tokens}).")
+        self.tokenizer = tokenizer if tokenizer is not None else AutoTokenizer.from_pretrained(model_name)
+        self.model = optimize_model(model if model is not None else AutoModelForCausalLM.from_pretrained(model_name), optimization)
+        self.max_context_tokens = max_context_tokens
+        self.max_new_tokens = max_new_tokens
+        self.eos_token_id = self.tokenizer.eos_token_id
+        self.latencies = collections.deque(maxlen=100) # Seconds per recent turn
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forgets the conversation."""
+        self._turns = collections.deque() # Token ids of each turn in the window, oldest first
+        self._window = [] # The same tokens, flattened
+        self._past = None # The model's cache for the first _cached tokens of the window
+        self._cached = 0
+
+    @property
+    def window_tokens(self):
+        return len(self._window)
+
+    def _add_turn(self, ids):
+        self._turns.append(ids)
+        self._window.extend(ids)
+
+    def _trim(self, incoming):
+        """Makes room for a turn of incoming tokens and a full reply, dropping the oldest turns if needed."""
+        if len(self._window) + incoming + self.max_new_tokens <= self.max_context_tokens:
+            return
+        target = max((self.max_context_tokens - self.max_new_tokens) // 2 - incoming, 0)
+        while self._turns and len(self._window) > target:
+            dropped = self._turns.popleft()
+            del self._window[:len(dropped)]
+        # Positions shift, so the cache no longer matches and is rebuilt on the next forward pass
+        self._past, self._cached = None, 0
+        self.rebuilds += 1
 
-    conversation_history.add_user_input(text)
+    def _forward(self, ids):
+        output = self.model(input_ids=torch.tensor([ids]), past_key_values=self._past, use_cache=True)
+        self._past = output.past_key_values
+        self._cached += len(ids)
+        return output.logits[0, -1]
 
-    # The pipeline returns the full conversation object, now updated with the model's response
-    updated_conversation = conversational_pipeline(conversation_history)
+    @torch.inference_mode()
+    def respond(self, text, on_text=None):
+        """
+        Adds the user's turn and generates a reply to it.
+        :param on_text: Called with each new piece of the reply as it is generated.
+        :return: The reply text.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            ids = self.tokenizer.encode(text) + [self.eos_token_id]
+            # A turn too long for the budget on its own keeps only its end
+            ids = ids[-(self.max_context_tokens - self.max_new_tokens):]
+            self._trim(len(ids))
+            self._add_turn(ids)
+            logits = self._forward(self._window[self._cached:])
 
-    # The model's last response is at the end of the generated responses
-    response = updated_conversation.generated_responses[-1]
+            reply, streamed = [], ""
+            while True:
+                token = int(torch.argmax(logits))
+                reply.append(token)
+                if token == self.eos_token_id or len(reply) == self.max_new_tokens - 1:
+                    break
+                if on_text is not None:
+                    streamed = self._stream(reply, streamed, on_text)
+                logits = self._forward([token])
+            if token != self.eos_token_id:
+                reply.append(self.eos_token_id)
+            # The last reply token hasn't been through the model; it is encoded with the next turn
+            self._add_turn(reply)
 
-    return response, updated_conversation
+            if on_text is not None:
+                self._stream(reply, streamed, on_text)
+            self.latencies.append(time.perf_counter() - start)
+            return self.tokenizer.decode(reply, skip_special_tokens=True).strip()
+
+    def _stream(self, reply, streamed, on_text):
+        """
+        Passes on the text the reply has gained since streamed. Decoding the whole reply
+        each time keeps multi-token characters and subword spacing intact.
+        :return: The text streamed so far.
+        """
+        text = self.tokenizer.decode(reply, skip_special_tokens=True).lstrip()
+        # A trailing replacement character is half of a multi-byte character
+        if len(text) > len(streamed) and not text.endswith("\ufffd"):
+            on_text(text[len(streamed):])
+            return text
+        return streamed
+
+    def stats(self):
+        latencies = list(self.latencies)
+        return {"turns": len(self._turns), "window_tokens": len(self._window), "rebuilds": self.rebuilds,
+                "last_latency": latencies[-1] if latencies else None,
+                "mean_latency": sum(latencies) / len(latencies) if latencies else None}
+
+def get_chitchat_response(text, engine=None):
+    """
+    Generates a conversational response using a pre-trained model.
+    :param text: The user's input.
+    :param engine: The ChitchatEngine holding the conversation so far; None starts one.
+    :return: A tuple of (response_text, engine).
+    """
+    if engine is None:
+        engine = ChitchatEngine()
+    return engine.respond(text), engine
 
 if __name__ == '__main__':
     # Example usage
-    history = None
+    engine = ChitchatEngine()
     while True:
         user_input = input("You: ")
         if user_input.lower() in ["exit", "quit"]:
             break
 
-        response, history = get_chitchat_response(user_input, history)
-        print(f"Nora: {response}")
+        print("Nora: ", end="", flush=True)
+        engine.respond(user_input, on_text=lambda piece: print(piece, end="", flush=True))
+        print(f" ({engine.latencies[-1] * 1000:.0f} ms)")
@@ -75,6 +75,11 @@ find_files_patterns = [
 ]
 matcher.add("find_files", find_files_patterns)
 
+find_text_in_files_patterns = [
+    [{"LOWER": "which"}, {"LOWER": {"IN": ["files", "documents"]}}, {"LOWER": {"IN": ["mention", "contain"]}}, {"IS_ALPHA": True, "OP": "+"}]
+]
+matcher.add("find_text_in_files", find_text_in_files_patterns)
+
 move_files_patterns = [
     [{"LOWER": "move"}, {"LOWER": "all", "OP": "?"}, {"IS_ALPHA": True, "OP": "+"}, {"LOWER": "from"}, {"IS_ALPHA": True, "OP": "+"}, {"LOWER": "to"}, {"IS_ALPHA": True, "OP": "+"}]
 ]
@@ -92,6 +97,12 @@ read_text_patterns = [
 ]
 matcher.add("read_text", read_text_patterns)
 
+# Pattern for OCRing every image and scanned PDF in a folder
+ocr_folder_patterns = [
+    [{"LOWER": {"IN": ["scan", "ocr"]}}, {"LOWER": "my", "OP": "?"}, {"IS_ALPHA": True, "OP": "+"}, {"LOWER": "folder"}]
+]
+matcher.add("ocr_folder", ocr_folder_patterns)
+
 # Pattern for identifying objects
 identify_objects_patterns = [
     [{"LOWER": {"IN": ["what", "identify"]}}, {"LOWER": "do"}, {"LOWER": "you"}, {"LOWER": "see"}],
@@ -178,6 +189,8 @@ def parse_command(text):
         "set_alarm": ["set", "an", "alarm", "for"],
         "play_on_youtube": ["play", "on", "youtube"],
         "find_files": ["find", "my", "files"],
+        "find_text_in_files": ["which", "files", "documents", "mention", "contain"],
+        "ocr_folder": ["scan", "ocr", "my", "folder"],
         "move_files": ["move", "all", "from", "to"],
         "learn_face": ["learn", "my", "face", "as"],
         "explain_document": ["read", "explain", "summarize", "and", "the", "file"]
@@ -0,0 +1,97 @@
+import collections
+import os
+import threading
+
+class DiskCache:
+    """
+    A size-bounded LRU cache of byte strings on disk, one file per entry.
+
+    A file's modification time records when it was last used, so the least
+    recently used entries are evicted first, even across restarts. Writes go
+    through a temporary file, so a crash never leaves half an entry behind.
+    """
+    def __init__(self, directory, max_bytes=50 * 2**20, suffix=".bin"):
+        """
+        :param directory: Where entries are stored.
+        :param max_bytes: The most the entries may take up; the least recently
+                          used are removed to stay within it.
+        :param suffix: The extension of entry files.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".tmp"):
+                os.remove(path) # Left by a write that never finished
+            elif name.endswith(suffix):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, name[:-len(suffix)], stat.st_size))
+        self._entries = collections.OrderedDict() # Key -> size in bytes, least recently used first
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+        self.total_bytes = sum(self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        """:return: The cached bytes, or None."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+                os.utime(self._path(key)) # Marks it as recently used
+            except OSError:
+                self.total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            if len(data) > self.max_bytes:
+                return
+            temporary = self._path(key) + ".tmp"
+            with open(temporary, "wb") as f:
+                f.write(data)
+            os.replace(temporary, self._path(key))
+            self.total_bytes += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            while self.total_bytes > self.max_bytes:
+                oldest, size = self._entries.popitem(last=False)
+                self.total_bytes -= size
+                self._remove_file(oldest)
+
+    def remove(self, key):
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)
+                self._remove_file(key)
+
+    def _remove_file(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError as e:
+            print(f"Could not remove cache entry: {e}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries), "bytes": self.total_bytes, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
@@ -1,11 +1,13 @@
 import os
 import docx
 import PyPDF2
+from . import batch_ocr
 
 def read_document(file_path):
     """
     Reads the text content from a file.
-    Supports .txt, .docx, and .pdf files.
+    Supports .txt, .docx, .pdf and image files. Images and scanned PDFs are OCR'd
+    once and their text is reused from the OCR text store afterwards.
     Returns the text content as a string, or an error message if something goes wrong.
     """
     if not os.path.exists(file_path):
@@ -20,9 +22,11 @@ def read_document(file_path):
         elif extension == '.docx':
             return _read_docx(file_path)
         elif extension == '.pdf':
-            return _read_pdf(file_path)
+            return _read_pdf(file_path) or _read_with_ocr(file_path)
+        elif extension in batch_ocr.IMAGE_EXTENSIONS:
+            return _read_with_ocr(file_path)
         else:
-            return f"Error: Unsupported file type '{extension}'. I can only read .txt, .docx, and .pdf files."
+            return f"Error: Unsupported file type '{extension}'. I can only read .txt, .docx, .pdf and image files."
     except Exception as e:
         return f"Error: Could not read file '{os.path.basename(file_path)}'. Reason: {e}"
 
@@ -40,10 +44,22 @@ def _read_docx(file_path):
     return '\n'.join(full_text)
 
 def _read_pdf(file_path):
-    """Reads a .pdf file."""
+    """Reads the text layer of a .pdf file. Returns an empty string for scanned PDFs."""
     text = ""
     with open(file_path, 'rb') as f:
         reader = PyPDF2.PdfReader(f)
         for page in reader.pages:
             text += page.extract_text() or ""
-    return text
+    return text if text.strip() else ""
+
+def _read_with_ocr(file_path):
+    """Returns the OCR text of an image or scanned PDF, from the store if it is up to date."""
+    store = batch_ocr.OCRTextStore()
+    try:
+        text = store.get(file_path)
+        if text is None:
+            text = batch_ocr.ocr_file(file_path)
+            store.put(file_path, os.path.getmtime(file_path), text)
+        return text
+    finally:
+        store.close()
@@ -0,0 +1,85 @@
+import cv2
+import face_recognition
+from deepface import DeepFace
+
+class FaceRegion:
+    """
+    A face found in a frame: its box in full-frame coordinates and a crop around it.
+    Boxes use the (top, right, bottom, left) order that face_recognition expects.
+    """
+    def __init__(self, box, crop, location_in_crop):
+        self.box = box
+        self.crop = crop
+        self.location_in_crop = location_in_crop
+
+    @property
+    def area(self):
+        top, right, bottom, left = self.box
+        return (bottom - top) * (right - left)
+
+def scale_box(box, factor, frame_shape):
+    """Scales a (top, right, bottom, left) box by factor and clamps it to the frame."""
+    height, width = frame_shape[:2]
+    top, right, bottom, left = (int(round(v * factor)) for v in box)
+    return (max(0, top), min(width, right), min(height, bottom), max(0, left))
+
+def expand_box(box, margin, frame_shape):
+    """Grows a box by a fraction of its size on every side, clamped to the frame."""
+    height, width = frame_shape[:2]
+    top, right, bottom, left = box
+    pad_y = int((bottom - top) * margin)
+    pad_x = int((right - left) * margin)
+    return (max(0, top - pad_y), min(width, right + pad_x), min(height, bottom + pad_y), max(0, left - pad_x))
+
+class FaceDetector:
+    """
+    Locates faces once per frame so that recognition, emotion and any other
+    face task can share the same boxes and only work on small crops.
+    """
+    def __init__(self, scale=0.25, margin=0.2):
+        self.scale = scale
+        self.margin = margin
+
+    def detect(self, frame):
+        """
+        Finds faces in a BGR frame.
+        :return: A list of FaceRegion objects, largest face first.
+        """
+        small_frame = cv2.resize(frame, (0, 0), fx=self.scale, fy=self.scale)
+        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+        locations = face_recognition.face_locations(rgb_small_frame)
+        return self.regions(frame, [scale_box(location, 1.0 / self.scale, frame.shape) for location in locations])
+
+    def regions(self, frame, boxes):
+        """
+        Crops faces whose full-frame boxes are already known, e.g. from a worker process.
+        :return: A list of FaceRegion objects, largest face first.
+        """
+        regions = []
+        for box in boxes:
+            crop_top, crop_right, crop_bottom, crop_left = expand_box(box, self.margin, frame.shape)
+            crop = frame[crop_top:crop_bottom, crop_left:crop_right]
+            if crop.size == 0:
+                continue
+            top, right, bottom, left = box
+            location_in_crop = (top - crop_top, right - crop_left, bottom - crop_top, left - crop_left)
+            regions.append(FaceRegion(box, crop, location_in_crop))
+
+        regions.sort(key=lambda region: region.area, reverse=True)
+        return regions
+
+def encode_face(face):
+    """Computes the face_recognition encoding of a detected face, or None if it fails."""
+    rgb_crop = cv2.cvtColor(face.crop, cv2.COLOR_BGR2RGB)
+    encodings = face_recognition.face_encodings(rgb_crop, [face.location_in_crop])
+    return encodings[0] if encodings else None
+
+def classify_emotion(face):
+    """Returns the dominant emotion of a detected face, or None."""
+    # The face is already located, so skip DeepFace's own detector
+    analysis = DeepFace.analyze(face.crop, actions=['emotion'], detector_backend='skip', enforce_detection=False)
+    if isinstance(analysis, list) and len(analysis) > 0:
+        return analysis[0]['dominant_emotion']
+    elif isinstance(analysis, dict):
+        return analysis['dominant_emotion']
+    return None
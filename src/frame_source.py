@@ -0,0 +1,178 @@
+import cv2
+import glob
+from abc import ABC, abstractmethod
+import os
+import threading
+import time
+from .camera_capture import CameraCapture
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+class ReplaySource(ABC):
+    """
+    Base class for recorded frame sources. Frames are delivered one by one in
+    order, with the same interface as CameraCapture, so the vision system and
+    benchmarks can run without a physical webcam.
+    """
+    def __init__(self, loop=False, realtime=False, fps=30.0):
+        """
+        :param loop: Start again from the first frame when the recording ends.
+        :param realtime: Deliver frames at the recording's frame rate instead of as fast as possible.
+        :param fps: The frame rate used for realtime pacing when the source has none.
+        """
+        self.loop = loop
+        self.realtime = realtime
+        self.fps = fps
+        self.finished = False
+        self._lock = threading.Lock()
+        self._frame = None
+        self._timestamp = 0.0
+        self._sequence = 0
+        self._next_due = 0.0
+
+    @abstractmethod
+    def open(self):
+        """Opens the recording. :return: True if it has frames to deliver."""
+        pass
+
+    @abstractmethod
+    def isOpened(self):
+        pass
+
+    @abstractmethod
+    def _read_next(self):
+        """Returns the next frame of the recording, or None at the end."""
+        pass
+
+    @abstractmethod
+    def _rewind(self):
+        """Goes back to the first frame."""
+        pass
+
+    def get_latest(self):
+        """Returns the last delivered frame as (frame, timestamp, sequence)."""
+        with self._lock:
+            return self._frame, self._timestamp, self._sequence
+
+    def wait_for_frame(self, after_sequence=0, timeout=1.0):
+        """
+        Delivers the next recorded frame.
+        :param timeout: The longest wait, in seconds, for a realtime source's next frame to be due; None waits as long as it takes.
+        :return: (frame, timestamp, sequence), or (None, 0.0, after_sequence) once the recording is over or on timeout.
+        """
+        with self._lock:
+            if self._sequence > after_sequence:
+                return self._frame, self._timestamp, self._sequence
+            if self.finished or not self.isOpened():
+                return None, 0.0, after_sequence
+            if self.realtime:
+                delay = self._next_due - time.time()
+                if timeout is not None and delay > timeout:
+                    time.sleep(max(0.0, timeout))
+                    return None, 0.0, after_sequence # The next frame isn't due yet
+                if delay > 0: time.sleep(delay)
+            frame = self._read_next()
+            if frame is None and self.loop:
+                self._rewind()
+                frame = self._read_next()
+            if frame is None:
+                self.finished = True
+                return None, 0.0, after_sequence
+            if self.realtime:
+                self._next_due = max(self._next_due, time.time()) + 1.0 / self.fps
+            self._frame = frame
+            self._timestamp = time.time()
+            self._sequence += 1
+            return self._frame, self._timestamp, self._sequence
+
+    def read(self, timeout=1.0):
+        """Returns (success, frame) using the last delivered frame, or the first one."""
+        frame, _, _ = self.get_latest()
+        if frame is None:
+            frame, _, _ = self.wait_for_frame(0, timeout)
+        return frame is not None, frame
+
+class VideoFileSource(ReplaySource):
+    """Replays the frames of a video file."""
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._capture = None
+
+    def open(self):
+        self._capture = cv2.VideoCapture(self.path)
+        if not self._capture.isOpened():
+            self._capture = None
+            return False
+        file_fps = self._capture.get(cv2.CAP_PROP_FPS)
+        if file_fps and file_fps > 0: self.fps = file_fps
+        return True
+
+    def isOpened(self):
+        return self._capture is not None
+
+    def _read_next(self):
+        success, frame = self._capture.read()
+        return frame if success else None
+
+    def _rewind(self):
+        self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def release(self):
+        with self._lock:
+            if self._capture is not None:
+                self._capture.release()
+                self._capture = None
+
+class ImageFolderSource(ReplaySource):
+    """Replays every image in a directory, in filename order."""
+    def __init__(self, folder, **kwargs):
+        super().__init__(**kwargs)
+        self.folder = folder
+        self._paths = []
+        self._position = 0
+
+    def open(self):
+        self._paths = sorted(p for p in glob.glob(os.path.join(self.folder, "*")) if p.lower().endswith(IMAGE_EXTENSIONS))
+        self._position = 0
+        return bool(self._paths)
+
+    def isOpened(self):
+        return bool(self._paths)
+
+    def _read_next(self):
+        while self._position < len(self._paths):
+            frame = cv2.imread(self._paths[self._position])
+            self._position += 1
+            if frame is not None:
+                return frame
+        return None
+
+    def _rewind(self):
+        self._position = 0
+
+    def release(self):
+        with self._lock:
+            self._paths = []
+
+def open_frame_source(source=0, loop=False, realtime=False, **camera_settings):
+    """
+    Creates a frame source from a camera index, a video file or a directory of images.
+    Objects that already provide wait_for_frame are returned unchanged.
+    :param camera_settings: Passed to CameraCapture (width, height, fourcc, fps) for cameras. An index
+                            among them names the camera, as it does for CameraCapture, in place of source.
+    :return: An unopened source; call open() before use.
+    :raises ValueError: If camera_settings name a camera index and source names something else.
+    """
+    index = camera_settings.pop("index", None)
+    if index is not None:
+        if source != 0 and source != index:
+            raise ValueError(f"The camera settings name camera {index}, but the source is {source!r}; set only one of them.")
+        source = index
+    if hasattr(source, "wait_for_frame"):
+        return source
+    if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        return CameraCapture(int(source), **camera_settings)
+    if os.path.isdir(source):
+        return ImageFolderSource(source, loop=loop, realtime=realtime)
+    return VideoFileSource(source, loop=loop, realtime=realtime)
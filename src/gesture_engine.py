@@ -0,0 +1,179 @@
+import collections
+import threading
+import time
+import cv2
+import mediapipe as mp
+
+mp_hands = mp.solutions.hands
+
+class GestureEvent:
+    """
+    A debounced gesture. Latencies are in seconds:
+    latency is from the capture of the confirming frame to the event,
+    onset_latency is from the capture of the first frame showing the gesture.
+    """
+    def __init__(self, name, frame_timestamp, onset_timestamp, emitted_at):
+        self.name = name
+        self.frame_timestamp = frame_timestamp
+        self.latency = emitted_at - frame_timestamp
+        self.onset_latency = emitted_at - onset_timestamp
+
+    def __repr__(self):
+        return f"GestureEvent({self.name!r}, latency={self.latency * 1000:.0f}ms, onset_latency={self.onset_latency * 1000:.0f}ms)"
+
+class GestureDebouncer:
+    """
+    Applies hysteresis to per-frame gesture guesses: a gesture becomes active after
+    on_frames consecutive sightings and is released after off_frames consecutive
+    frames without it, so a single noisy frame neither fires nor cancels it.
+    """
+    def __init__(self, on_frames=3, off_frames=5):
+        self.on_frames = on_frames
+        self.off_frames = off_frames
+        self.active = None
+        self._candidate = None
+        self._streak = 0
+        self._misses = 0
+        self.onset_timestamp = 0.0
+
+    def update(self, gesture, timestamp):
+        """
+        Feeds one frame's gesture (or None).
+        :return: The gesture name when it has just become active, otherwise None.
+        """
+        if self.active is not None:
+            if gesture == self.active:
+                self._misses = 0
+                return None
+            self._misses += 1
+            if self._misses < self.off_frames:
+                return None
+            self.active = None
+            self._candidate, self._streak = None, 0
+
+        if gesture is None:
+            self._candidate, self._streak = None, 0
+            return None
+        if gesture != self._candidate:
+            self._candidate, self._streak = gesture, 0
+            self.onset_timestamp = timestamp
+        self._streak += 1
+        if self._streak >= self.on_frames:
+            self.active, self._misses = gesture, 0
+            return gesture
+        return None
+
+def classify_hand(hand_landmarks):
+    """Returns the gesture shown by a set of MediaPipe hand landmarks, or None."""
+    landmark = hand_landmarks.landmark
+    thumb_tip = landmark[mp_hands.HandLandmark.THUMB_TIP]
+    thumb_ip = landmark[mp_hands.HandLandmark.THUMB_IP]
+    index_tip = landmark[mp_hands.HandLandmark.INDEX_FINGER_TIP]
+    index_pip = landmark[mp_hands.HandLandmark.INDEX_FINGER_PIP]
+    if thumb_tip.x > thumb_ip.x and index_tip.y < index_pip.y:
+        return "open_palm"
+    return None
+
+class GestureEngine:
+    """
+    Recognizes hand gestures continuously on its own thread. MediaPipe runs in
+    tracking mode on a downscaled frame, cropped to the region around the hand
+    found in the previous frame, and per-frame results are debounced into events.
+    """
+    def __init__(self, camera, callback, rate=15.0, process_width=320, roi_margin=0.6,
+                 on_frames=3, off_frames=5):
+        """
+        :param camera: A frame source providing wait_for_frame (see frame_source).
+        :param callback: Called with a GestureEvent each time a gesture is confirmed.
+        :param rate: The target number of frames processed per second.
+        :param process_width: Frames are downscaled to this width before inference.
+        :param roi_margin: How much the hand region is grown, as a fraction of its size.
+        """
+        self.camera = camera
+        self.callback = callback
+        self.rate = rate
+        self.process_width = process_width
+        self.roi_margin = roi_margin
+        self.debouncer = GestureDebouncer(on_frames, off_frames)
+        self.hands = mp_hands.Hands(static_image_mode=False, max_num_hands=1, model_complexity=0,
+                                    min_detection_confidence=0.7, min_tracking_confidence=0.5)
+        self.roi = None # (x1, y1, x2, y2) in downscaled-frame pixels, or None for the whole frame
+        self.latencies = collections.deque(maxlen=100)
+        self.inference_times = collections.deque(maxlen=100)
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running: return
+        self._running = True
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread: self._thread.join(timeout=2); self._thread = None
+
+    def average_latency(self):
+        """Returns the mean event latency in seconds over recent events, or None."""
+        return sum(self.latencies) / len(self.latencies) if self.latencies else None
+
+    def _run_loop(self):
+        period = 1.0 / self.rate
+        sequence = 0
+        while self._running:
+            started = time.time()
+            frame, timestamp, sequence = self.camera.wait_for_frame(sequence)
+            if frame is None:
+                if getattr(self.camera, "finished", False) or not self.camera.isOpened():
+                    self._running = False # A finished recording or a released camera delivers nothing more
+                    break
+                time.sleep(period); continue
+            self.process_frame(frame, timestamp)
+            remaining = period - (time.time() - started)
+            if remaining > 0: time.sleep(remaining)
+
+    def process_frame(self, frame, timestamp):
+        """Runs one frame through detection and debouncing, emitting an event if confirmed."""
+        inference_start = time.perf_counter()
+        gesture = self._detect(frame)
+        self.inference_times.append(time.perf_counter() - inference_start)
+        confirmed = self.debouncer.update(gesture, timestamp)
+        if confirmed:
+            event = GestureEvent(confirmed, timestamp, self.debouncer.onset_timestamp, time.time())
+            self.latencies.append(event.latency)
+            self.callback(event)
+
+    def _detect(self, frame):
+        """Returns the gesture in the frame, updating the hand region for the next frame."""
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.process_width / width)
+        small = cv2.resize(frame, (int(width * scale), int(height * scale))) if scale < 1.0 else frame
+        small_height, small_width = small.shape[:2]
+
+        x1, y1, x2, y2 = self.roi or (0, 0, small_width, small_height)
+        crop = cv2.cvtColor(small[y1:y2, x1:x2], cv2.COLOR_BGR2RGB)
+        results = self.hands.process(crop)
+        if not results.multi_hand_landmarks:
+            self.roi = None # Lost the hand; search the whole frame next time
+            return None
+
+        hand_landmarks = results.multi_hand_landmarks[0]
+        # Hand bounding box in downscaled-frame pixels
+        xs = [x1 + lm.x * (x2 - x1) for lm in hand_landmarks.landmark]
+        ys = [y1 + lm.y * (y2 - y1) for lm in hand_landmarks.landmark]
+        self._update_roi(min(xs), min(ys), max(xs), max(ys), small_width, small_height)
+        return classify_hand(hand_landmarks)
+
+    def _update_roi(self, left, top, right, bottom, width, height):
+        """
+        Moves the crop region only when the hand nears its edge, so the tracker
+        sees a stable image between frames.
+        """
+        if self.roi:
+            x1, y1, x2, y2 = self.roi
+            inset_x, inset_y = (x2 - x1) * 0.1, (y2 - y1) * 0.1
+            if left > x1 + inset_x and right < x2 - inset_x and top > y1 + inset_y and bottom < y2 - inset_y:
+                return
+        pad = max(right - left, bottom - top) * self.roi_margin
+        self.roi = (max(0, int(left - pad)), max(0, int(top - pad)),
+                    min(width, int(right + pad)), min(height, int(bottom + pad)))
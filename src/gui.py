@@ -28,6 +28,8 @@ class AssistantGUI(ctk.CTk):
         self.assistant = assistant
         self.assistant.output_callback = self.update_conversation
         self.assistant.status_callback = self.update_status
+        self.assistant.stream_callback = self.stream_conversation
+        self.streaming_reply = False
 
         # --- Main Layout Frames ---
         self.grid_rowconfigure(1, weight=1)
@@ -295,6 +297,21 @@ class AssistantGUI(ctk.CTk):
         self.conversation_area.configure(state='disabled')
         self.conversation_area.see('end')
 
+    def stream_conversation(self, piece, done=False):
+        """Adds a reply to the conversation a piece at a time, as it is generated."""
+        self.conversation_area.configure(state='normal')
+        if not self.streaming_reply:
+            self.typing_animation_running = False
+            self.typing_indicator.grid_remove()
+            self.conversation_area.insert('end', f"{self.assistant.assistant_name}: ")
+            self.streaming_reply = True
+        self.conversation_area.insert('end', piece)
+        if done:
+            self.conversation_area.insert('end', '\n\n')
+            self.streaming_reply = False
+        self.conversation_area.configure(state='disabled')
+        self.conversation_area.see('end')
+
     def start_wake_word_listener(self):
         wake_word_thread = threading.Thread(target=self.assistant.listen_for_wake_word, daemon=True)
         wake_word_thread.start()
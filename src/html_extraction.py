@@ -0,0 +1,103 @@
+import codecs
+import re
+import lxml.etree
+import lxml.html
+
+# Elements that never hold the main text of a page
+BOILERPLATE_TAGS = ("script", "style", "noscript", "template", "svg", "iframe", "form", "button",
+                    "nav", "header", "footer", "aside")
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search"}
+# A class or id naming page furniture, alone or with a prefix or suffix, e.g. "menu", "site-footer" or "share_buttons"
+BOILERPLATE_PATTERN = re.compile(r"^(?:[a-z0-9]+[-_])?(?:nav|navbar|navigation|menu|breadcrumbs?|sidebar|header|masthead|banner|footer|"
+                                 r"cookies?|consent|ads?|advert(?:isement)?s?|share|sharing|social|comments?|related|newsletter|"
+                                 r"popup|modal)(?:[-_][a-z0-9]+)?$", re.IGNORECASE)
+# Containers that are never dropped for their class, as a page may style them e.g. "has-sidebar"
+KEPT_TAGS = {"html", "body", "main", "article"}
+MAIN_CONTAINERS = ".//main | .//article | .//*[@role='main']"
+# An element named like page furniture is dropped only if it holds less than this share of the page's text...
+BOILERPLATE_MAX_SHARE = 0.3
+# ...or is mostly link text, like a menu; but never if it holds more than this share
+KEPT_SHARE = 0.5
+BOILERPLATE_LINK_DENSITY = 0.5
+CHARSET_PATTERN = re.compile(r"""charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+
+def detect_encoding(html, content_type=""):
+    """
+    :param html: The page as bytes.
+    :param content_type: The response's Content-Type header.
+    :return: The charset the header names, else the one a <meta> tag near the top names, else UTF-8.
+    """
+    for source in (content_type or "", html[:4096].decode("ascii", "ignore")):
+        match = CHARSET_PATTERN.search(source)
+        if match:
+            try:
+                return codecs.lookup(match.group(1)).name
+            except LookupError:
+                pass
+    return "utf-8"
+
+def _text_length(element, in_paragraphs):
+    if in_paragraphs:
+        return sum(len(p.text_content().strip()) for p in element.iter("p"))
+    return len(element.text_content().strip())
+
+def _is_boilerplate(element, page_text, in_paragraphs):
+    """
+    Whether an element is page furniture: marked so by its role, or named so by its
+    class or id while holding little of the page's text or mostly links. A wrapper
+    around the main container or most of the text, e.g. "layout has-sidebar", is kept.
+    :param page_text: The length of the page's text, counted as _text_length counts it.
+    """
+    if element.tag in KEPT_TAGS:
+        return False
+    role = element.get("role", "").lower() in BOILERPLATE_ROLES
+    names = element.get("class", "").split() + element.get("id", "").split()
+    if not role and not any(BOILERPLATE_PATTERN.match(name) for name in names):
+        return False
+    if element.xpath(MAIN_CONTAINERS):
+        return False
+    share = _text_length(element, in_paragraphs) / page_text if page_text else 0.0
+    if share > KEPT_SHARE:
+        return False
+    if role or share < BOILERPLATE_MAX_SHARE:
+        return True
+    text = len(element.text_content().strip())
+    links = sum(len(link.text_content().strip()) for link in element.iter("a"))
+    return text > 0 and links / text >= BOILERPLATE_LINK_DENSITY
+
+def _main_container(root):
+    """The page's <main>, its longest <article>, or an element marked role="main"; else the whole body."""
+    for path in ("//main", "//article", "//*[@role='main']"):
+        found = root.xpath(path)
+        if found:
+            return max(found, key=lambda element: len(element.text_content()))
+    body = root.find("body")
+    return body if body is not None else root
+
+def extract_main_text(html, content_type=""):
+    """
+    Extracts the main text of a page with lxml's C parser: scripts, navigation,
+    headers, footers, sidebars and the like are dropped, and the paragraphs of
+    the main content are joined.
+    :param html: The page, as bytes (decoded as the page declares) or str.
+    :param content_type: The response's Content-Type header, for its charset.
+    :return: The text, or "" for an empty page.
+    """
+    if isinstance(html, str):
+        html, content_type = html.encode("utf-8"), "charset=utf-8"
+    parser = lxml.html.HTMLParser(encoding=detect_encoding(html, content_type), remove_comments=True,
+                                  remove_pis=True)
+    try:
+        root = lxml.html.document_fromstring(html, parser=parser)
+    except (lxml.etree.ParserError, ValueError):
+        return "" # Nothing but whitespace
+    lxml.etree.strip_elements(root, *BOILERPLATE_TAGS, with_tail=False)
+    in_paragraphs = root.find(".//p") is not None
+    page_text = _text_length(root, in_paragraphs)
+    for element in [element for element in root.iter(lxml.etree.Element) if _is_boilerplate(element, page_text, in_paragraphs)]:
+        element.drop_tree()
+
+    main = _main_container(root)
+    paragraphs = [" ".join(p.text_content().split()) for p in main.iter("p")]
+    text = " ".join(paragraph for paragraph in paragraphs if paragraph)
+    return text or " ".join(main.text_content().split()) # A page without <p> tags keeps its text in <div>s
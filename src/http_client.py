@@ -0,0 +1,182 @@
+import email.utils
+import hashlib
+import json
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util import Retry, make_headers
+from .disk_cache import DiskCache
+
+# A browser user-agent, as some sites turn away scripts
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36"
+# Bodies are stored decoded, so the headers describing their transfer encoding aren't kept
+UNSTORED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+def parse_cache_control(value):
+    """:return: The directives of a Cache-Control header, e.g. {"max-age": "60", "no-cache": None}."""
+    directives = {}
+    for part in value.split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+def _http_date(value):
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+def freshness_lifetime(headers):
+    """
+    How many seconds a response may be reused without asking the server again,
+    following RFC 9111: max-age, then Expires, then a tenth of the time since
+    Last-Modified. :return: The lifetime, or None if the response mustn't be stored.
+    """
+    directives = parse_cache_control(headers.get("Cache-Control", ""))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    if "max-age" in directives:
+        try:
+            return max(int(directives["max-age"]), 0)
+        except (TypeError, ValueError):
+            return 0
+    date = _http_date(headers.get("Date")) or time.time()
+    expires = _http_date(headers.get("Expires"))
+    if expires is not None:
+        return max(expires - date, 0)
+    last_modified = _http_date(headers.get("Last-Modified"))
+    if last_modified is not None:
+        return max((date - last_modified) / 10, 0)
+    return 0
+
+class HttpClient:
+    """
+    A shared HTTP client for the assistant and its plugins: one keep-alive session
+    with pooled connections, compressed transfers, default timeouts, retries of
+    transient server errors, and an on-disk cache that honours Cache-Control,
+    Expires, ETag and Last-Modified. A stale cached page is revalidated with a
+    conditional request, so an unchanged page costs a 304 instead of a download.
+    """
+    def __init__(self, cache_dir="http_cache", max_cache_bytes=100 * 2**20, timeout=(3.05, 10), pool_size=10, retries=2):
+        """
+        :param cache_dir: Where cached responses are stored; None turns caching off.
+        :param max_cache_bytes: The most the cached responses may take up.
+        :param timeout: Seconds to connect and to wait between bytes, as a (connect, read) pair or one number.
+        :param pool_size: Open connections kept per host.
+        :param retries: How often a request failing to connect, or answered with 502, 503 or 504, is retried.
+        """
+        self.timeout = timeout
+        self.cache = DiskCache(cache_dir, max_cache_bytes, suffix=".http") if cache_dir else None
+        self.session = requests.Session()
+        retry = Retry(total=retries, connect=retries, read=False, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                      allowed_methods={"GET", "HEAD"}, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # gzip and deflate, plus brotli and zstd when their packages are installed
+        self.session.headers.update({"User-Agent": USER_AGENT, **make_headers(accept_encoding=True)})
+
+    def close(self):
+        self.session.close()
+
+    @staticmethod
+    def _key(url):
+        return hashlib.blake2b(url.encode("utf-8"), digest_size=20).hexdigest()
+
+    def _load(self, key):
+        """:return: (metadata, body) of a cached response, or None."""
+        data = self.cache.get(key)
+        if data is None:
+            return None
+        header, _, body = data.partition(b"\n")
+        return json.loads(header), body
+
+    def _store(self, key, metadata, body):
+        self.cache.put(key, json.dumps(metadata).encode("utf-8") + b"\n" + body)
+
+    @staticmethod
+    def _cached_response(metadata, body):
+        response = requests.Response()
+        response.status_code = metadata["status"]
+        response.reason = "OK"
+        response.url = metadata["url"]
+        response.headers = CaseInsensitiveDict(metadata["headers"])
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = body
+        response.from_cache = True
+        response.truncated = False
+        return response
+
+    def _send(self, url, headers, timeout, max_bytes, **kwargs):
+        """Sends the request; with max_bytes, the body is streamed and reading stops once it has that many bytes."""
+        if max_bytes is None:
+            response = self.session.get(url, headers=headers, timeout=timeout, **kwargs)
+            response.truncated = False
+            return response
+        response = self.session.get(url, headers=headers, timeout=timeout, **{**kwargs, "stream": True})
+        body = bytearray()
+        for chunk in response.iter_content(64 * 1024): # Decompressed, so the cap also holds for gzip bombs
+            body += chunk
+            if len(body) > max_bytes:
+                break
+        response.truncated = len(body) > max_bytes
+        response._content = bytes(body[:max_bytes])
+        response.close() # Drops the connection if the rest of the body was left unread
+        return response
+
+    def get(self, url, params=None, headers=None, timeout=None, use_cache=True, max_bytes=None, **kwargs):
+        """
+        Sends a GET request, answering from the cache when it can.
+        :param use_cache: False to always go to the network and not store the response.
+        :param max_bytes: The most of the body to download; a longer body is cut short, with
+                          truncated set on the response, and isn't cached. None for no limit.
+        :param kwargs: Passed on to requests; a streamed request (stream=True) bypasses the cache.
+        :return: A requests.Response, with from_cache set to whether its body came from the cache.
+        :raises requests.RequestException: As requests does.
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        url = requests.Request("GET", url, params=params).prepare().url
+        if self.cache is None or not use_cache or kwargs.get("stream"):
+            response = self._send(url, headers, timeout, None if kwargs.get("stream") else max_bytes, **kwargs)
+            response.from_cache = False
+            return response
+
+        key = self._key(url)
+        cached = self._load(key)
+        headers = dict(headers or {})
+        if cached is not None:
+            metadata, body = cached
+            if time.time() - metadata["stored"] < metadata["lifetime"]:
+                return self._cached_response(metadata, body)
+            stored = CaseInsensitiveDict(metadata["headers"])
+            if "ETag" in stored:
+                headers["If-None-Match"] = stored["ETag"]
+            if "Last-Modified" in stored:
+                headers["If-Modified-Since"] = stored["Last-Modified"]
+
+        response = self._send(url, headers, timeout, max_bytes, **kwargs)
+        if response.status_code == 304 and cached is not None:
+            # Still valid: refresh the stored headers and lifetime, and serve the stored body
+            stored.update({name: value for name, value in response.headers.items() if name.lower() not in UNSTORED_HEADERS})
+            metadata["headers"] = dict(stored)
+            lifetime = freshness_lifetime(stored)
+            if lifetime is not None:
+                metadata.update(stored=time.time(), lifetime=lifetime)
+                self._store(key, metadata, body)
+            return self._cached_response(metadata, body)
+
+        response.from_cache = False
+        lifetime = freshness_lifetime(response.headers)
+        vary = {field.strip().lower() for field in response.headers.get("Vary", "").split(",") if field.strip()}
+        validators = "ETag" in response.headers or "Last-Modified" in response.headers
+        if response.status_code == 200 and not response.truncated and lifetime is not None and vary <= {"accept-encoding"} and (lifetime or validators):
+            metadata = {"url": response.url, "status": 200, "stored": time.time(), "lifetime": lifetime,
+                        "headers": {name: value for name, value in response.headers.items() if name.lower() not in UNSTORED_HEADERS}}
+            self._store(key, metadata, response.content)
+        elif response.status_code != 304 and cached is not None:
+            self.cache.remove(key)
+        return response
@@ -0,0 +1,96 @@
+import array
+import itertools
+import re
+import numpy as np
+
+WORD_PATTERN = re.compile(r"[a-z0-9][a-z0-9']+")
+
+def tokenize(text):
+    """The distinct lowercase words of two or more characters in a text."""
+    return set(WORD_PATTERN.findall(text.lower()))
+
+class KeywordIndex:
+    """
+    An inverted index from words to the ids of the memory entries containing them.
+    Each word's postings are a compact array of ids in the order they were added.
+    Removing entries only counts them as stale; prune() drops them in one pass
+    once enough have built up, and lookups filter them out in the meantime.
+    """
+    def __init__(self):
+        self._postings = {} # Word -> array of entry ids
+        self.stale = 0
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuilds an index from the arrays written by state()."""
+        index = cls()
+        data, ends = state["postings"].tobytes(), np.cumsum(state["posting_counts"]) * 8
+        for word, start, end in zip(state["words"].tolist(), itertools.chain([0], ends.tolist()), ends.tolist()):
+            index._postings[word] = array.array('q')
+            index._postings[word].frombytes(data[start:end])
+        index.stale = int(state["stale"])
+        return index
+
+    def __len__(self):
+        return len(self._postings)
+
+    def add(self, entry_id, text):
+        for word in tokenize(text):
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = array.array('q')
+            postings.append(entry_id)
+
+    def frequency(self, word):
+        """How many entries contain a word, counting stale ones."""
+        postings = self._postings.get(word)
+        return len(postings) if postings is not None else 0
+
+    def distinctive_words(self, text, max_frequency):
+        """The words of a text that appear in memory, but in no more than max_frequency entries."""
+        return [word for word in tokenize(text) if 0 < self.frequency(word) <= max_frequency]
+
+    def lookup(self, words, match_all=True):
+        """
+        :param match_all: True for entries containing every word, False for any of them.
+        :return: A sorted array of entry ids (possibly including removed ones).
+        """
+        found = None
+        for word in words:
+            postings = self._postings.get(word.lower())
+            ids = np.frombuffer(postings, dtype='int64') if postings is not None else np.zeros(0, dtype='int64')
+            if found is None:
+                found = np.unique(ids)
+            elif match_all:
+                found = np.intersect1d(found, ids)
+            else:
+                found = np.union1d(found, ids)
+        return found if found is not None else np.zeros(0, dtype='int64')
+
+    def state(self):
+        """The postings as flat arrays, so they can be saved and loaded in bulk."""
+        words = list(self._postings)
+        return {"words": np.array(words, dtype=str),
+                "posting_counts": np.array([len(self._postings[word]) for word in words], dtype='int64'),
+                "postings": np.frombuffer(b"".join(self._postings[word].tobytes() for word in words), dtype='int64'),
+                "stale": np.array(self.stale)}
+
+    def remove(self, count):
+        """Notes that count entries were removed from memory."""
+        self.stale += count
+
+    def prune(self, is_live):
+        """
+        Drops removed entries from every posting list.
+        :param is_live: Maps an array of ids to a boolean mask of those still in memory.
+        """
+        for word in list(self._postings):
+            # A copy, so the array isn't left exporting its buffer (which would block appends)
+            ids = np.array(self._postings[word], dtype='int64')
+            live = ids[is_live(ids)]
+            if len(live):
+                self._postings[word] = array.array('q')
+                self._postings[word].frombytes(live.tobytes())
+            else:
+                del self._postings[word]
+        self.stale = 0
@@ -1,61 +1,141 @@
 import os
-import openai
 import json
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
-def get_llm_explanation(document_text):
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+SYSTEM_PROMPT = "You are an intelligent assistant that provides concise summaries and explanations of documents."
+NOT_CONFIGURED_MESSAGE = "The OpenAI feature is not configured. Please add your OpenAI API key to the .env file to enable it."
+
+class LLMClient:
+    """
+    A long-lived client for an OpenAI-compatible chat completions API, such as
+    OpenAI's or a local server's. One keep-alive session is reused for every
+    request; requests time out, and are retried with backoff when the server
+    can't be reached, is rate limiting (429) or fails (5xx). Replies can be
+    streamed, so the first words can be shown and spoken straight away.
+    """
+    def __init__(self, api_key=None, base_url=DEFAULT_BASE_URL, model="gpt-3.5-turbo", temperature=0.5,
+                 max_tokens=250, timeout=(3.05, 60), retries=2):
+        """
+        :param api_key: The API key; None for a local server that needs none.
+        :param base_url: The API's root, e.g. "http://localhost:8000/v1" for a local server.
+        :param timeout: Seconds to connect and to wait between bytes of the reply, as a (connect, read) pair or one number.
+        :param retries: How often a request is retried; a read that times out isn't, as the server may still be generating.
+        """
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=retries, connect=retries, read=False, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods={"POST"}, respect_retry_after_header=True, raise_on_status=False)
+        adapter = HTTPAdapter(max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    @classmethod
+    def from_settings(cls, llm_settings):
+        """A client configured by the llm_settings section of config.json, with the key from OPENAI_API_KEY."""
+        api_key = os.getenv("OPENAI_API_KEY")
+        if api_key == "YOUR_OPENAI_API_KEY": # The .env placeholder
+            api_key = None
+        return cls(
+            api_key=api_key,
+            base_url=llm_settings.get("base_url", os.getenv("OPENAI_BASE_URL", DEFAULT_BASE_URL)),
+            model=llm_settings.get("model", "gpt-3.5-turbo"),
+            temperature=llm_settings.get("temperature", 0.5),
+            max_tokens=llm_settings.get("max_tokens", 250),
+            timeout=(llm_settings.get("connect_timeout", 3.05), llm_settings.get("read_timeout", 60)),
+            retries=llm_settings.get("retries", 2)
+        )
+
+    @property
+    def configured(self):
+        """Whether there is a key, or a server other than OpenAI's that may not need one."""
+        return bool(self.api_key) or self.base_url != DEFAULT_BASE_URL
+
+    def close(self):
+        self.session.close()
+
+    def chat(self, messages, on_text=None):
+        """
+        Sends a conversation and returns the reply.
+        :param messages: The conversation, as [{"role": ..., "content": ...}].
+        :param on_text: Called with each new piece of the reply as it arrives; None to wait for the whole reply.
+        :return: The reply.
+        :raises requests.RequestException: If the request fails; requests.HTTPError if the server refuses it.
+        """
+        payload = {"model": self.model, "messages": messages, "max_tokens": self.max_tokens,
+                   "temperature": self.temperature, "stream": on_text is not None}
+        with self.session.post(f"{self.base_url}/chat/completions", json=payload, timeout=self.timeout,
+                               stream=on_text is not None) as response:
+            response.raise_for_status()
+            if on_text is None:
+                return response.json()["choices"][0]["message"]["content"].strip()
+            pieces = []
+            for line in response.iter_lines(decode_unicode=True): # Server-sent events
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    continue # Read on to the end of the body, so the connection can be reused
+                choices = json.loads(data).get("choices") or [{}]
+                piece = (choices[0].get("delta") or {}).get("content")
+                if piece:
+                    pieces.append(piece)
+                    on_text(piece)
+            return "".join(pieces).strip()
+
+    def explain(self, document_text, on_text=None):
+        """
+        Asks the LLM to explain a document.
+        :param on_text: Called with each new piece of the explanation as it arrives.
+        :return: A dictionary with 'status' and either 'explanation' or 'message'.
+        """
+        if not self.configured:
+            return {"status": "not_configured", "message": NOT_CONFIGURED_MESSAGE}
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"Please explain the following document:\n\n---\n\n{document_text}"}
+        ]
+        try:
+            return {"status": "success", "explanation": self.chat(messages, on_text)}
+        except requests.HTTPError as e:
+            if e.response.status_code == 401:
+                return {"status": "error",
+                        "message": "Authentication failed. Please check if your OpenAI API key is correct and valid."}
+            return {"status": "error", "message": f"An error occurred while communicating with the LLM: {e}"}
+        except (requests.RequestException, ValueError, KeyError, IndexError) as e: # Unreachable, or a malformed reply
+            return {"status": "error", "message": f"An error occurred while communicating with the LLM: {e}"}
+
+default_client = None # Created from config.json on first use when no client is given
+
+def get_llm_explanation(document_text, client=None, on_text=None):
     """
     Sends document text to an LLM for explanation.
 
     This function is designed to be optional. It checks for a valid OpenAI API key
     and returns a specific status if it's not configured.
 
+    :param client: The LLMClient to use; by default one shared by every call, configured once from config.json.
+    :param on_text: Called with each new piece of the explanation as it arrives.
     Returns:
         dict: A dictionary with 'status' and either 'explanation' or 'message'.
     """
-    api_key = os.getenv("OPENAI_API_KEY")
-
-    if not api_key or api_key == "YOUR_OPENAI_API_KEY":
-        return {
-            "status": "not_configured",
-            "message": "The OpenAI feature is not configured. Please add your OpenAI API key to the .env file to enable it."
-        }
-
-    openai.api_key = api_key
-
-    try:
-        with open('config.json', 'r') as f:
-            config = json.load(f)
-        llm_settings = config.get("llm_settings", {})
-        model = llm_settings.get("model", "gpt-3.5-turbo")
-        temperature = llm_settings.get("temperature", 0.5)
-
-        # Use the ChatCompletion endpoint for chat models
-        response = openai.ChatCompletion.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are an intelligent assistant that provides concise summaries and explanations of documents."},
-                {"role": "user", "content": f"Please explain the following document:\n\n---\n\n{document_text}"}
-            ],
-            max_tokens=250,
-            temperature=temperature,
-            n=1,
-            stop=None,
-        )
-
-        explanation = response.choices[0].message['content'].strip()
-
-        return {
-            "status": "success",
-            "explanation": explanation
-        }
-
-    except openai.error.AuthenticationError:
-        return {
-            "status": "error",
-            "message": "Authentication failed. Please check if your OpenAI API key is correct and valid."
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "message": f"An error occurred while communicating with the LLM: {e}"
-        }
+    global default_client
+    if client is None:
+        if default_client is None:
+            try:
+                with open('config.json', 'r') as f:
+                    llm_settings = json.load(f).get("llm_settings", {})
+            except (OSError, ValueError):
+                llm_settings = {}
+            default_client = LLMClient.from_settings(llm_settings)
+        client = default_client
+    return client.explain(document_text, on_text)
@@ -0,0 +1,177 @@
+import numpy as np
+
+class EntryArena:
+    """
+    Holds memory entries column by column instead of as Python objects: every
+    text is UTF-8 encoded into one shared buffer, and ids, offsets, times,
+    importance and speakers live in numpy arrays (speakers as codes into a small
+    table). An entry costs its text bytes plus 35 bytes, where a dict of Python
+    strings and floats costs several hundred.
+
+    Entry ids must be added in increasing order, which lets them be found by
+    binary search. Removed entries leave holes that are compacted away once
+    they outnumber the live ones.
+    """
+    def __init__(self, capacity=1024):
+        self._data = bytearray()
+        self._ids = np.zeros(capacity, dtype='int64')
+        self._offsets = np.zeros(capacity, dtype='int64')
+        self._lengths = np.zeros(capacity, dtype='int32')
+        self._times = np.zeros(capacity, dtype='float64')
+        self._importance = np.zeros(capacity, dtype='float32')
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._speaker_codes = np.zeros(capacity, dtype='int16')
+        self._speakers = [None] # Code -> speaker name; 0 means unknown
+        self._rows = 0
+        self._live = 0
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuilds an arena from the arrays written by state()."""
+        arena = cls(capacity=0)
+        arena._data = bytearray(state["data"].tobytes())
+        arena._ids, arena._offsets, arena._lengths = state["ids"], state["offsets"], state["lengths"]
+        arena._times, arena._importance, arena._speaker_codes = state["times"], state["importance"], state["speaker_codes"]
+        arena._alive = np.ones(len(arena._ids), dtype=bool)
+        arena._speakers = [None] + [str(name) for name in state["speakers"][1:]]
+        arena._rows = arena._live = len(arena._ids)
+        return arena
+
+    def __len__(self):
+        return self._live
+
+    def __contains__(self, entry_id):
+        return self._row(entry_id) >= 0
+
+    @property
+    def nbytes(self):
+        """The memory used by texts and metadata, including spare capacity."""
+        return len(self._data) + sum(column.nbytes for column in self._columns())
+
+    def _columns(self):
+        return [self._ids, self._offsets, self._lengths, self._times, self._importance, self._alive, self._speaker_codes]
+
+    def _speaker_code(self, speaker):
+        if speaker not in self._speakers:
+            self._speakers.append(speaker)
+        return self._speakers.index(speaker)
+
+    def append(self, entry_id, text, timestamp, importance=1.0, speaker=None):
+        if self._rows and entry_id <= self._ids[self._rows - 1]:
+            raise ValueError(f"Entry ids must increase: {entry_id} after {self._ids[self._rows - 1]}.")
+        if self._rows == len(self._ids):
+            self._resize(max(1024, len(self._ids) * 2))
+        encoded = text.encode("utf-8")
+        row = self._rows
+        self._ids[row], self._offsets[row], self._lengths[row] = entry_id, len(self._data), len(encoded)
+        self._times[row], self._importance[row], self._alive[row] = timestamp, importance, True
+        self._speaker_codes[row] = self._speaker_code(speaker)
+        self._data += encoded
+        self._rows += 1
+        self._live += 1
+
+    def _resize(self, capacity):
+        self._ids, self._offsets, self._lengths, self._times, self._importance, self._alive, self._speaker_codes = [
+            np.resize(column, capacity) if capacity > len(column) else column[:capacity].copy()
+            for column in self._columns()]
+
+    def _row(self, entry_id):
+        """The row holding a live entry, or -1."""
+        row = int(np.searchsorted(self._ids[:self._rows], entry_id))
+        if row < self._rows and self._ids[row] == entry_id and self._alive[row]:
+            return row
+        return -1
+
+    def _text_at(self, row):
+        offset = self._offsets[row]
+        return self._data[offset:offset + self._lengths[row]].decode("utf-8")
+
+    def text(self, entry_id):
+        row = self._row(entry_id)
+        if row < 0:
+            raise KeyError(entry_id)
+        return self._text_at(row)
+
+    def get(self, entry_id):
+        """Returns an entry as a dict, or None if it isn't held."""
+        row = self._row(entry_id)
+        if row < 0:
+            return None
+        return {"id": int(self._ids[row]), "text": self._text_at(row),
+                "time": float(self._times[row]), "importance": float(self._importance[row]),
+                "speaker": self._speakers[self._speaker_codes[row]]}
+
+    def touch(self, entry_id, timestamp, importance):
+        """Updates an entry's time and importance."""
+        row = self._row(entry_id)
+        if row < 0:
+            raise KeyError(entry_id)
+        self._times[row], self._importance[row] = timestamp, importance
+
+    def texts(self):
+        """The texts of all live entries, oldest first."""
+        return [self._text_at(row) for row in np.flatnonzero(self._alive[:self._rows])]
+
+    def columns(self):
+        """:return: (ids, times, importance) arrays for the live entries, oldest first."""
+        live = self._alive[:self._rows]
+        return self._ids[:self._rows][live], self._times[:self._rows][live], self._importance[:self._rows][live]
+
+    def contains(self, entry_ids):
+        """:return: A boolean mask of which of the given ids are live entries."""
+        entry_ids = np.asarray(entry_ids, dtype='int64')
+        if not self._rows:
+            return np.zeros(len(entry_ids), dtype=bool)
+        rows = np.minimum(np.searchsorted(self._ids[:self._rows], entry_ids), self._rows - 1)
+        return (self._ids[rows] == entry_ids) & self._alive[rows]
+
+    def select(self, speaker=None, since=None, until=None):
+        """
+        :return: The ids of live entries by a speaker (case-insensitive) and
+                 within a time range, either end of which may be left open.
+        """
+        mask = self._alive[:self._rows].copy()
+        if speaker is not None:
+            codes = [code for code, name in enumerate(self._speakers) if name and name.lower() == speaker.lower()]
+            mask &= np.isin(self._speaker_codes[:self._rows], codes)
+        if since is not None:
+            mask &= self._times[:self._rows] >= since
+        if until is not None:
+            mask &= self._times[:self._rows] <= until
+        return self._ids[:self._rows][mask]
+
+    def state(self, max_id=None):
+        """
+        The live entries as arrays, so they can be saved and loaded in bulk.
+        :param max_id: If given, leaves out entries with higher ids.
+        """
+        rows = self._alive[:self._rows].copy()
+        if max_id is not None:
+            rows &= self._ids[:self._rows] <= max_id
+        return {"ids": self._ids[:self._rows][rows], "offsets": self._offsets[:self._rows][rows],
+                "lengths": self._lengths[:self._rows][rows], "times": self._times[:self._rows][rows],
+                "importance": self._importance[:self._rows][rows], "speaker_codes": self._speaker_codes[:self._rows][rows],
+                "speakers": np.array([name or "" for name in self._speakers]),
+                "data": np.frombuffer(bytes(self._data), dtype='uint8')}
+
+    def remove(self, entry_ids):
+        for entry_id in entry_ids:
+            row = self._row(entry_id)
+            if row >= 0:
+                self._alive[row] = False
+                self._live -= 1
+        if self._rows - self._live > max(self._live, 1024):
+            self._compact()
+
+    def _compact(self):
+        rows = np.flatnonzero(self._alive[:self._rows])
+        data = bytearray()
+        offsets = np.zeros(len(rows), dtype='int64')
+        for i, row in enumerate(rows):
+            offsets[i] = len(data)
+            data += self._data[self._offsets[row]:self._offsets[row] + self._lengths[row]]
+        self._data = data
+        self._ids, self._lengths, self._times, self._importance, self._alive, self._speaker_codes = [
+            column[rows] for column in (self._ids, self._lengths, self._times, self._importance, self._alive, self._speaker_codes)]
+        self._offsets = offsets
+        self._rows = self._live = len(rows)
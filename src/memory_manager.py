@@ -1,42 +1,640 @@
 from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
+import atexit
+import collections
+import hashlib
+import queue
+import re
+import threading
+import time
+from .keyword_index import KeywordIndex
+from .memory_arena import EntryArena
+from .memory_store import MemoryStore
+
+QUANTIZATIONS = (None, "sq8", "pq")
+SPEAKER_PATTERN = re.compile(r"^([A-Za-z][\w .'-]{0,31}):\s")
+# Filtered searches over at most this many entries score them exactly rather than through the index
+EXACT_SEARCH_LIMIT = 4096
+
+def speaker_of(text):
+    """The speaker of a "Name: text" memory, or None."""
+    match = SPEAKER_PATTERN.match(text)
+    return match.group(1) if match else None
+
+def new_flat_index(dimension, quantization=None):
+    """
+    An exhaustive index addressed by entry id, so entries can be removed.
+    With quantization, vectors are kept as one byte per dimension instead of four.
+    The range is fixed to [-1, 1] rather than trained, which suits unit-length
+    embeddings such as MiniLM's and lets the index start empty.
+    """
+    if not quantization:
+        return faiss.IndexIDMap2(faiss.IndexFlatL2(dimension))
+    index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit_uniform)
+    faiss.copy_array_to_vector(np.array([-1.0, 2.0], dtype='float32'), index.sq.trained) # vmin, range
+    index.is_trained = True
+    return faiss.IndexIDMap2(index)
+
+def pq_subquantizers(dimension):
+    """The number of one-byte PQ codes per vector: about one per 8 dimensions, dividing the dimension evenly."""
+    m = max(1, dimension // 8)
+    while dimension % m:
+        m -= 1
+    return m
+
+def build_ivf_index(vectors, ids, quantization=None, nlist=None, max_training_points=40):
+    """
+    Builds an inverted-file index over the given vectors. Only the clusters closest
+    to a query are scanned, so search cost grows far slower than the entry count,
+    and unlike HNSW it supports removing entries.
+    :param quantization: None keeps full float32 vectors, "sq8" one byte per
+                         dimension, "pq" product-quantized codes of about one
+                         byte per 8 dimensions.
+    :param nlist: The number of clusters; defaults to 4 * sqrt(len(vectors)).
+    :param max_training_points: Clustering is trained on at most this many points per cluster.
+    """
+    dimension = vectors.shape[1]
+    nlist = nlist or max(1, int(4 * np.sqrt(len(vectors))))
+    quantizer = faiss.IndexFlatL2(dimension)
+    training_points = nlist * max_training_points
+    if quantization == "sq8":
+        index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, faiss.ScalarQuantizer.QT_8bit)
+    elif quantization == "pq":
+        # Each subquantizer learns 2^bits centroids, so small memories get smaller codebooks
+        bits = int(min(8, np.log2(len(vectors))))
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_subquantizers(dimension), bits)
+        training_points = max(training_points, 2 ** bits * max_training_points)
+    else:
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+    sample = vectors
+    if len(vectors) > training_points:
+        rows = np.random.default_rng(0).choice(len(vectors), training_points, replace=False)
+        sample = vectors[np.sort(rows)]
+    index.train(np.ascontiguousarray(sample))
+    # Lets filtered searches fetch candidate vectors by id
+    index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    index.add_with_ids(np.ascontiguousarray(vectors), ids)
+    return index
+
+def index_quantization(index):
+    """Returns which of QUANTIZATIONS an index built by this module uses."""
+    if isinstance(index, faiss.IndexIDMap2):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "pq"
+    if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return "sq8"
+    return None
+
+class EmbeddingCache:
+    """
+    A bounded LRU cache of embeddings keyed by a hash of the text, shared by memory
+    additions and queries. Each text also remembers the memory entry it was stored
+    as, so repeating it can refresh that entry instead of storing its vector again.
+    """
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict() # Text hash -> [embedding, entry id or None]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text):
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, text):
+        """:return: (embedding, entry_id) for a cached text, or (None, None)."""
+        key = self._key(text)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached[0], cached[1]
+
+    def put(self, text, embedding, entry_id=None):
+        """Caches a text's embedding. An entry id already cached for the text is kept unless a new one is given."""
+        if not self.max_entries: return
+        key = self._key(text)
+        with self._lock:
+            cached = self._entries.get(key)
+            self._entries[key] = [embedding, entry_id if entry_id is not None or cached is None else cached[1]]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate, "size": len(self._entries)}
 
 class MemoryManager:
     """
     Manages a vector-based memory for conversational context.
+    Texts are embedded on a background worker in small batches, so adding to
+    memory never waits for the model. With a storage directory, memory is kept
+    on disk and restored on the next start.
+
+    Search is exact until the memory holds ann_threshold entries, after which an
+    approximate IVF index is built in the background and swapped in. With max_entries set, the
+    least valuable memories (old and unimportant) are evicted once it is full.
+    With quantization set, vectors are held as compact codes rather than floats.
+    Recent embeddings are cached, and a text already in memory is refreshed
+    rather than stored twice.
+
+    Searches can be batched and filtered by speaker, time and keywords. Once the
+    memory is large, a query containing a rare word is scored only against the
+    entries that contain it.
     """
-    def __init__(self, model_name='all-MiniLM-L6-v2'):
+    def __init__(self, model_name='all-MiniLM-L6-v2', batch_size=32, batch_window=0.05,
+                 storage_dir=None, flush_interval=5.0, checkpoint_interval=300.0,
+                 max_entries=None, ann_threshold=100000, nprobe=16, half_life_days=30.0,
+                 quantization=None, cache_size=4096, keyword_fraction=0.01, compact_fraction=0.5,
+                 search_timeout=10.0):
+        """
+        :param batch_size: The most texts encoded together in one model call.
+        :param batch_window: How long (in seconds) the worker waits for more texts
+                             to arrive before encoding a partial batch.
+        :param storage_dir: Where to persist memory; None keeps it in RAM only.
+        :param flush_interval: The most seconds of new memory a crash can lose.
+        :param checkpoint_interval: How often (in seconds) the index is saved, which
+                                    bounds how much must be re-indexed on startup.
+        :param max_entries: The most memories kept; None for no limit.
+        :param ann_threshold: The entry count at which search switches to an approximate index.
+        :param nprobe: How many IVF clusters a search scans; higher is slower but more accurate.
+        :param half_life_days: How quickly a memory's importance decays when choosing what to evict.
+        :param quantization: "sq8" stores vectors as 8-bit scalar codes (4x smaller),
+                             "pq" as product-quantized codes once the approximate
+                             index is in use (about 32x smaller; "sq8" until then).
+        :param cache_size: How many recent texts keep their embeddings cached; 0 disables the cache.
+        :param keyword_fraction: A query word found in at most this fraction of entries
+                                 narrows the search to those entries; 0 turns this off.
+        :param compact_fraction: The share of the stored log made up of evicted entries and updates
+                                 at which a checkpoint rewrites it with only the live entries.
+        :param search_timeout: The most seconds a search waits for earlier texts to become
+                               searchable before going ahead without them; None waits for good.
+        """
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}'. Use one of {QUANTIZATIONS}.")
         self.model = SentenceTransformer(model_name)
         self.dimension = self.model.get_sentence_embedding_dimension()
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.conversation_history = [] # Stores the actual text
+        self.quantization = quantization
+        self.index = new_flat_index(self.dimension, quantization)
+        self.entries = EntryArena()
+        self.keywords = KeywordIndex()
+        self.keyword_fraction = keyword_fraction
+        self.max_entries = max_entries
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self.search_timeout = search_timeout
+        self.half_life = half_life_days * 86400
+        self._index_changes = None # While an IVF index is built: (ids, embeddings or None for removal) to replay onto it
+        self.cache = EmbeddingCache(cache_size)
+        self.duplicate_count = 0 # Additions that refreshed an existing entry
+        self._next_id = 0
+        self._newest_indexed_id = -1
+        self._indexed_rows = 0 # Entries both written to the log and added to the index
+        self.store = None
+        self.checkpoint_interval = checkpoint_interval
+        self._last_checkpoint = time.time()
+        self._store_lock = threading.Lock()
+        if storage_dir:
+            self.store = MemoryStore(storage_dir, self.dimension, flush_interval, compact_fraction)
+            self._restore()
+            atexit.register(self.close)
+        self._configure_index(self.index)
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self._pending = queue.Queue()
+        self._indexed = threading.Condition()
+        self._submitted_count = 0
+        self._indexed_count = 0
+        self._worker = threading.Thread(target=self._embedding_loop, daemon=True)
+        self._worker.start()
+
+    @property
+    def conversation_history(self):
+        """The texts currently in memory, oldest first."""
+        with self._indexed:
+            return self.entries.texts()
+
+    def _restore(self):
+        """
+        Loads the persisted memory, indexing only the vectors added after the last checkpoint.
+        Entries and keywords come from the state saved with the checkpoint when there is one,
+        so only the entries logged after it are parsed and added one by one.
+        """
+        start = time.time()
+        entries, vectors, index, indexed_count, evicted, state = self.store.load()
+        first_row = len(vectors) - len(entries) # Rows before this are covered by the state
+        for row, entry in enumerate(entries, first_row):
+            entry.setdefault("id", row)
+            entry.setdefault("importance", 1.0)
+        ids = np.array([entry["id"] for entry in entries], dtype='int64')
+        if state is not None:
+            self.entries, self.keywords = EntryArena.from_state(state), KeywordIndex.from_state(state)
+            log_ids, self._next_id = state["log_ids"], int(state["next_id"])
+        else:
+            log_ids = ids
+        if index is None or isinstance(index, faiss.IndexFlat) or not self._is_configured(index):
+            # No checkpoint, one written before entries had ids, or a different quantization: index everything
+            index, indexed_count = new_flat_index(self.dimension, self.quantization), 0
+        self.index = index
 
-    def add_to_memory(self, text):
-        """Adds a new piece of text to the memory."""
-        self.conversation_history.append(text)
-        embedding = self.model.encode([text])
-        self.index.add(embedding)
+        evicted = np.fromiter(evicted, dtype='int64', count=len(evicted))
+        # Rows the state covers are live if it holds them, later ones unless evicted since
+        live = ~np.isin(log_ids, evicted)
+        live[:first_row] &= self.entries.contains(log_ids[:first_row])
+        rows = np.flatnonzero(live[indexed_count:]) + indexed_count
+        for start_row in range(0, len(rows), 65536):
+            chunk = rows[start_row:start_row + 65536]
+            self.index.add_with_ids(np.ascontiguousarray(vectors[chunk]), log_ids[chunk])
+        if len(evicted):
+            self.index.remove_ids(evicted)
+            self.keywords.remove(int(self.entries.contains(evicted).sum()))
+            self.entries.remove(evicted)
+        for entry, alive in zip(entries, live[first_row:].tolist()):
+            if alive:
+                self.entries.append(entry["id"], entry["text"], entry["time"], entry["importance"],
+                                    entry.get("speaker") or speaker_of(entry["text"]))
+                self.keywords.add(entry["id"], entry["text"])
+        self._next_id = max(self._next_id, int(log_ids.max()) + 1 if len(log_ids) else 0)
+        self._newest_indexed_id = self._next_id - 1
+        self._indexed_rows = len(log_ids)
+        # Warm the cache with the latest entries, so repeats straight after a restart are still recognised
+        recent = self.entries.columns()[0][-self.cache.max_entries:]
+        for entry_id, vector in zip(recent.tolist(), vectors[np.searchsorted(log_ids, recent)]):
+            self.cache.put(self.entries.text(entry_id), np.array(vector), entry_id)
+        if len(log_ids):
+            print(f"Restored {len(self.entries)} memories in {time.time() - start:.2f}s.")
+
+    def _is_configured(self, index):
+        """Whether an index uses the quantization this manager is set up with."""
+        if faiss.try_extract_index_ivf(index) is not None:
+            return index_quantization(index) == self.quantization
+        return index_quantization(index) == ("sq8" if self.quantization else None)
+
+    def _configure_index(self, index):
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = self.nprobe
+            if ivf.direct_map.type == faiss.DirectMap.NoMap:
+                ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+    def add_to_memory(self, text, importance=1.0, speaker=None):
+        """
+        Adds a new piece of text to the memory. Returns immediately; embedding happens in the background.
+        A text that is already in memory refreshes that entry's time instead of being stored again.
+        :param importance: How much this memory is worth keeping, relative to the default of 1.0.
+        :param speaker: Who said it; defaults to the "Name:" the text starts with, if any.
+        """
+        embedding, entry_id = self.cache.get(text)
+        with self._indexed:
+            existing = self.entries.get(entry_id) if entry_id is not None else None
+            if existing:
+                update = {"touch": entry_id, "time": time.time(), "importance": max(importance, existing["importance"])}
+                self.entries.touch(entry_id, update["time"], update["importance"])
+                self.duplicate_count += 1
+                # Queued so the store is only ever written from the worker
+                self._submitted_count += 1
+                self._pending.put(update)
+                return
+            entry = {"id": self._next_id, "text": text, "time": time.time(), "importance": importance,
+                     "speaker": speaker or speaker_of(text)}
+            self._next_id += 1
+            self.entries.append(entry["id"], text, entry["time"], importance, entry["speaker"])
+            self._submitted_count += 1
+            self._pending.put((entry, embedding))
+
+    def _next_batch(self):
+        """Blocks for the next micro-batch of pending entries, flushing the store while idle."""
+        while True:
+            try:
+                return [self._pending.get(timeout=self.store.flush_interval if self.store else None)]
+            except queue.Empty:
+                with self._store_lock:
+                    self.store.maybe_flush()
+
+    def _embedding_loop(self):
+        """
+        Collects pending texts into micro-batches and adds their embeddings to the index in order.
+        A batch that fails is dropped and still counted as done, so flush() doesn't wait on it forever.
+        """
+        self._maybe_upgrade_index()
+        while True:
+            batch, done = [], self._indexed_count
+            try:
+                batch = self._next_batch()
+                deadline = time.time() + self.batch_window
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.time()
+                    try:
+                        batch.append(self._pending.get(timeout=remaining) if remaining > 0 else self._pending.get_nowait())
+                    except queue.Empty:
+                        break
+                self._add_batch(batch)
+            except Exception as e:
+                print(f"Error adding to memory: {e}")
+                with self._indexed:
+                    # Entries that never reached the index are lost, so they mustn't linger in memory
+                    self.entries.remove([item[0]["id"] for item in batch
+                                         if isinstance(item, tuple) and item[0]["id"] > self._newest_indexed_id])
+                    self._indexed_count = max(self._indexed_count, done + len(batch))
+                    self._indexed.notify_all()
+
+    def _add_batch(self, batch):
+        """Logs, embeds and indexes a batch of pending entries and refreshes, then evicts and checkpoints as due."""
+        touches = [item for item in batch if isinstance(item, dict)]
+        entries = [entry for entry, _ in (item for item in batch if isinstance(item, tuple))]
+        embeddings = self._embed([item for item in batch if isinstance(item, tuple)])
+        if self.store:
+            # Logged before it becomes searchable, so flush() also means written
+            with self._store_lock:
+                if entries: self.store.append(entries, embeddings)
+                for update in touches:
+                    self.store.touch(update["touch"], update["time"], update["importance"])
+        with self._indexed:
+            evicted = []
+            if entries:
+                ids = np.array([entry["id"] for entry in entries], dtype='int64')
+                self.index.add_with_ids(embeddings, ids)
+                if self._index_changes is not None: self._index_changes.append((ids, embeddings))
+                for entry in entries:
+                    self.keywords.add(entry["id"], entry["text"])
+                self._newest_indexed_id = entries[-1]["id"]
+                self._indexed_rows += len(entries)
+                evicted = self._evict(entries[-1]["id"])
+            self._indexed_count += len(batch)
+            self._indexed.notify_all()
+        if self.store and evicted:
+            with self._store_lock:
+                self.store.evict(evicted)
+        self._maybe_upgrade_index()
+        if self.store and time.time() - self._last_checkpoint >= self.checkpoint_interval:
+            # Only this worker modifies the index, so it can be saved without blocking searches
+            with self._store_lock:
+                self._checkpoint()
+            self._last_checkpoint = time.time()
+
+    def _checkpoint(self):
+        """
+        Saves the index with the entries and keywords it covers, in bulk so a restart needn't
+        replay the log. Must be called from the worker or with self._indexed held, and with
+        self._store_lock held.
+        """
+        with self._indexed:
+            # Entries still waiting to be embedded aren't in the log yet
+            state = self.entries.state(max_id=self._newest_indexed_id)
+        state.update(self.keywords.state())
+        state["next_id"] = np.array(self._newest_indexed_id + 1)
+        self._indexed_rows = self.store.checkpoint(self.index, self._indexed_rows, state)
+
+    def _embed(self, items):
+        """
+        Returns the embeddings for (entry, cached embedding) pairs, encoding each
+        distinct uncached text once and caching the results.
+        """
+        embeddings = np.zeros((len(items), self.dimension), dtype='float32')
+        missing, encoded = {}, None
+        for row, (entry, embedding) in enumerate(items):
+            if embedding is not None:
+                embeddings[row] = embedding
+            else:
+                missing.setdefault(entry["text"], []).append(row)
+        if missing:
+            try:
+                encoded = np.asarray(self.model.encode(list(missing)), dtype='float32')
+            except Exception as e:
+                # Zero vectors keep the logged vectors row for row with their entries
+                print(f"Error embedding memory: {e}")
+                encoded = None
+            if encoded is not None:
+                for vector, rows in zip(encoded, missing.values()):
+                    embeddings[rows] = vector
+        for row, (entry, _) in enumerate(items):
+            if encoded is not None or entry["text"] not in missing:
+                self.cache.put(entry["text"], embeddings[row], entry["id"])
+        return embeddings
+
+    def _evict(self, newest_indexed_id):
+        """
+        Drops the lowest-scoring memories once there are more than max_entries,
+        making room for a tenth more so eviction doesn't run on every batch. A
+        memory's score is its importance, halved every half_life_days.
+        Must be called with self._indexed held.
+        :return: The ids of the evicted entries.
+        """
+        if not self.max_entries or len(self.entries) <= self.max_entries:
+            return []
+        ids, times, importance = self.entries.columns()
+        # Entries still waiting to be embedded aren't in the index yet, so leave them alone
+        indexed = ids <= newest_indexed_id
+        ids, times, importance = ids[indexed], times[indexed], importance[indexed]
+        count = min(len(ids), len(self.entries) - int(self.max_entries * 0.9))
+        if count <= 0:
+            return []
+        scores = importance * 0.5 ** ((time.time() - times) / self.half_life)
+        # A stable sort evicts the oldest first among equal scores
+        victims = ids[np.argsort(scores, kind='stable')[:count]]
+        self.index.remove_ids(victims)
+        if self._index_changes is not None: self._index_changes.append((victims, None))
+        self.entries.remove(victims)
+        self.keywords.remove(len(victims))
+        if self.keywords.stale > len(self.entries):
+            self.keywords.prune(self.entries.contains)
+        return victims.tolist()
+
+    def _maybe_upgrade_index(self):
+        """Starts building an IVF index to replace the exact one once it holds ann_threshold entries."""
+        if not self.ann_threshold or self._index_changes is not None or self.index.ntotal < self.ann_threshold \
+                or faiss.try_extract_index_ivf(self.index) is not None:
+            return
+        # Only this worker modifies the index, so it can be copied without blocking searches
+        vectors = self.index.index.reconstruct_n(0, self.index.ntotal)
+        ids = faiss.vector_to_array(self.index.id_map).astype('int64')
+        with self._indexed:
+            self._index_changes = []
+        threading.Thread(target=self._build_ivf_index, args=(vectors, ids), daemon=True).start()
+
+    def _build_ivf_index(self, vectors, ids):
+        """
+        Builds the IVF index off the worker, so additions and searches carry on with
+        the exact index meanwhile, then replays what changed since and swaps it in.
+        """
+        start = time.time()
+        try:
+            index = build_ivf_index(vectors, ids, self.quantization)
+        except RuntimeError as e:
+            # Keep the exact index
+            print(f"Error building the approximate memory index: {e}")
+            with self._indexed:
+                self.ann_threshold = None
+                self._index_changes = None
+            return
+        self._configure_index(index)
+        with self._indexed:
+            # Complete before it is published, as the worker may save self.index at any time
+            for ids, embeddings in self._index_changes:
+                if embeddings is None:
+                    index.remove_ids(ids)
+                else:
+                    index.add_with_ids(embeddings, ids)
+            self.index = index
+            self._index_changes = None
+        print(f"Switched memory to an approximate index of {index.ntotal} entries in {time.time() - start:.1f}s.")
+
+    def flush(self, timeout=None):
+        """
+        Waits until every text added so far is searchable.
+        :return: True if the memory caught up, False if the timeout expired first.
+        """
+        with self._indexed:
+            target = self._submitted_count
+            return self._indexed.wait_for(lambda: self._indexed_count >= target, timeout)
+
+    def close(self):
+        """Writes everything added so far to disk and checkpoints the index."""
+        if not self.store: return
+        self.flush(timeout=10)
+        with self._store_lock, self._indexed:
+            self._checkpoint()
+            self.store.close()
+        atexit.unregister(self.close)
+
+    def _embed_queries(self, queries):
+        """Embeds queries through the cache, encoding the uncached ones in a single call."""
+        embeddings = np.zeros((len(queries), self.dimension), dtype='float32')
+        missing = {}
+        for row, query in enumerate(queries):
+            embedding, _ = self.cache.get(query)
+            if embedding is not None:
+                embeddings[row] = embedding
+            else:
+                missing.setdefault(query, []).append(row)
+        if missing:
+            encoded = np.asarray(self.model.encode(list(missing)), dtype='float32')
+            for (query, rows), vector in zip(missing.items(), encoded):
+                embeddings[rows] = vector
+                self.cache.put(query, vector)
+        return embeddings
+
+    def _exact_search(self, embeddings, ids, k):
+        """Scores queries against just the given entries. :return: (distances, ids) shaped like faiss results."""
+        vectors = self.index.reconstruct_batch(ids)
+        distances = (embeddings ** 2).sum(1)[:, None] - 2 * embeddings @ vectors.T + (vectors ** 2).sum(1)[None, :]
+        order = np.argsort(distances, axis=1)[:, :k]
+        found_distances = np.full((len(embeddings), k), np.inf, dtype='float32')
+        found_ids = np.full((len(embeddings), k), -1, dtype='int64')
+        found_distances[:, :order.shape[1]] = np.take_along_axis(distances, order, axis=1)
+        found_ids[:, :order.shape[1]] = ids[order]
+        return found_distances, found_ids
+
+    def _search_index(self, embeddings, k, allowed=None):
+        """Searches the index, restricted to the allowed ids if given."""
+        if allowed is None:
+            return self.index.search(embeddings, k)
+        if len(allowed) <= EXACT_SEARCH_LIMIT:
+            return self._exact_search(embeddings, allowed, k)
+        selector = faiss.IDSelectorBatch(allowed)
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is None:
+            return self.index.search(embeddings, k, params=faiss.SearchParameters(sel=selector))
+        # The nearest clusters may hold none of the allowed entries, so widen the search until they're found
+        nprobe, wanted = self.nprobe, min(k, len(allowed))
+        while True:
+            distances, ids = self.index.search(embeddings, k, params=faiss.SearchParametersIVF(sel=selector, nprobe=nprobe))
+            if nprobe >= ivf.nlist or ((ids >= 0).sum(axis=1) >= wanted).all():
+                return distances, ids
+            nprobe *= 4
+
+    def _searchable(self, ids):
+        """Keeps the ids of entries that are still in memory and already indexed."""
+        return ids[self.entries.contains(ids) & (ids <= self._newest_indexed_id)]
+
+    def search(self, queries, k=5, keywords=None, speaker=None, since=None, until=None):
+        """
+        Finds the memories most relevant to each of several queries, encoding and
+        searching them together. Everything added before this call is taken into account.
+        :param queries: A list of query texts.
+        :param k: The most results returned per query.
+        :param keywords: Words that every result must contain.
+        :param speaker: Only return what this speaker said, e.g. "User".
+        :param since: Only return memories added at or after this Unix time.
+        :param until: Only return memories added at or before this Unix time.
+        :return: For each query, a list of result dicts (id, text, time, importance,
+                 speaker, distance), best first.
+        """
+        # Encode the queries while the worker catches up on earlier texts
+        embeddings = self._embed_queries(queries)
+        if not self.flush(self.search_timeout):
+            print("Memory is still catching up; searching what has been indexed so far.")
+
+        with self._indexed:
+            hits = [[] for _ in queries]
+            if self.index.ntotal == 0:
+                return hits
+            allowed = None
+            if speaker is not None or since is not None or until is not None:
+                allowed = self.entries.select(speaker, since, until)
+            if keywords:
+                matches = self.keywords.lookup([keywords] if isinstance(keywords, str) else keywords)
+                allowed = matches if allowed is None else np.intersect1d(allowed, matches)
+            if allowed is not None:
+                allowed = self._searchable(allowed)
+                if len(allowed) == 0:
+                    return hits
+
+            # A rare word in a query narrows it to the entries containing that word
+            dense = list(range(len(queries)))
+            max_frequency = int(len(self.entries) * self.keyword_fraction)
+            if max_frequency:
+                for row, query in enumerate(queries):
+                    words = self.keywords.distinctive_words(query, max_frequency)
+                    if not words: continue
+                    candidates = self._searchable(self.keywords.lookup(words, match_all=False))
+                    if allowed is not None:
+                        candidates = np.intersect1d(candidates, allowed)
+                    if len(candidates):
+                        distances, ids = self._exact_search(embeddings[row:row + 1], candidates, k)
+                        hits[row] = [(d, i) for d, i in zip(distances[0], ids[0]) if i >= 0]
+                    if len(hits[row]) == k:
+                        dense.remove(row)
+
+            if dense:
+                # Queries without enough keyword matches are topped up from one search of everything allowed
+                distances, ids = self._search_index(embeddings[dense], k, allowed)
+                for position, row in enumerate(dense):
+                    seen = {i for _, i in hits[row]}
+                    extra = [(d, i) for d, i in zip(distances[position], ids[position]) if i >= 0 and i not in seen]
+                    hits[row] = sorted(hits[row] + extra[:k - len(hits[row])])
+
+            results = []
+            for row_hits in hits:
+                results.append([])
+                for distance, entry_id in row_hits:
+                    entry = self.entries.get(int(entry_id))
+                    if entry:
+                        entry["distance"] = float(distance)
+                        results[-1].append(entry)
+            return results
 
     def find_relevant_context(self, query, k=1):
         """
         Finds the most relevant piece of past conversation.
+        Everything added before this call is taken into account.
         :param query: The user's current input.
-        :param k: The number of results to return.
+        :param k: The number of results to consider.
         :return: The most similar text from history, or None.
         """
-        if self.index.ntotal == 0:
-            return None
-
-        query_embedding = self.model.encode([query])
-        distances, indices = self.index.search(query_embedding, k)
-
-        if len(indices) > 0:
-            # Get the index of the best match
-            best_match_index = indices[0][0]
-            return self.conversation_history[best_match_index]
-
-        return None
+        results = self.search([query], k)[0]
+        return results[0]["text"] if results else None
 
 if __name__ == '__main__':
     memory = MemoryManager()
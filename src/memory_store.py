@@ -0,0 +1,323 @@
+import array
+import json
+import os
+import time
+import faiss
+import numpy as np
+
+class MemoryStore:
+    """
+    Keeps conversation memory on disk so it survives restarts.
+
+    The directory holds:
+      - entries.jsonl: an append-only log of texts and their metadata
+      - vectors.f32: an append-only file of the raw float32 embeddings, row for row
+      - updates.jsonl: later changes to entries - evictions, and repeats that refreshed an entry
+      - index-<count>.faiss + checkpoint.json: the search index as of the last checkpoint
+      - state-<count>.npz: the entries and keyword postings as of the checkpoint, as arrays
+
+    On load the checkpointed index is memory-mapped, the saved state is read in bulk
+    and only the entries, vectors and updates logged after the checkpoint are parsed
+    and replayed, so nothing needs to be re-encoded. Appends are fsynced at
+    most flush_interval seconds apart, which bounds what a crash can lose.
+
+    Once evicted rows and updates make up more than compact_fraction of the log,
+    the next checkpoint rewrites the live rows into a new generation of the three
+    files (entries-<n>.jsonl and so on) and drops the old ones. The checkpoint
+    names the generation it belongs to, so a crash mid-way leaves the old one in use.
+    """
+    def __init__(self, directory, dimension, flush_interval=5.0, compact_fraction=0.5):
+        """
+        :param compact_fraction: The share of dead records (evicted rows and updates) in the log that triggers
+                                 compaction at the next checkpoint; None never compacts.
+        """
+        self.directory = directory
+        self.dimension = dimension
+        self.flush_interval = flush_interval
+        self.compact_fraction = compact_fraction
+        self.checkpoint_file = os.path.join(directory, "checkpoint.json")
+        os.makedirs(directory, exist_ok=True)
+        self._use_generation(self._read_checkpoint().get("generation", 0))
+        self._entries_out = None
+        self._vectors_out = None
+        self._updates_out = None
+        self._last_flush = time.time()
+        self._dirty = False
+        self._checkpoint_count = None
+        self._log_ids = array.array('q') # The entry id of each row, for saving with the state
+        self.rows = 0 # Rows in the log, live or evicted
+        self.dead = 0 # Evicted rows and update records, which compaction drops
+
+    def _log_files(self, generation):
+        """The entries, vectors and updates files of a generation of the log."""
+        suffix = f"-{generation}" if generation else ""
+        return tuple(os.path.join(self.directory, f"{name}{suffix}{extension}")
+                     for name, extension in (("entries", ".jsonl"), ("vectors", ".f32"), ("updates", ".jsonl")))
+
+    def _use_generation(self, generation):
+        self.generation = generation
+        self.entries_file, self.vectors_file, self.updates_file = self._log_files(generation)
+
+    def load(self, use_state=True):
+        """
+        Reads the memory back from disk, dropping any half-written tail left by a crash.
+        If the checkpoint saved the entries and keywords in bulk, only the log written
+        after it is parsed.
+        :param use_state: False to ignore the saved state and read the whole log.
+        :return: (entries, vectors, index, indexed_count, evicted, state) where vectors is a
+                 read-only memory map of all embeddings, index covers the first
+                 indexed_count of them (None if there is no checkpoint yet), evicted
+                 is the set of entry ids that have since been dropped and state holds
+                 the arrays saved with the checkpoint, plus the id of every row as
+                 "log_ids". With a state, entries are only the rows after indexed_count;
+                 without one (None), they are all the rows. Refreshes are already
+                 applied to the entries and the state.
+        """
+        checkpoint = self._read_checkpoint()
+        state = self._read_state(checkpoint) if use_state else None
+        if state is not None:
+            start_row = checkpoint["count"]
+            entries, vectors, evicted, touched, updates = self._read_log(start_row, checkpoint["entries_bytes"], checkpoint["updates_bytes"])
+            if len(vectors) < start_row:
+                return self.load(use_state=False) # The log is shorter than the checkpoint says
+            rows = np.searchsorted(state["ids"], list(touched))
+            for row, (entry_id, update) in zip(rows.tolist(), touched.items()):
+                if row < len(state["ids"]) and state["ids"][row] == entry_id:
+                    state["times"][row], state["importance"][row] = update["time"], update["importance"]
+            tail_ids = [entry.get("id", row) for row, entry in enumerate(entries, start_row)]
+            state["log_ids"] = np.concatenate([state["log_ids"], np.array(tail_ids, dtype='int64')])
+            self.dead = checkpoint["dead"] + len(evicted) + updates
+        else:
+            start_row = 0
+            entries, vectors, evicted, _, updates = self._read_log()
+            self.dead = len(evicted) + updates
+        self.rows = len(vectors)
+        self._log_ids = array.array('q')
+        if state is not None:
+            self._log_ids.frombytes(state["log_ids"].tobytes())
+        else:
+            self._log_ids.extend(entry.get("id", row) for row, entry in enumerate(entries))
+
+        index, indexed_count = None, 0
+        index_file = os.path.join(self.directory, checkpoint.get("index", ""))
+        if checkpoint and os.path.exists(index_file) and checkpoint["count"] <= len(vectors):
+            index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP)
+            if faiss.try_extract_index_ivf(index) is not None:
+                # Memory-mapped inverted lists are read-only, so entries could not be added or removed
+                index = faiss.read_index(index_file)
+            indexed_count = self._checkpoint_count = checkpoint["count"]
+        return entries, vectors, index, indexed_count, evicted, state
+
+    def _read_state(self, checkpoint):
+        """The arrays saved with a checkpoint, or None if it has none that fit the log."""
+        state_file = os.path.join(self.directory, checkpoint.get("state", ""))
+        if not checkpoint.get("state") or not os.path.exists(state_file) or checkpoint.get("generation", 0) != self.generation:
+            return None
+        try:
+            with np.load(state_file, allow_pickle=False) as saved:
+                state = dict(saved)
+        except (OSError, ValueError) as e:
+            print(f"Error reading the saved memory state, reading the whole log instead: {e}")
+            return None
+        return state if len(state.get("log_ids", ())) == checkpoint["count"] else None
+
+    def _read_log(self, start_row=0, entries_offset=0, updates_offset=0):
+        """
+        Reads the entries, vectors and updates files, cutting off any torn tail.
+        :param start_row: The row to start reading entries at, entries_offset bytes into the entries file.
+        :param updates_offset: Where to start reading the updates file.
+        :return: (entries, vectors, evicted, touched, updates): the entries from start_row on, a map
+                 of all the vectors, the ids evicted, the latest refresh of each refreshed id
+                 and the number of update records read.
+        """
+        entries, offsets = [], [entries_offset]
+        if os.path.exists(self.entries_file):
+            with open(self.entries_file, "rb") as f:
+                f.seek(entries_offset)
+                for line in f:
+                    if not line.endswith(b"\n"): break # A torn final line from an interrupted write
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break
+                    offsets.append(offsets[-1] + len(line))
+
+        row_bytes = self.dimension * 4
+        rows = os.path.getsize(self.vectors_file) // row_bytes if os.path.exists(self.vectors_file) else 0
+        count = min(start_row + len(entries), rows)
+        entries = entries[:max(count - start_row, 0)]
+        # Cut both logs back to the last entry that has a vector, and vice versa
+        for path, size in ((self.entries_file, offsets[len(entries)]), (self.vectors_file, count * row_bytes)):
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+        vectors = np.memmap(self.vectors_file, dtype='float32', mode='r', shape=(count, self.dimension)) if count else np.zeros((0, self.dimension), dtype='float32')
+
+        evicted, touched, updates = set(), {}, 0
+        if os.path.exists(self.updates_file):
+            with open(self.updates_file, "r+b") as f:
+                f.seek(updates_offset)
+                valid = updates_offset
+                for line in f:
+                    if not line.endswith(b"\n"): break
+                    try:
+                        update = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    valid += len(line)
+                    updates += 1
+                    if "evict" in update:
+                        evicted.update(update["evict"])
+                    elif "touch" in update:
+                        touched[update["touch"]] = update
+                f.truncate(valid) # So later updates aren't appended to a torn line
+        if touched:
+            for row, entry in enumerate(entries, start_row):
+                update = touched.get(entry.get("id", row))
+                if update:
+                    entry["time"], entry["importance"] = update["time"], update["importance"]
+        return entries, vectors, evicted, touched, updates
+
+    def _read_checkpoint(self):
+        if not os.path.exists(self.checkpoint_file):
+            return {}
+        try:
+            with open(self.checkpoint_file, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return {}
+
+    def append(self, entries, embeddings):
+        """Appends entries and their embeddings, flushing to disk if the flush interval has passed."""
+        if self._entries_out is None:
+            self._entries_out = open(self.entries_file, "a", encoding="utf-8")
+            self._vectors_out = open(self.vectors_file, "ab")
+        for entry in entries:
+            self._entries_out.write(json.dumps(entry) + "\n")
+        self._vectors_out.write(np.ascontiguousarray(embeddings, dtype='float32').tobytes())
+        self._log_ids.extend(entry["id"] for entry in entries)
+        self.rows += len(entries)
+        self._dirty = True
+        self.maybe_flush()
+
+    def _write_update(self, update):
+        if self._updates_out is None:
+            self._updates_out = open(self.updates_file, "a", encoding="utf-8")
+        self._updates_out.write(json.dumps(update) + "\n")
+        self.dead += 1
+        self._dirty = True
+        self.maybe_flush()
+
+    def evict(self, ids):
+        """Records that entries were dropped from memory."""
+        self._write_update({"evict": list(ids)})
+        self.dead += len(ids)
+
+    def touch(self, entry_id, timestamp, importance):
+        """Records that an entry was seen again, with its new time and importance."""
+        self._write_update({"touch": entry_id, "time": timestamp, "importance": importance})
+
+    def maybe_flush(self):
+        if self._dirty and time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Forces appended entries and vectors onto disk."""
+        if self._dirty:
+            for f in (self._entries_out, self._vectors_out, self._updates_out):
+                if f is None: continue
+                f.flush()
+                os.fsync(f.fileno())
+        self._dirty = False
+        self._last_flush = time.time()
+
+    def checkpoint(self, index, count, state=None):
+        """
+        Writes the index covering the first count entries and points the checkpoint at it.
+        Each checkpoint gets a new file because the previous one may still be memory-mapped.
+        The log is compacted first if enough of it is dead, which renumbers the rows.
+        :param state: Arrays describing the entries as of the index (see load()), saved alongside
+                      it so a restart needn't parse the log. Only kept if count covers the whole log.
+        :return: The number of rows the index now covers: count, or the live rows after compaction.
+        """
+        self.flush()
+        if self.compact_fraction is not None and count == self.rows and self.dead > self.compact_fraction * self.rows:
+            return self._compact(index, state)
+        if count == self._checkpoint_count:
+            return count # Nothing new, and the current file may be mapped
+        self._write_checkpoint(index, count, f"index-{count}.faiss", state if count == self.rows else None)
+        return count
+
+    def _write_checkpoint(self, index, count, index_name, state=None):
+        faiss.write_index(index, os.path.join(self.directory, index_name))
+        checkpoint = {"count": count, "index": index_name, "generation": self.generation, "time": time.time()}
+        if state is not None:
+            checkpoint["state"] = "state" + index_name[len("index"):-len(".faiss")] + ".npz"
+            with open(os.path.join(self.directory, checkpoint["state"]), "wb") as f:
+                np.savez(f, log_ids=np.array(self._log_ids, dtype='int64'), **state)
+                f.flush()
+                os.fsync(f.fileno())
+            checkpoint["dead"] = self.dead
+            # Where the log continues after the rows and updates the state covers
+            checkpoint["entries_bytes"], checkpoint["updates_bytes"] = [
+                os.path.getsize(path) if os.path.exists(path) else 0 for path in (self.entries_file, self.updates_file)]
+        with open(self.checkpoint_file + ".tmp", "w") as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.checkpoint_file + ".tmp", self.checkpoint_file)
+        self._checkpoint_count = count
+        for name in os.listdir(self.directory):
+            if name.startswith(("index-", "state-")) and name not in (index_name, checkpoint.get("state")):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass # Still mapped (on Windows); removed after a later checkpoint
+
+    def _compact(self, index, state=None):
+        """
+        Rewrites the live rows, with their updates applied, into the next generation
+        of the log and checkpoints the index against it. The index must cover every
+        row and already be without the evicted ones.
+        :return: The number of live rows.
+        """
+        self.close()
+        entries, vectors, evicted, _, _ = self._read_log()
+        live = [row for row, entry in enumerate(entries) if entry.get("id", row) not in evicted]
+        generation = self.generation + 1
+        entries_file, vectors_file, updates_file = self._log_files(generation)
+        with open(entries_file, "w", encoding="utf-8") as f:
+            for row in live:
+                entry = entries[row]
+                entry["id"] = entry.get("id", row) # Rows are renumbered, ids must not be
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        with open(vectors_file, "wb") as f:
+            for start in range(0, len(live), 65536):
+                f.write(np.ascontiguousarray(vectors[live[start:start + 65536]]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        del vectors # Unmapped before the old file is removed
+        self._use_generation(generation)
+        self.rows, self.dead = len(live), 0
+        self._log_ids = array.array('q', (entries[row]["id"] for row in live))
+        # Named apart from earlier checkpoints of the same size, which may still be mapped
+        self._write_checkpoint(index, len(live), f"index-{len(live)}-g{generation}.faiss", state)
+        current = {os.path.basename(path) for path in (self.entries_file, self.vectors_file, self.updates_file)}
+        for name in os.listdir(self.directory):
+            # Earlier generations, including any left behind by a crash during compaction
+            if name.startswith(("entries", "vectors", "updates")) and name not in current:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        print(f"Compacted the memory log to {len(live)} entries.")
+        return len(live)
+
+    def close(self):
+        self.flush()
+        for f in (self._entries_out, self._vectors_out, self._updates_out):
+            if f is not None: f.close()
+        self._entries_out = self._vectors_out = self._updates_out = None
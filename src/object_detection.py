@@ -0,0 +1,103 @@
+import os
+import shutil
+from ultralytics import YOLO
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+
+class Detection:
+    """A single detected object with its class name, confidence and (x1, y1, x2, y2) box."""
+    def __init__(self, name, confidence, box):
+        self.name = name
+        self.confidence = confidence
+        self.box = box
+
+    def __repr__(self):
+        return f"Detection({self.name!r}, {self.confidence:.2f})"
+
+def export_model(model_path="yolov8n.pt", backend="onnx", imgsz=640, int8=False, calibration_data=None):
+    """
+    Exports a YOLO model for CPU inference and returns the path of the exported model.
+    Exports are cached next to the source model, keyed by backend, input size and precision.
+    """
+    if backend == "pytorch":
+        return model_path
+
+    stem, _ = os.path.splitext(model_path)
+    suffix = f"_{imgsz}" + ("_int8" if int8 else "")
+    if backend == "onnx":
+        target = f"{stem}{suffix}.onnx"
+    elif backend == "openvino":
+        target = f"{stem}{suffix}_openvino_model"
+    else:
+        raise ValueError(f"Unknown detection backend '{backend}'. Choose one of {', '.join(BACKENDS)}.")
+    if os.path.exists(target):
+        return target
+
+    model = YOLO(model_path)
+    if backend == "onnx":
+        exported = model.export(format="onnx", imgsz=imgsz)
+        if int8:
+            # ONNX Runtime quantizes weights to int8 and activations on the fly
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(exported, target, weight_type=QuantType.QUInt8)
+            os.remove(exported)
+            return target
+    else:
+        export_args = {"format": "openvino", "imgsz": imgsz, "int8": int8}
+        if int8 and calibration_data:
+            export_args["data"] = calibration_data
+        exported = model.export(**export_args)
+    shutil.move(exported, target)
+    return target
+
+class ObjectDetector:
+    """
+    Detects objects with YOLO through a selectable CPU backend.
+    The PyTorch model is used as-is; ONNX Runtime and OpenVINO models are
+    exported (and optionally int8-quantized) on first use.
+    """
+    def __init__(self, model_path="yolov8n.pt", backend="pytorch", imgsz=640, int8=False,
+                 classes=None, confidence=0.25, calibration_data=None):
+        """
+        :param backend: "pytorch", "onnx" or "openvino".
+        :param imgsz: The square input size the model runs at; smaller is faster.
+        :param int8: Whether to quantize the exported model to int8.
+        :param classes: Optional list of class names or ids to keep; None keeps all.
+        :param confidence: The minimum confidence for a detection to be reported.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown detection backend '{backend}'. Choose one of {', '.join(BACKENDS)}.")
+        self.backend = backend
+        self.imgsz = imgsz
+        self.confidence = confidence
+        self.model = YOLO(export_model(model_path, backend, imgsz, int8, calibration_data), task="detect")
+        self.names = self.model.names
+        self.class_ids = self._resolve_classes(classes)
+
+    def _resolve_classes(self, classes):
+        """Turns a list of class names and/or ids into the ids YOLO filters on."""
+        if not classes:
+            return None
+        ids_by_name = {name: class_id for class_id, name in self.names.items()}
+        class_ids = []
+        for cls in classes:
+            if isinstance(cls, int):
+                class_ids.append(cls)
+            elif cls in ids_by_name:
+                class_ids.append(ids_by_name[cls])
+            else:
+                print(f"Unknown object class '{cls}' ignored.")
+        return class_ids or None
+
+    def detect(self, frame):
+        """Returns the list of Detections found in a BGR frame."""
+        results = self.model(frame, imgsz=self.imgsz, conf=self.confidence, classes=self.class_ids, verbose=False)
+        detections = []
+        for r in results:
+            for cls, conf, box in zip(r.boxes.cls, r.boxes.conf, r.boxes.xyxy):
+                detections.append(Detection(self.names[int(cls)], float(conf), tuple(float(v) for v in box)))
+        return detections
+
+    def detect_names(self, frame):
+        """Returns the sorted, unique names of the objects found in a frame."""
+        return sorted(set(detection.name for detection in self.detect(frame)))
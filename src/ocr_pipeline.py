@@ -0,0 +1,168 @@
+import collections
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+import pytesseract
+
+def sharpness(frame):
+    """Scores how sharp a frame is by the variance of its Laplacian; blurrier frames score lower."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.Laplacian(gray, cv2.CV_64F).var()
+
+def perceptual_hash(frame, hash_size=8, min_step=2.0):
+    """
+    Computes a 64-bit difference hash: neighbouring pixels of a tiny grayscale
+    thumbnail are compared, so small shifts, noise and lighting changes keep
+    most bits the same. Steps smaller than min_step count as flat, so sensor
+    noise on blank paper doesn't flip bits.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    thumbnail = cv2.resize(gray.astype(np.float32), (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (thumbnail[:, 1:] - thumbnail[:, :-1] > min_step).flatten()
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+def page_thumbnail(frame, size=(128, 64)):
+    """A grayscale thumbnail large enough to show the words of a page, for telling apart pages that hash alike."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+def thumbnail_similarity(a, b, margin=4):
+    """
+    The normalized correlation of two page thumbnails at their best alignment within
+    margin pixels, so a page moved slightly in view still scores close to 1.
+    """
+    return float(cv2.matchTemplate(a, b[margin:-margin, margin:-margin], cv2.TM_CCOEFF_NORMED).max())
+
+def find_text_regions(gray, min_area=400):
+    """
+    Locates blocks of text by their dense edges.
+    :return: A list of rotated rectangles ((cx, cy), (w, h), angle), in reading order.
+    """
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, kernel)
+    _, binary = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    # Join characters into lines, then lines into blocks
+    line_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(9, gray.shape[1] // 40), 3))
+    connected = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, line_kernel)
+    connected = cv2.dilate(connected, cv2.getStructuringElement(cv2.MORPH_RECT, (3, max(5, gray.shape[0] // 60))))
+    contours, _ = cv2.findContours(connected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    regions = []
+    for contour in contours:
+        rect = cv2.minAreaRect(contour)
+        (w, h) = rect[1]
+        if w * h < min_area or min(w, h) < 8:
+            continue
+        regions.append(rect)
+    regions.sort(key=lambda rect: (round(rect[0][1] / 20), rect[0][0]))
+    return regions
+
+def deskew_region(gray, rect, padding=6):
+    """Rotates a rotated-rectangle region upright and crops it out of the image."""
+    (cx, cy), (w, h), angle = rect
+    # minAreaRect angles are ambiguous by 90 degrees; keep text lines horizontal
+    if w < h:
+        w, h = h, w
+        angle -= 90
+    rotation = cv2.getRotationMatrix2D((cx, cy), angle, 1.0)
+    rotated = cv2.warpAffine(gray, rotation, (gray.shape[1], gray.shape[0]), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+    return cv2.getRectSubPix(rotated, (int(w) + padding * 2, int(h) + padding * 2), (cx, cy))
+
+def text_regions(gray):
+    """Returns the deskewed text blocks of a grayscale image, or the whole image if none are found."""
+    regions = [deskew_region(gray, rect) for rect in find_text_regions(gray)]
+    return regions or [gray]
+
+def ocr_region(region, config="--psm 6"):
+    """Binarizes a grayscale region with its own Otsu threshold and runs Tesseract on it."""
+    _, binary = cv2.threshold(region, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    return pytesseract.image_to_string(binary, config=config).strip()
+
+class OCRCache:
+    """
+    A small LRU cache of OCR results keyed by perceptual hash, matched within a
+    Hamming distance. The hash only captures a page's layout, so a near match is
+    confirmed by comparing page thumbnails before its text is returned.
+    """
+    def __init__(self, max_entries=32, max_distance=6, min_similarity=0.85):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.min_similarity = min_similarity
+        self._entries = collections.OrderedDict() # hash -> (thumbnail, text)
+        self._lock = threading.Lock()
+
+    def get(self, image_hash, thumbnail):
+        with self._lock:
+            for key, (cached_thumbnail, text) in self._entries.items():
+                if hamming_distance(key, image_hash) <= self.max_distance \
+                        and thumbnail_similarity(cached_thumbnail, thumbnail) >= self.min_similarity:
+                    self._entries.move_to_end(key)
+                    return text
+        return None
+
+    def put(self, image_hash, thumbnail, text):
+        with self._lock:
+            self._entries[image_hash] = (thumbnail, text)
+            self._entries.move_to_end(image_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class OCRPipeline:
+    """
+    Reads text from the camera: picks the sharpest of a burst of frames, finds and
+    deskews text blocks, OCRs the blocks in parallel and caches results so the same
+    page is not read twice.
+    """
+    def __init__(self, burst_size=5, workers=4, cache_size=32, hash_distance=6, min_similarity=0.85,
+                 tesseract_config="--psm 6"):
+        """
+        :param burst_size: How many consecutive frames to choose the sharpest from.
+        :param workers: How many Tesseract processes may run at once. Tesseract runs
+                        as a subprocess, so threads are enough to use several cores.
+        :param hash_distance: Pages whose hashes differ in at most this many bits may be the same.
+        :param min_similarity: How closely such pages' thumbnails must correlate to count as the same.
+        """
+        self.burst_size = burst_size
+        self.tesseract_config = tesseract_config
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.cache = OCRCache(cache_size, hash_distance, min_similarity)
+
+    def capture_best_frame(self, camera, timeout=1.0):
+        """Collects a burst of new frames from a frame source and returns the sharpest, or None."""
+        _, _, sequence = camera.get_latest()
+        best_frame, best_score = None, -1.0
+        for _ in range(self.burst_size):
+            frame, _, sequence = camera.wait_for_frame(sequence, timeout)
+            if frame is None: break
+            score = sharpness(frame)
+            if score > best_score:
+                best_frame, best_score = frame, score
+        if best_frame is None:
+            success, frame = camera.read()
+            best_frame = frame if success else None
+        return best_frame
+
+    def read_text(self, frame):
+        """Returns the text found in a frame, using the cache when the same page was read before."""
+        image_hash, thumbnail = perceptual_hash(frame), page_thumbnail(frame)
+        cached = self.cache.get(image_hash, thumbnail)
+        if cached is not None:
+            return cached
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        texts = self.executor.map(functools.partial(ocr_region, config=self.tesseract_config), text_regions(gray))
+        text = "\n".join(t for t in texts if t)
+        self.cache.put(image_hash, thumbnail, text)
+        return text
+
+    def read_from_camera(self, camera):
+        """Captures the sharpest frame of a burst and reads its text. Returns None if no frame was captured."""
+        frame = self.capture_best_frame(camera)
+        if frame is None:
+            return None
+        return self.read_text(frame)
@@ -0,0 +1,249 @@
+import re
+import threading
+import numpy as np
+import torch
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, TextStreamer
+from .keyword_index import WORD_PATTERN
+from .model_optimization import optimize_model
+
+SUMMARIZATION_MODEL = "sshleifer/distilbart-cnn-12-6"
+SUMMARY_MODES = ("abstractive", "extractive")
+# A run of text up to sentence-ending punctuation (and any closing quotes), or to the end
+SENTENCE_PATTERN = re.compile(r"\S.*?(?:[.!?]+[\"')\]]*(?=\s|$)|$)", re.S)
+# TextRank compares every pair of sentences, so longer texts are first narrowed to this many
+MAX_RANKED_SENTENCES = 1000
+
+QUICK_WORDS = {"quick", "quickly", "brief", "briefly", "fast", "gist"}
+DETAILED_WORDS = {"detail", "detailed", "full", "fully", "thorough", "properly"}
+
+def requested_mode(command):
+    """:return: The summary mode a command asks for ("summarize it quickly", "in detail"), or None."""
+    words = set(WORD_PATTERN.findall(command.lower()))
+    if words & DETAILED_WORDS:
+        return "abstractive"
+    if words & QUICK_WORDS:
+        return "extractive"
+    return None
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in SENTENCE_PATTERN.findall(text)]
+
+def tfidf_vectors(sentences):
+    """:return: A unit-length TF-IDF row per sentence, over the words found in more than one sentence."""
+    words = [WORD_PATTERN.findall(sentence.lower()) for sentence in sentences]
+    vocabulary, document_frequency = {}, []
+    for sentence_words in words:
+        for word in set(sentence_words):
+            if word not in vocabulary:
+                vocabulary[word] = len(vocabulary)
+                document_frequency.append(0)
+            document_frequency[vocabulary[word]] += 1
+    document_frequency = np.array(document_frequency, dtype='float32')
+    idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+    # Words in a single sentence add nothing to any similarity, only to that sentence's length
+    shared = np.flatnonzero(document_frequency > 1)
+    columns = np.full(len(vocabulary), -1)
+    columns[shared] = np.arange(len(shared))
+    vectors = np.zeros((len(sentences), len(shared)), dtype='float32')
+    norms = np.zeros(len(sentences), dtype='float32')
+    for row, sentence_words in enumerate(words):
+        if not sentence_words:
+            continue
+        ids, counts = np.unique([vocabulary[word] for word in sentence_words], return_counts=True)
+        weights = counts * idf[ids]
+        norms[row] = np.linalg.norm(weights)
+        kept = columns[ids] >= 0
+        vectors[row, columns[ids[kept]]] = weights[kept]
+    return vectors / np.maximum(norms, 1e-6)[:, None]
+
+def textrank(similarity, damping=0.85, iterations=50, tolerance=1e-6):
+    """PageRank over a sentence similarity graph. :return: A score per sentence."""
+    np.fill_diagonal(similarity, 0)
+    similarity = np.maximum(similarity, 0)
+    weights = similarity / np.maximum(similarity.sum(axis=1, keepdims=True), 1e-6)
+    scores = np.full(len(similarity), 1 / len(similarity), dtype='float32')
+    for _ in range(iterations):
+        updated = (1 - damping) / len(similarity) + damping * (weights.T @ scores)
+        if np.abs(updated - scores).sum() < tolerance:
+            return updated
+        scores = updated
+    return scores
+
+def extractive_summary(text, max_sentences=3, embed=None):
+    """
+    Picks the text's most central sentences with TextRank and returns them in their original order.
+    :param embed: Maps a list of sentences to embedding vectors (e.g. the memory's
+                  sentence encoder); by default sentences are compared by TF-IDF.
+    """
+    sentences = split_sentences(text)
+    if len(sentences) <= max_sentences:
+        return " ".join(sentences)
+    vectors = tfidf_vectors(sentences) if embed is None else np.asarray(embed(sentences), dtype='float32')
+    if embed is not None:
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-6)
+    candidates = np.arange(len(sentences))
+    if len(sentences) > MAX_RANKED_SENTENCES:
+        # The sentences closest to the text as a whole
+        centrality = vectors @ vectors.mean(axis=0)
+        candidates = np.sort(np.argsort(-centrality, kind='stable')[:MAX_RANKED_SENTENCES])
+    scores = textrank(vectors[candidates] @ vectors[candidates].T)
+    chosen = np.sort(candidates[np.argsort(-scores, kind='stable')[:max_sentences]])
+    return " ".join(sentences[i] for i in chosen)
+
+class CallbackStreamer(TextStreamer):
+    """Passes generated text to a callback a word at a time, as generate() produces it."""
+    def __init__(self, tokenizer, on_text):
+        super().__init__(tokenizer, skip_special_tokens=True)
+        self.on_text = on_text
+
+    def on_finalized_text(self, text, stream_end=False):
+        if text:
+            self.on_text(text)
+
+class Summarizer:
+    """
+    Summarizes text of any length, either abstractively with a sequence-to-sequence
+    model (loaded once, on first use) or extractively by picking key sentences.
+
+    Text longer than the model's input window is split into chunks on sentence
+    boundaries, the chunks are summarized in batches, and their summaries are
+    joined and summarized again, level by level, until they fit in one final pass.
+    """
+    def __init__(self, model_name=SUMMARIZATION_MODEL, optimization=None, batch_size=4, num_beams=None,
+                 mode="abstractive", extractive_sentences=3, embed=None, cache=None, model=None, tokenizer=None):
+        """
+        :param model_name: The Hugging Face model to load, unless a model and tokenizer are given.
+        :param optimization: None for float32, or "int8" for dynamic quantization.
+        :param batch_size: How many chunks are summarized in one generate() call.
+        :param num_beams: Beam width; None keeps the model's own setting (4 for distilbart),
+                          1 decodes greedily, which is several times faster. Streamed summaries
+                          decode greedily unless this is set above 1, in which case they are
+                          beam searched and passed on whole once finished.
+        :param mode: The default summary: "abstractive" writes one with the model, taking
+                     seconds; "extractive" picks out key sentences in milliseconds.
+        :param extractive_sentences: How many sentences an extractive summary keeps.
+        :param embed: Maps sentences to embeddings for extractive scoring; None uses TF-IDF.
+        :param cache: A SummaryCache that keeps abstractive summaries, so the same text
+                      summarized the same way is returned without running the model.
+        """
+        if mode not in SUMMARY_MODES:
+            raise ValueError(f"Unknown summary mode '{mode}'. Use one of {SUMMARY_MODES}.")
+        self.mode = mode
+        self.extractive_sentences = extractive_sentences
+        self.embed = embed
+        self.cache = cache
+        self.model_name = model_name
+        self.optimization = optimization
+        self.batch_size = batch_size
+        self.num_beams = num_beams
+        self.tokenizer = tokenizer
+        self.model = optimize_model(model, optimization) if model is not None else None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self.tokenizer is None:
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        if self.model is None:
+            self.model = optimize_model(AutoModelForSeq2SeqLM.from_pretrained(self.model_name), self.optimization)
+
+    @property
+    def max_input_tokens(self):
+        """The longest input the model takes, less its start and end tokens."""
+        limit = min(self.tokenizer.model_max_length, self.model.config.max_position_embeddings)
+        return limit - 2
+
+    def _chunks(self, sentences):
+        """Packs consecutive sentences into chunks that each fit the model's input."""
+        budget = self.max_input_tokens
+        # Not verbose, as sentences longer than the model takes are expected here
+        lengths = [len(ids) for ids in self.tokenizer(sentences, add_special_tokens=False, verbose=False)["input_ids"]] if sentences else []
+        chunks, current, size = [], [], 0
+        for sentence, length in zip(sentences, lengths):
+            pieces = [(sentence, length)]
+            if length > budget:
+                # Text without punctuation (common from OCR) is cut between words instead
+                words = sentence.split()
+                per_piece = max(1, len(words) * budget // length)
+                pieces = [(" ".join(words[i:i + per_piece]), budget) for i in range(0, len(words), per_piece)]
+            for piece, piece_length in pieces:
+                if current and size + piece_length > budget:
+                    chunks.append(" ".join(current))
+                    current, size = [], 0
+                current.append(piece)
+                size += piece_length
+        if current:
+            chunks.append(" ".join(current))
+        return chunks
+
+    def _streams(self, on_text):
+        """Whether the final summary is streamed as it is generated, which needs greedy decoding."""
+        return on_text is not None and not (self.num_beams and self.num_beams > 1)
+
+    def _generate(self, texts, max_length, min_length, on_text=None):
+        """Summarizes each text, batching texts of similar length together to limit padding."""
+        options = {"max_length": max_length, "min_length": min_length, "do_sample": False}
+        if self.num_beams:
+            options["num_beams"] = self.num_beams
+        if self._streams(on_text):
+            options.update(num_beams=1, streamer=CallbackStreamer(self.tokenizer, on_text))
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        summaries = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            inputs = self.tokenizer([texts[i] for i in batch], truncation=True, max_length=self.max_input_tokens + 2,
+                                    padding=True, return_tensors="pt")
+            output = self.model.generate(**inputs, **options)
+            for i, summary in zip(batch, self.tokenizer.batch_decode(output, skip_special_tokens=True)):
+                summaries[i] = summary.strip()
+        return summaries
+
+    def summarize(self, text, max_length=150, min_length=50, on_text=None, mode=None):
+        """
+        :param max_length: The longest abstractive summary, in tokens.
+        :param min_length: The shortest abstractive summary, in tokens.
+        :param on_text: Called with each new piece of the final summary as it is generated.
+                        Streaming decodes greedily, since beam search only settles on
+                        its output at the end; with num_beams above 1 the summary is
+                        beam searched and on_text gets it in one piece.
+        :param mode: "abstractive" or "extractive"; None for the summarizer's default.
+        :return: The summary.
+        """
+        mode = mode or self.mode
+        if mode not in SUMMARY_MODES:
+            raise ValueError(f"Unknown summary mode '{mode}'. Use one of {SUMMARY_MODES}.")
+        if mode == "extractive":
+            summary = extractive_summary(text, self.extractive_sentences, self.embed)
+            if on_text is not None and summary:
+                on_text(summary)
+            return summary
+        if self.cache is None:
+            return self._abstractive(text, max_length, min_length, on_text)
+        # Streaming decodes greedily, so its summaries differ from beam search's
+        key = self.cache.key(text, model_name=self.model_name, optimization=self.optimization, max_length=max_length,
+                             min_length=min_length, num_beams=1 if self._streams(on_text) else self.num_beams)
+        summary = self.cache.get(key)
+        if summary is not None:
+            if on_text is not None and summary:
+                on_text(summary)
+            return summary
+        summary = self._abstractive(text, max_length, min_length, on_text)
+        if summary:
+            self.cache.put(key, summary)
+        return summary
+
+    @torch.inference_mode()
+    def _abstractive(self, text, max_length, min_length, on_text):
+        with self._lock:
+            self._load()
+            chunks = self._chunks(split_sentences(text))
+            # Summaries of chunks are kept to a quarter of a chunk, so each level shrinks the text
+            chunk_length = min(max_length, self.max_input_tokens // 4)
+            while len(chunks) > 1:
+                summaries = self._generate(chunks, chunk_length, 0)
+                chunks = self._chunks(split_sentences(" ".join(summaries)))
+            if not chunks:
+                return ""
+            summary = self._generate(chunks, max_length, min_length, on_text)[0]
+            if on_text is not None and not self._streams(on_text) and summary:
+                on_text(summary)
+            return summary
@@ -0,0 +1,33 @@
+import hashlib
+import json
+import unicodedata
+from .disk_cache import DiskCache
+
+def normalize(text):
+    """The text as it is keyed: Unicode-normalized, with runs of whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+class SummaryCache(DiskCache):
+    """
+    A size-bounded LRU cache of summaries on disk.
+
+    Entries are keyed by a hash of the normalized input text and everything
+    else that shapes the summary (model, mode, lengths), so the same page or
+    OCR'd text summarized the same way is only run through the model once.
+    """
+    def __init__(self, directory="summary_cache", max_bytes=50 * 2**20):
+        super().__init__(directory, max_bytes, suffix=".txt")
+
+    @staticmethod
+    def key(text, **parameters):
+        """:param parameters: Whatever else the summary depends on, e.g. model_name, mode and max_length."""
+        material = json.dumps({"text": normalize(text), **parameters}, sort_keys=True)
+        return hashlib.blake2b(material.encode("utf-8"), digest_size=20).hexdigest()
+
+    def get(self, key):
+        """:return: The cached summary, or None."""
+        data = super().get(key)
+        return data.decode("utf-8") if data is not None else None
+
+    def put(self, key, summary):
+        super().put(key, summary.encode("utf-8"))
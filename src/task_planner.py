@@ -1,9 +1,15 @@
+from . import web_interaction
+
+SUMMARIZE_STEP = "summarize_web_content" # Followed by the topic; carried out by the planner itself
+
 class TaskPlanner:
     """
     Decomposes a high-level goal into a sequence of executable sub-tasks.
     """
-    def __init__(self, assistant):
+    def __init__(self, assistant, summary_mode="extractive"):
+        """:param summary_mode: How plan steps summarize; extractive keeps multi-step plans quick."""
         self.assistant = assistant
+        self.summary_mode = summary_mode
 
     def create_plan(self, goal):
         """
@@ -20,7 +26,7 @@ class TaskPlanner:
             topic = goal.replace("create a report on", "").strip()
             return [
                 f"search for {topic}",
-                "summarize_web_content", # This will be a new command to trigger summarization
+                f"{SUMMARIZE_STEP} {topic}",
                 f"create document about {topic}"
             ]
 
@@ -33,18 +39,32 @@ class TaskPlanner:
         self.assistant.speak(f"Okay, I'm starting the plan. It has {len(plan)} steps.")
         for i, step in enumerate(plan):
             self.assistant.speak(f"Step {i+1}: {step}")
-            # We will need to enhance process_command to handle this flow
-            # For now, we'll just simulate the action
-            self.assistant.process_command(step)
+            if step.startswith(SUMMARIZE_STEP):
+                self.summarize_sources(step[len(SUMMARIZE_STEP):].strip())
+            else:
+                self.assistant.process_command(step, from_plan=True)
         self.assistant.speak("I have completed the plan.")
 
+    def summarize_sources(self, topic, max_sources=3):
+        """
+        Summarizes the top web sources on a topic into the assistant's last_summary.
+        The sources are fetched at once, so this takes about as long as the slowest one.
+        """
+        urls = web_interaction.find_sources(topic, max_sources)
+        if not urls:
+            self.assistant.speak(f"I couldn't find any sources about {topic}.")
+            return
+        self.assistant.summarize_pages(urls, from_plan=True, mode=self.summary_mode)
+
 if __name__ == '__main__':
     # Example usage
     class MockAssistant:
         def speak(self, text):
             print(f"ASSISTANT: {text}")
-        def process_command(self, command):
+        def process_command(self, command, from_plan=False):
             print(f"Executing: {command}")
+        def summarize_pages(self, urls, from_plan=False, mode=None):
+            print(f"Summarizing: {', '.join(urls)}")
 
     planner = TaskPlanner(MockAssistant())
     my_goal = "create a report on the future of artificial intelligence"
@@ -0,0 +1,34 @@
+import re
+
+# Sentence-ending punctuation, any closing quotes or brackets, then whitespace
+SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+")
+
+class SentenceSplitter:
+    """
+    Collects text as it is generated and hands back each sentence once it is
+    complete, so speech can start before the rest has been written. A sentence
+    only counts as complete once the whitespace after its final punctuation
+    arrives, and very short ones ("Hi.", "e.g.") wait to be joined with the next.
+    """
+    def __init__(self, min_length=12):
+        self.min_length = min_length
+        self._buffer = ""
+
+    def feed(self, text):
+        """
+        Adds the next piece of generated text.
+        :return: The sentences it completed, possibly none.
+        """
+        self._buffer += text
+        sentences, start = [], 0
+        for match in SENTENCE_END.finditer(self._buffer):
+            if match.end() - start >= self.min_length:
+                sentences.append(self._buffer[start:match.end()].strip())
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self):
+        """:return: Whatever text is left once generation has finished, or None."""
+        rest, self._buffer = self._buffer.strip(), ""
+        return rest or None
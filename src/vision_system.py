@@ -1,28 +1,43 @@
 import cv2
+import functools
+import queue
 import threading
 import time
 import face_recognition
 import mediapipe as mp
-from deepface import DeepFace
-import pytesseract
-from ultralytics import YOLO
 from . import face_manager
+from .frame_source import open_frame_source
+from .ocr_pipeline import OCRPipeline
+from .gesture_engine import GestureEngine, GestureEvent, classify_hand
+from .face_detection import FaceDetector, encode_face, classify_emotion
+from .object_detection import ObjectDetector
+from .vision_workers import VisionWorkerPool, load_face_worker, load_object_worker
+
+GESTURE_QUEUE_SIZE = 16
 
 class VisionSystem:
     """
     Manages camera access and processes video frames for various AI tasks.
     """
-    def __init__(self, motion_threshold=500000, presence_timeout=5.0):
+    def __init__(self, motion_threshold=500000, presence_timeout=5.0, use_worker_processes=False,
+                 object_detection=None, camera=None, source=0, gestures=None, ocr=None):
         # ... (init attributes are the same)
         self.is_running = False
         self.camera = None
         self.vision_thread = None
+        # A camera index, video file, image directory or frame source object
+        self.source = source
+        # Keyword arguments for the frame source (index, width, height, fourcc, fps, loop, realtime)
+        self.camera_settings = camera or {}
+        self.last_frame_time = 0.0
         self.user_present = False
         self.last_motion_time = 0
         self.motion_threshold = motion_threshold
         self.presence_timeout = presence_timeout
         self._last_frame = None
         self.face_manager = face_manager.FaceManager()
+        self.face_detector = FaceDetector()
+        self.detected_faces = []
         self.known_face_encodings = []
         self.known_face_names = []
         self.recognized_user = None
@@ -33,16 +48,35 @@ class VisionSystem:
         self.mp_hands = mp.solutions.hands
         self.hands = self.mp_hands.Hands(max_num_hands=1, min_detection_confidence=0.7)
         self.mp_draw = mp.solutions.drawing_utils
-        self.yolo_model = YOLO("yolov8n.pt")
+        # Keyword arguments for GestureEngine, or False to check gestures once per task cycle
+        self.gesture_settings = gestures
+        self.gesture_engine = None
+        # Confirmed gestures waiting for a listener; the oldest are dropped when nobody reads them
+        self.gesture_events = queue.Queue(maxsize=GESTURE_QUEUE_SIZE)
+        # Keyword arguments for OCRPipeline (burst_size, workers, cache_size, ...)
+        self.ocr = OCRPipeline(**(ocr or {}))
+        # Heavy models can run in worker processes to keep them off this process's GIL
+        self.use_worker_processes = use_worker_processes
+        self.worker_pool = None
+        # Keyword arguments for ObjectDetector (backend, imgsz, int8, classes, ...)
+        self.object_detection_settings = object_detection or {}
+        self.object_detector = None if use_worker_processes else ObjectDetector(**self.object_detection_settings)
+        # Tasks that consume the shared face detections of a frame. With worker processes,
+        # recognition and emotion run in the face worker and any others on its boxes here.
+        self.face_tasks = [self._process_recognition, self._process_emotions]
+        self.tasks = [self._process_presence, self._process_faces, self._process_object_detection]
+        if gestures is False:
+            self.tasks.insert(2, self._process_gestures)
 
     def learn_current_user_face(self, name):
         # ... (implementation is the same)
         if not self.camera or not self.camera.isOpened(): return "Camera not available."
         success, frame = self.camera.read()
         if not success: return "Failed to capture image."
-        face_locations = face_recognition.face_locations(frame)
-        if not face_locations: return "No face found."
-        face_encoding = face_recognition.face_encodings(frame, face_locations)[0]
+        faces = self.face_detector.detect(frame)
+        if not faces: return "No face found."
+        face = faces[0]
+        face_encoding = face_recognition.face_encodings(cv2.cvtColor(face.crop, cv2.COLOR_BGR2RGB), [face.location_in_crop])[0]
         self.face_manager.save_face(name, face_encoding)
         self._load_known_faces()
         return f"Learned face for {name}."
@@ -59,8 +93,16 @@ class VisionSystem:
         self._load_known_faces()
         if self.is_running: return
         try:
-            self.camera = cv2.VideoCapture(0)
-            if not self.camera.isOpened(): self.camera = None; return
+            self.camera = open_frame_source(self.source, **self.camera_settings)
+            if not self.camera.open(): self.camera = None; return
+            if self.use_worker_processes and not self.worker_pool:
+                self.worker_pool = VisionWorkerPool({
+                    "faces": load_face_worker,
+                    "objects": functools.partial(load_object_worker, self.object_detection_settings),
+                })
+            if self.gesture_settings is not False:
+                self.gesture_engine = GestureEngine(self.camera, self._on_gesture, **(self.gesture_settings or {}))
+                self.gesture_engine.start()
             self.is_running = True
             self.vision_thread = threading.Thread(target=self._run_loop, daemon=True)
             self.vision_thread.start()
@@ -72,22 +114,22 @@ class VisionSystem:
         # ... (implementation is the same)
         self.is_running = False
         if self.vision_thread: self.vision_thread.join()
+        if self.gesture_engine: self.gesture_engine.stop(); self.gesture_engine = None
+        if self.worker_pool: self.worker_pool.close(); self.worker_pool = None
         if self.camera: self.camera.release(); self.camera = None
         print("Vision system stopped.")
 
     def _run_loop(self):
         """The main loop for capturing and processing camera frames."""
+        last_sequence = 0
         while self.is_running:
             if not self.camera: time.sleep(1); continue
-            success, frame = self.camera.read()
-            if not success: time.sleep(0.1); continue
+            frame, timestamp, last_sequence = self.camera.wait_for_frame(last_sequence)
+            if frame is None: time.sleep(0.1); continue
+            self.last_frame_time = timestamp
 
-            task_index = self._frame_counter % 5
-            if task_index == 0: self._process_presence(frame)
-            elif task_index == 1: self._process_recognition(frame)
-            elif task_index == 2: self._process_gestures(frame)
-            elif task_index == 3: self._process_emotions(frame)
-            else: self._process_object_detection(frame)
+            task = self.tasks[self._frame_counter % len(self.tasks)]
+            task(frame)
 
             self._frame_counter += 1
             time.sleep(0.5) # Balance performance
@@ -108,77 +150,94 @@ class VisionSystem:
             self.recognized_user = None
         self._last_frame = gray_frame
 
-    def _process_recognition(self, frame):
-        # ... (implementation is the same)
+    def _process_faces(self, frame):
+        """Detects faces once and hands the shared crops to every face task."""
+        if self.worker_pool:
+            self.worker_pool.submit("faces", frame, functools.partial(self._apply_face_results, frame))
+            return
+        self.detected_faces = self.face_detector.detect(frame)
+        for face_task in self.face_tasks:
+            face_task(self.detected_faces)
+
+    def _apply_face_results(self, frame, result):
+        """Applies the compact results sent back by the face worker process for a frame."""
+        self.detected_faces = self.face_detector.regions(frame, result["boxes"])
+        if self.known_face_encodings:
+            self.recognized_user = self._match_known_face(result["encodings"])
+        self.detected_emotion = result["emotion"]
+        for face_task in self.face_tasks:
+            if face_task not in (self._process_recognition, self._process_emotions):
+                face_task(self.detected_faces)
+
+    def _process_recognition(self, faces):
+        """Matches the detected face crops against the known faces."""
         if not self.known_face_encodings: return
-        small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-        rgb_small_frame = small_frame[:, :, ::-1]
-        face_locations = face_recognition.face_locations(rgb_small_frame)
-        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
-        current_recognized_user = None
+        face_encodings = [encode_face(face) for face in faces]
+        self.recognized_user = self._match_known_face([e for e in face_encodings if e is not None])
+
+    def _match_known_face(self, face_encodings):
+        """Returns the name of the first known face matching any encoding, or None."""
         for face_encoding in face_encodings:
             matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding)
             if True in matches:
                 first_match_index = matches.index(True)
-                name = self.known_face_names[first_match_index]
-                current_recognized_user = name
-                break
-        self.recognized_user = current_recognized_user
+                return self.known_face_names[first_match_index]
+        return None
 
     def _process_gestures(self, frame):
-        # ... (implementation is the same)
+        """Checks a single frame for a gesture; used when the gesture engine is disabled."""
         self.detected_gesture = None
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         results = self.hands.process(rgb_frame)
         if results.multi_hand_landmarks:
             for hand_landmarks in results.multi_hand_landmarks:
                 try:
-                    thumb_tip = hand_landmarks.landmark[self.mp_hands.HandLandmark.THUMB_TIP]
-                    thumb_ip = hand_landmarks.landmark[self.mp_hands.HandLandmark.THUMB_IP]
-                    index_tip = hand_landmarks.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_TIP]
-                    index_pip = hand_landmarks.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_PIP]
-                    if (thumb_tip.x > thumb_ip.x and index_tip.y < index_pip.y):
-                        self.detected_gesture = "open_palm"; break
+                    gesture = classify_hand(hand_landmarks)
+                    if gesture:
+                        self._on_gesture(GestureEvent(gesture, self.last_frame_time, self.last_frame_time, time.time()))
+                        break
                 except Exception: pass
 
+    def _on_gesture(self, event):
+        """Publishes a gesture event to listeners of gesture_events."""
+        self.detected_gesture = event.name
+        while True:
+            try:
+                self.gesture_events.put_nowait(event)
+                return
+            except queue.Full:
+                try: self.gesture_events.get_nowait()
+                except queue.Empty: pass
+
     def capture_and_read_text(self):
-        # ... (implementation is the same)
+        """Reads text from the sharpest of a burst of camera frames."""
         if not self.camera or not self.camera.isOpened(): return "Camera not available."
-        success, frame = self.camera.read()
-        if not success: return "Failed to capture image."
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
         try:
-            text = pytesseract.image_to_string(thresh)
+            text = self.ocr.read_from_camera(self.camera)
+            if text is None: return "Failed to capture image."
             return text if text.strip() else "I couldn't find any text."
         except Exception as e: return f"OCR Error: {e}"
 
-    def _process_emotions(self, frame):
-        # ... (implementation is the same)
+    def _process_emotions(self, faces):
+        """Classifies the emotion of the largest detected face crop."""
         self.detected_emotion = None
+        if not faces: return
         try:
-            analysis = DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False)
-            if isinstance(analysis, list) and len(analysis) > 0:
-                self.detected_emotion = analysis[0]['dominant_emotion']
-            elif isinstance(analysis, dict):
-                self.detected_emotion = analysis['dominant_emotion']
+            self.detected_emotion = classify_emotion(faces[0])
         except Exception: pass
 
     def _process_object_detection(self, frame):
-        """Analyzes a frame for common objects using YOLO."""
+        """Analyzes a frame for common objects using the configured YOLO backend."""
+        if self.worker_pool:
+            self.worker_pool.submit("objects", frame, self._apply_object_results)
+            return
         self.detected_objects = []
         try:
-            results = self.yolo_model(frame, verbose=False)
-
-            # Extract names of detected objects
-            names = self.yolo_model.names
-            for r in results:
-                for c in r.boxes.cls:
-                    self.detected_objects.append(names[int(c)])
-
-            # Keep only unique object names
-            self.detected_objects = sorted(list(set(self.detected_objects)))
-
+            self.detected_objects = self.object_detector.detect_names(frame)
         except Exception as e:
             print(f"Object detection error: {e}")
             self.detected_objects = []
+
+    def _apply_object_results(self, names):
+        """Applies the object names sent back by the detection worker process."""
+        self.detected_objects = names
@@ -0,0 +1,237 @@
+import multiprocessing
+import queue
+import threading
+import itertools
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+class SharedFrameRing:
+    """
+    A fixed number of frame slots in shared memory. Worker processes attach to
+    the same block by name and read frames as NumPy views, so pixel data is
+    never pickled or copied between processes.
+    """
+    def __init__(self, shape, slots=4, dtype=np.uint8, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        size = int(np.prod(self.shape)) * self.dtype.itemsize * slots
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, slot, frame):
+        """Copies a frame into the given slot."""
+        np.copyto(self.frames[slot], frame)
+
+    def read(self, slot):
+        """Returns a view of the frame stored in the given slot."""
+        return self.frames[slot]
+
+    def close(self):
+        """Detaches from the shared block, removing it if this ring created it."""
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def _worker_main(task_name, loader, request_queue, result_queue):
+    """Entry point of a worker process: loads one model and serves frame jobs."""
+    try:
+        handler = loader()
+    except Exception as e:
+        result_queue.put((task_name, None, None, f"could not load the model: {e}")) # A job_id of None means a failed load
+        return
+    ring = None
+    while True:
+        request = request_queue.get()
+        if request is None:
+            break
+        job_id, (ring_name, shape, slots, dtype), slot, extra = request
+        if ring is None or ring.name != ring_name:
+            if ring is not None: ring.close()
+            ring = SharedFrameRing(shape, slots=slots, dtype=dtype, name=ring_name)
+        result, error = None, None
+        try:
+            result = handler(ring.read(slot), extra)
+        except Exception as e:
+            error = str(e)
+        result_queue.put((task_name, job_id, result, error))
+    if ring is not None: ring.close()
+
+class VisionWorkerPool:
+    """
+    Runs heavy vision models in separate processes, one per task.
+    Frames are handed over through a SharedFrameRing and only compact
+    results (names, encodings, labels) travel back through a queue.
+    A worker that dies is restarted, up to max_restarts times; a task whose
+    model fails to load, or whose worker keeps dying, is disabled.
+    """
+    def __init__(self, loaders, slots=4, max_restarts=3):
+        """
+        :param loaders: A dict of task name to a picklable, module-level function
+                        that loads the model inside the worker and returns a
+                        handler(frame, extra) callable.
+        :param slots: The number of frames that can be in flight at once.
+        :param max_restarts: How often a task's worker is restarted after dying before the task is disabled.
+        """
+        self.slots = slots
+        self.max_restarts = max_restarts
+        self._context = multiprocessing.get_context("spawn")
+        self._result_queue = self._context.Queue()
+        self._lock = threading.Lock()
+        self._ring = None
+        self._free_slots = []
+        self._pending = {} # job_id -> (task_name, slot, callback)
+        self._job_ids = itertools.count()
+        self._loaders = dict(loaders)
+        self._workers = {}
+        self._restarts = dict.fromkeys(self._loaders, 0)
+        self.disabled = set() # Tasks whose frames are no longer accepted
+        for task_name in self._loaders:
+            self._start_worker(task_name)
+        self._running = True
+        self._listener = threading.Thread(target=self._result_loop, daemon=True)
+        self._listener.start()
+
+    def _start_worker(self, task_name):
+        request_queue = self._context.Queue()
+        process = self._context.Process(target=_worker_main, args=(task_name, self._loaders[task_name], request_queue,
+                                                                  self._result_queue), daemon=True)
+        process.start()
+        self._workers[task_name] = (process, request_queue)
+
+    def submit(self, task_name, frame, callback, extra=None):
+        """
+        Queues a frame for a task. Only one frame per task is in flight at a time,
+        so a slow model skips frames instead of building up a backlog.
+        :param callback: Called as callback(result) from the pool's listener thread.
+        :return: True if the frame was accepted, False if it was dropped.
+        """
+        with self._lock:
+            if task_name in self.disabled:
+                return False
+            if any(pending[0] == task_name for pending in self._pending.values()):
+                return False
+            if self._ring is None or self._ring.shape != frame.shape:
+                if self._pending:
+                    return False # Can't swap the ring while workers are reading it
+                if self._ring is not None: self._ring.close()
+                self._ring = SharedFrameRing(frame.shape, slots=self.slots, dtype=frame.dtype)
+                self._free_slots = list(range(self.slots))
+            if not self._free_slots:
+                return False
+            slot = self._free_slots.pop()
+            self._ring.write(slot, frame)
+            job_id = next(self._job_ids)
+            self._pending[job_id] = (task_name, slot, callback)
+            ring_spec = (self._ring.name, self._ring.shape, self._ring.slots, self._ring.dtype.str)
+            request_queue = self._workers[task_name][1]
+        request_queue.put((job_id, ring_spec, slot, extra))
+        return True
+
+    def _drop_pending(self, task_name):
+        """Frees the slots of a task's jobs that will never be answered. Call with the lock held."""
+        for job_id, (pending_task, slot, _) in list(self._pending.items()):
+            if pending_task == task_name:
+                del self._pending[job_id]
+                self._free_slots.append(slot)
+
+    def _disable(self, task_name, reason):
+        with self._lock:
+            self.disabled.add(task_name)
+            self._drop_pending(task_name)
+        print(f"Vision worker '{task_name}' disabled: {reason}")
+
+    def _check_workers(self):
+        """Restarts workers that have died, or disables their task once they have died too often."""
+        for task_name, (process, _) in list(self._workers.items()):
+            if task_name in self.disabled or process.is_alive() or process.exitcode == 0:
+                continue # A clean exit follows a failed load, which disables the task when its report arrives
+            if self._restarts[task_name] >= self.max_restarts:
+                self._disable(task_name, f"the worker died {self._restarts[task_name] + 1} times")
+                continue
+            self._restarts[task_name] += 1
+            print(f"Vision worker '{task_name}' died (exit code {process.exitcode}); restarting it.")
+            with self._lock:
+                self._drop_pending(task_name)
+                self._start_worker(task_name)
+
+    def _result_loop(self):
+        """Frees slots as results arrive and hands the results to their callbacks."""
+        last_check = time.monotonic()
+        while self._running:
+            if time.monotonic() - last_check >= 0.5:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                task_name, job_id, result, error = self._result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            if job_id is None:
+                self._disable(task_name, error)
+                continue
+            with self._lock:
+                pending = self._pending.pop(job_id, None)
+                if pending is None: continue
+                task_name, slot, callback = pending
+                self._free_slots.append(slot)
+            if error:
+                print(f"Vision worker '{task_name}' error: {error}")
+                continue
+            try:
+                callback(result)
+            except Exception as e:
+                print(f"Vision worker callback error: {e}")
+
+    def close(self):
+        """Stops all worker processes and releases the shared frames."""
+        self._running = False # Stop the listener first, so workers that exit aren't restarted
+        self._listener.join(timeout=2)
+        for process, request_queue in self._workers.values():
+            request_queue.put(None)
+        for process, request_queue in self._workers.values():
+            process.join(timeout=5)
+            if process.is_alive(): process.terminate()
+        with self._lock:
+            if self._ring is not None:
+                self._ring.close()
+                self._ring = None
+
+# --- Worker-side model loaders ---
+# These run inside the worker process, so the heavy imports happen there.
+
+def load_face_worker():
+    """Loads face detection, recognition and emotion models in a worker."""
+    from .face_detection import FaceDetector, encode_face, classify_emotion
+    detector = FaceDetector()
+
+    def handle(frame, extra):
+        faces = detector.detect(frame)
+        encodings = [encode_face(face) for face in faces]
+        emotion = None
+        if faces:
+            try: emotion = classify_emotion(faces[0])
+            except Exception: pass
+        return {
+            "boxes": [face.box for face in faces],
+            "encodings": [e for e in encodings if e is not None],
+            "emotion": emotion,
+        }
+    return handle
+
+def load_object_worker(settings=None):
+    """Loads the object detector in a worker, using ObjectDetector keyword settings."""
+    from .object_detection import ObjectDetector
+    detector = ObjectDetector(**(settings or {}))
+
+    def handle(frame, extra):
+        return detector.detect_names(frame)
+    return handle
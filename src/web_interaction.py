@@ -1,54 +1,171 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import quote, urlsplit
 import requests
-from bs4 import BeautifulSoup
-from transformers import pipeline
 import wikipedia
+from .html_extraction import extract_main_text
+from .http_client import HttpClient
+from .summarizer import Summarizer
 
-def get_instant_answer(query):
+def _wikipedia_answer(query):
+    """:raises wikipedia.exceptions.PageError: If there is no page for the query."""
+    try:
+        # Get the summary, limiting to the first 3 sentences
+        return wikipedia.summary(query, sentences=3)
+    except wikipedia.exceptions.DisambiguationError as e:
+        print(f"'{query}' is ambiguous. Could be one of: {e.options}")
+        # For simplicity, we'll just return the first option's summary
+        try:
+            return wikipedia.summary(e.options[0], sentences=3)
+        except wikipedia.exceptions.WikipediaException:
+            return None # Ignore nested ambiguity
+
+def get_instant_answer(query, cache=None, snapshot=None):
     """
     Queries Wikipedia for a summary of the given query.
     Returns the summary if found, otherwise None.
+    :param cache: An AnswerCache of earlier answers; when Wikipedia can't be reached, an expired answer is given.
+    :param snapshot: A LeadSnapshot of article leads, looked in before going online.
     """
+    if snapshot is not None:
+        answer = snapshot.lookup(query)
+        if answer is not None:
+            return answer
+    entry = None
+    if cache is not None:
+        key = cache.key(query)
+        entry = cache.get(key)
+        if entry is not None and cache.is_fresh(entry):
+            return entry["answer"]
     try:
-        # Get the summary, limiting to the first 3 sentences
-        summary = wikipedia.summary(query, sentences=3)
-        return summary
+        answer = _wikipedia_answer(query)
     except wikipedia.exceptions.PageError:
         print(f"Wikipedia page not found for '{query}'.")
-        return None
-    except wikipedia.exceptions.DisambiguationError as e:
-        print(f"'{query}' is ambiguous. Could be one of: {e.options}")
-        # For simplicity, we'll just return the first option's summary
-        try:
-            summary = wikipedia.summary(e.options[0], sentences=3)
-            return summary
-        except Exception:
-            return None # Ignore nested errors
+        answer = None
     except Exception as e:
         print(f"An error occurred with Wikipedia search: {e}")
-        return None
+        return entry["answer"] if entry is not None else None # E.g. offline
+    if cache is not None:
+        cache.put(key, answer)
+    return answer
+
+def find_sources(topic, limit=3):
+    """:return: The URLs of the Wikipedia articles that best match a topic, best first."""
+    try:
+        titles = wikipedia.search(topic, results=limit)
+    except Exception as e:
+        print(f"An error occurred with Wikipedia search: {e}")
+        return []
+    return [f"https://en.wikipedia.org/wiki/{quote(title.replace(' ', '_'))}" for title in titles]
+
+default_client = None # Created on first use when no client is given
+MAX_PAGE_BYTES = 2 * 2**20 # Pages are cut off here; the main text of a page comes well before
+
+def get_client(client=None):
+    """:return: The given HttpClient, or one shared by every call that doesn't pass one."""
+    global default_client
+    if client is not None:
+        return client
+    if default_client is None:
+        default_client = HttpClient()
+    return default_client
 
-def get_page_content(url):
-    """Fetches and extracts the main text content from a URL."""
+def _page_text(response):
+    response.raise_for_status()
+    return extract_main_text(response.content, response.headers.get("Content-Type", ""))
+
+def get_page_content(url, client=None, max_bytes=MAX_PAGE_BYTES):
+    """
+    Fetches and extracts the main text content from a URL.
+    :param client: The HttpClient to fetch with; by default a shared one.
+    :param max_bytes: The most of the page to download.
+    """
     try:
-        # Add a user-agent to avoid being blocked
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        main_content = soup.find('main') or soup.find('article') or soup.find('body')
-        paragraphs = main_content.find_all('p')
-        text = ' '.join([p.get_text() for p in paragraphs])
-        return text
+        return _page_text(get_client(client).get(url, max_bytes=max_bytes))
     except requests.RequestException as e:
         print(f"Error fetching URL: {e}")
         return None
 
-def summarize_text(text, max_length=150, min_length=50):
-    """Summarizes the given text using a pre-trained model."""
+def _capped_timeout(timeout, remaining):
+    """The client's (connect, read) timeout, shortened so no wait outlasts the deadline."""
+    if isinstance(timeout, tuple):
+        return tuple(min(part, remaining) for part in timeout)
+    return min(timeout, remaining)
+
+def fetch_many(urls, client=None, max_workers=8, max_per_host=4, deadline=30.0, max_bytes=MAX_PAGE_BYTES):
+    """
+    Fetches several pages at once and extracts their text, yielding each page as
+    soon as it is ready, so the caller can summarize the first while the rest
+    download. Fetching takes about as long as the slowest page, never longer than
+    the deadline.
+    :param client: The HttpClient to fetch with; by default a shared one.
+    :param max_workers: The most pages fetched at once.
+    :param max_per_host: The most pages fetched at once from any one host.
+    :param deadline: Seconds after which pages not yet fetched are given up on.
+    :param max_bytes: The most of each page to download.
+    :return: A generator of (url, text) pairs in the order the pages arrive; text is
+             None for a page that couldn't be fetched in time or extracted.
+    """
+    client = get_client(client)
+    urls = list(dict.fromkeys(urls)) # Each page once
+    if not urls:
+        return
+    end = time.monotonic() + deadline
+    hosts = {urlsplit(url).netloc: threading.BoundedSemaphore(max_per_host) for url in urls}
+
+    def fetch(url):
+        slot = hosts[urlsplit(url).netloc]
+        if not slot.acquire(timeout=max(end - time.monotonic(), 0)):
+            raise TimeoutError("the deadline passed while waiting for the host")
+        try:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("the deadline passed while waiting for the host")
+            return _page_text(client.get(url, timeout=_capped_timeout(client.timeout, remaining), max_bytes=max_bytes))
+        finally:
+            slot.release()
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(urls)), thread_name_prefix="fetch")
+    futures = {executor.submit(fetch, url): url for url in urls}
+    pending = set(futures)
+    try:
+        while pending:
+            # A zero timeout still collects pages that finished while the caller was busy
+            done, pending = wait(pending, timeout=max(end - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                try:
+                    text = future.result()
+                except Exception as e:
+                    # Network errors, but also pages that fail to decode or parse, mustn't end the others
+                    print(f"Error fetching {futures[future]}: {e}")
+                    text = None
+                yield futures[future], text
+        for future in pending:
+            print(f"Gave up on {futures[future]}: the deadline passed.")
+            yield futures[future], None
+    finally:
+        # Don't wait for stragglers; their own timeouts end them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+default_summarizer = None # Created on first use when no summarizer is given
+
+def summarize_text(text, max_length=150, min_length=50, on_text=None, summarizer=None, mode=None):
+    """
+    Summarizes the given text using a pre-trained model.
+    :param on_text: Called with each new piece of the summary as it is generated.
+    :param summarizer: The Summarizer to use; by default one shared by every call.
+    :param mode: "abstractive" or "extractive" (much faster); None for the summarizer's default.
+    """
+    global default_summarizer
     try:
-        summarizer = pipeline("summarization", model="sshleifer/distilbart-cnn-12-6")
-        summary = summarizer(text, max_length=max_length, min_length=min_length, do_sample=False)
-        return summary[0]['summary_text']
+        if summarizer is None:
+            if default_summarizer is None:
+                default_summarizer = Summarizer()
+            summarizer = default_summarizer
+        return summarizer.summarize(text, max_length, min_length, on_text, mode)
     except Exception as e:
         print(f"Error during summarization: {e}")
         return "Could not summarize the content."
@@ -0,0 +1,36 @@
+import json
+import time
+import context
+from src.answer_cache import AnswerCache, LeadSnapshot, title_key
+
+def test_title_key_ignores_case_punctuation_and_articles():
+    assert title_key("The  Eiffel Tower?") == title_key("eiffel tower") == "eiffel tower"
+    assert AnswerCache.key("The Eiffel Tower?") == AnswerCache.key("eiffel tower")
+
+def test_answers_expire_and_missing_pages_expire_sooner(tmp_path):
+    cache = AnswerCache(str(tmp_path), ttl=100, negative_ttl=10)
+    cache.put(cache.key("found"), "An answer.")
+    cache.put(cache.key("missing"), None)
+    found, missing = cache.get(cache.key("found")), cache.get(cache.key("missing"))
+    assert found["answer"] == "An answer." and cache.is_fresh(found)
+    assert missing["answer"] is None and cache.is_fresh(missing)
+    found["stored"] = missing["stored"] = time.time() - 50
+    assert cache.is_fresh(found) and not cache.is_fresh(missing)
+
+def test_snapshot_finds_articles_by_title_and_alias(tmp_path):
+    snapshot = LeadSnapshot(str(tmp_path / "leads.db"))
+    snapshot.add("Eiffel Tower", "A tower in Paris.", aliases=["Tour Eiffel"])
+    assert snapshot.lookup("the eiffel tower") == "A tower in Paris."
+    assert snapshot.lookup("tour eiffel") == "A tower in Paris."
+    assert snapshot.lookup("Big Ben") is None
+    snapshot.close()
+    assert len(LeadSnapshot(str(tmp_path / "leads.db"))) == 1 # Kept on disk
+
+def test_snapshot_imports_json_lines(tmp_path):
+    articles = tmp_path / "leads.jsonl"
+    articles.write_text("\n".join(json.dumps(article) for article in [
+        {"title": "Python (programming language)", "summary": "A programming language.", "aliases": ["Python"]},
+        {"title": "Moon", "summary": "Earth's satellite."}]) + "\n", encoding="utf-8")
+    snapshot = LeadSnapshot(str(tmp_path / "leads.db"))
+    assert snapshot.import_jsonl(str(articles)) == 2
+    assert snapshot.lookup("python") == "A programming language." and snapshot.lookup("the moon") == "Earth's satellite."
@@ -0,0 +1,71 @@
+import os
+import pytest
+import context
+from src import batch_ocr
+
+def test_store_returns_text_only_for_unchanged_files(tmp_path):
+    """Tests that stored text is reused until the file's modification time changes."""
+    image = tmp_path / "scan.png"
+    image.write_bytes(b"not really an image")
+    store = batch_ocr.OCRTextStore(str(tmp_path / "ocr.db"))
+    mtime = os.path.getmtime(image)
+    store.put(str(image), mtime, "Invoice number 42")
+
+    assert store.get(str(image)) == "Invoice number 42"
+    assert store.is_current(str(image), mtime)
+
+    os.utime(image, (mtime + 10, mtime + 10))
+    assert store.get(str(image)) is None
+    store.close()
+
+def test_store_search_is_case_insensitive(tmp_path):
+    """Tests that stored text can be searched to find files."""
+    store = batch_ocr.OCRTextStore(str(tmp_path / "ocr.db"))
+    store.put(str(tmp_path / "a.png"), 1.0, "Quarterly INVOICE")
+    store.put(str(tmp_path / "b.png"), 1.0, "Holiday photo")
+    assert store.search("invoice") == [str(tmp_path / "a.png")]
+    store.close()
+
+def test_store_search_matches_the_folder_literally(tmp_path):
+    """Tests that % and _ in a folder name aren't wildcards, and that a folder doesn't match its namesakes."""
+    store = batch_ocr.OCRTextStore(str(tmp_path / "ocr.db"))
+    for folder in ["my_docs", "myXdocs", "my_docs2", "100%"]:
+        store.put(str(tmp_path / folder / "scan.png"), 1.0, "Invoice")
+    assert store.search("invoice", folder=str(tmp_path / "my_docs")) == [str(tmp_path / "my_docs" / "scan.png")]
+    assert store.search("invoice", folder=str(tmp_path / "100%")) == [str(tmp_path / "100%" / "scan.png")]
+    assert len(store.search("invoice", folder=str(tmp_path))) == 4
+    store.close()
+
+def test_default_store_does_not_depend_on_the_working_directory():
+    """Tests that the default store sits in the project folder, not wherever the caller runs from."""
+    assert os.path.isabs(batch_ocr.STORE_FILE)
+    assert os.path.exists(os.path.join(os.path.dirname(batch_ocr.STORE_FILE), "main.py"))
+
+def test_ocr_folder_skips_already_processed_files(tmp_path):
+    """Tests that a re-run only considers files that are new or changed."""
+    folder = tmp_path / "scans"
+    folder.mkdir()
+    for name in ["one.png", "two.jpg", "notes.txt"]:
+        (folder / name).write_bytes(b"data")
+    store = batch_ocr.OCRTextStore(str(tmp_path / "ocr.db"))
+    for path in batch_ocr.find_ocr_files(str(folder)):
+        store.put(path, os.path.getmtime(path), "already read")
+
+    progress = []
+    result = batch_ocr.ocr_folder(str(folder), store=store, progress_callback=lambda *args: progress.append(args))
+    assert result == {"processed": 0, "skipped": 2, "failed": 0}
+    assert progress == []
+    store.close()
+
+def test_ocr_folder_reports_unreadable_files_from_its_workers(tmp_path):
+    """Tests that files failing inside the (spawned) worker processes are counted and left unstored."""
+    folder = tmp_path / "scans"
+    folder.mkdir()
+    for name in ["one.png", "two.jpg"]:
+        (folder / name).write_bytes(b"not an image")
+    store = batch_ocr.OCRTextStore(str(tmp_path / "ocr.db"))
+
+    result = batch_ocr.ocr_folder(str(folder), store=store, workers=2)
+    assert result == {"processed": 0, "skipped": 0, "failed": 2}
+    assert not store.is_current(str(folder / "one.png"), os.path.getmtime(folder / "one.png"))
+    store.close()
@@ -0,0 +1,37 @@
+import pytest
+import numpy as np
+import cv2
+import context
+from src.camera_capture import CameraCapture
+
+@pytest.fixture
+def video_file(tmp_path):
+    """Writes a short MJPG clip whose frames get brighter, standing in for a camera."""
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    for i in range(20):
+        writer.write(np.full((48, 64, 3), i * 10, dtype=np.uint8))
+    writer.release()
+    return path
+
+def test_grabber_exposes_latest_frame_with_timestamp(video_file):
+    """Tests that consumers see new frames with increasing sequence numbers."""
+    camera = CameraCapture(video_file, fourcc=None)
+    assert camera.open()
+    try:
+        frame, timestamp, sequence = camera.wait_for_frame(0, timeout=5)
+        assert frame is not None and frame.shape == (48, 64, 3)
+        assert timestamp > 0 and sequence >= 1
+
+        success, latest = camera.read()
+        assert success
+        assert camera.get_latest()[2] >= sequence
+    finally:
+        camera.release()
+    assert not camera.isOpened()
+
+def test_open_fails_for_missing_device(tmp_path):
+    """Tests that an unavailable source reports failure instead of starting the grabber."""
+    camera = CameraCapture(str(tmp_path / "missing.avi"))
+    assert not camera.open()
+    assert not camera.isOpened()
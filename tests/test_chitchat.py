@@ -0,0 +1,115 @@
+import pytest
+import torch
+from transformers import GPT2Config, GPT2LMHeadModel
+import context
+from src import chitchat
+
+class FakeTokenizer:
+    """Maps each word to its own token id, standing in for DialoGPT's tokenizer."""
+    eos_token_id = 0
+
+    def __init__(self):
+        self.words = ["<eos>"]
+
+    def encode(self, text):
+        ids = []
+        for word in text.split():
+            if word not in self.words:
+                self.words.append(word)
+            ids.append(self.words.index(word) % 256 or 1)
+        return ids
+
+    def decode(self, ids, skip_special_tokens=False):
+        return " ".join(f"w{i}" for i in ids if not (skip_special_tokens and i == self.eos_token_id))
+
+class CountingModel(torch.nn.Module):
+    """Wraps a model, recording how many tokens each forward pass encodes and the context length it reaches."""
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        self.calls = []
+        self.longest_context = 0
+
+    def forward(self, input_ids, past_key_values=None, **kwargs):
+        self.calls.append(input_ids.shape[1])
+        past = past_key_values.get_seq_length() if past_key_values is not None else 0
+        self.longest_context = max(self.longest_context, past + input_ids.shape[1])
+        kwargs["past_key_values"] = past_key_values
+        return self.model(input_ids=input_ids, **kwargs)
+
+def tiny_model():
+    torch.manual_seed(0)
+    model = GPT2LMHeadModel(GPT2Config(vocab_size=256, n_positions=256, n_embd=32, n_layer=2, n_head=2,
+                                       bos_token_id=0, eos_token_id=0))
+    with torch.no_grad():
+        # Untrained, the model favours ending at once; a blank eos embedding (tied to the output) makes it talk
+        model.transformer.wte.weight[0].zero_()
+    return model
+
+def make_engine(**kwargs):
+    return chitchat.ChitchatEngine(model=CountingModel(tiny_model()), tokenizer=FakeTokenizer(), **kwargs)
+
+def greedy_without_cache(model, window, max_new_tokens, eos):
+    """The reply generated by re-encoding the whole window for every token."""
+    ids, reply = list(window), []
+    with torch.inference_mode():
+        while len(reply) < max_new_tokens:
+            token = int(torch.argmax(model(input_ids=torch.tensor([ids])).logits[0, -1]))
+            reply.append(token)
+            if token == eos:
+                break
+            ids.append(token)
+    return reply
+
+def test_each_turn_only_encodes_new_tokens():
+    """Tests that later turns reuse the cache instead of re-encoding the history."""
+    engine = make_engine(max_context_tokens=200, max_new_tokens=8)
+    engine.respond("hello there how are you")
+    engine.model.calls.clear()
+    engine.respond("fine thanks")
+    # The new turn (2 words + eos) plus the unencoded end of the last reply, then one token at a time
+    assert engine.model.calls[0] <= 5
+    assert all(count == 1 for count in engine.model.calls[1:])
+
+def test_cached_replies_match_full_recomputation():
+    """Tests that reusing the cache doesn't change what the model says."""
+    engine = make_engine(max_context_tokens=200, max_new_tokens=8)
+    for text in ("hello there", "what is your name", "tell me a joke"):
+        window = list(engine._window) + engine.tokenizer.encode(text) + [engine.eos_token_id]
+        expected = greedy_without_cache(engine.model.model, window, 7, engine.eos_token_id)
+        assert engine.respond(text) == engine.tokenizer.decode(expected, skip_special_tokens=True)
+
+def test_window_stays_within_budget():
+    """Tests that a long session drops old turns and rebuilds the cache only occasionally."""
+    engine = make_engine(max_context_tokens=64, max_new_tokens=8)
+    for i in range(40):
+        engine.respond(f"message {i} with a few more words")
+        assert engine.window_tokens <= engine.max_context_tokens
+    assert engine.model.longest_context <= engine.max_context_tokens
+    assert 0 < engine.rebuilds < 20
+
+def test_overlong_turn_keeps_its_end():
+    engine = make_engine(max_context_tokens=32, max_new_tokens=8)
+    engine.respond(" ".join(f"word{i}" for i in range(100)))
+    assert engine.window_tokens <= 32 and engine.model.longest_context <= 32
+
+def test_latency_is_recorded():
+    engine = make_engine(max_context_tokens=64, max_new_tokens=4)
+    assert engine.stats()["last_latency"] is None
+    engine.respond("hello")
+    engine.respond("again")
+    stats = engine.stats()
+    assert stats["turns"] == 4 and len(engine.latencies) == 2
+    assert stats["last_latency"] > 0 and stats["mean_latency"] > 0
+
+def test_streamed_pieces_make_up_the_reply():
+    """Tests that a streaming callback sees the reply grow a piece at a time."""
+    engine = make_engine(max_context_tokens=64, max_new_tokens=8)
+    pieces = []
+    reply = engine.respond("hello there", on_text=pieces.append)
+    assert len(pieces) > 1
+    assert "".join(pieces).strip() == reply
+
+def test_budget_must_leave_room_for_history():
+    with pytest.raises(ValueError):
+        make_engine(max_context_tokens=8, max_new_tokens=8)
@@ -55,6 +55,18 @@ def test_parse_move_files():
     assert intent == "move_files"
     assert args == "PDFs Downloads Documents"
 
+def test_parse_ocr_folder():
+    """Tests parsing the 'ocr_folder' intent."""
+    intent, args = parse_command("scan my downloads folder")
+    assert intent == "ocr_folder"
+    assert args == "downloads"
+
+def test_parse_find_text_in_files():
+    """Tests parsing the 'find_text_in_files' intent."""
+    intent, args = parse_command("which files mention invoice")
+    assert intent == "find_text_in_files"
+    assert args == "invoice"
+
 def test_parse_invalid_command():
     """Tests that invalid commands are not parsed."""
     intent, args = parse_command("this is not a command")
@@ -0,0 +1,21 @@
+import pytest
+import context
+from src.object_detection import Detection
+from benchmarks.detection_benchmark import box_iou, mean_average_precision
+
+def test_box_iou():
+    """Tests intersection over union for identical, disjoint and overlapping boxes."""
+    assert box_iou((0, 0, 10, 10), (0, 0, 10, 10)) == 1.0
+    assert box_iou((0, 0, 10, 10), (20, 20, 30, 30)) == 0.0
+    assert box_iou((0, 0, 10, 10), (5, 0, 15, 10)) == pytest.approx(1 / 3)
+
+def test_identical_detections_score_full_agreement():
+    """Tests that a backend reproducing the reference scores mAP 1.0."""
+    reference = [[Detection("person", 0.9, (0, 0, 10, 10))], [Detection("cup", 0.8, (5, 5, 20, 20))]]
+    assert mean_average_precision(reference, reference) == 1.0
+
+def test_missed_and_mislabelled_detections_lower_the_score():
+    """Tests that a missing class and a wrong label both reduce agreement."""
+    reference = [[Detection("person", 0.9, (0, 0, 10, 10)), Detection("cup", 0.8, (20, 20, 30, 30))]]
+    candidate = [[Detection("person", 0.9, (0, 0, 10, 10)), Detection("bottle", 0.8, (20, 20, 30, 30))]]
+    assert mean_average_precision(reference, candidate) == pytest.approx(0.5)
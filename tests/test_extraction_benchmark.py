@@ -0,0 +1,10 @@
+import context
+from benchmarks.extraction_benchmark import run_benchmark, synthetic_page
+
+def test_synthetic_page_has_the_requested_size():
+    assert 50 * 1024 <= len(synthetic_page(50)) < 51 * 1024
+
+def test_extractors_agree_on_the_article_text():
+    results = {row["extractor"]: row for row in run_benchmark([("page", synthetic_page(20))], repeat=1)}
+    assert results["lxml"]["leaked"] == 0 and results["html.parser"]["leaked"] > 0
+    assert results["lxml"]["text_chars"] > 0.9 * results["html.parser"]["text_chars"]
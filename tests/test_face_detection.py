@@ -0,0 +1,77 @@
+import pytest
+import numpy as np
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import context
+from src.face_detection import FaceDetector, expand_box, scale_box
+from src.vision_system import VisionSystem
+
+def _frame(height=200, width=300):
+    """A frame whose pixels encode their own coordinates, so crops can be checked."""
+    rows, cols = np.mgrid[0:height, 0:width]
+    return np.dstack([rows % 256, cols % 256, np.zeros_like(rows)]).astype(np.uint8)
+
+def test_quarter_scale_boxes_map_back_to_full_frame():
+    """Tests that a box found on the quarter-size frame is scaled up to full-frame pixels."""
+    assert scale_box((10, 40, 30, 5), 4, (200, 300)) == (40, 160, 120, 20)
+    # Rounding up to the frame edge never leaves the frame
+    assert scale_box((0, 80, 55, 0), 4, (200, 300, 3)) == (0, 300, 200, 0)
+
+def test_margin_is_clamped_at_frame_edges():
+    """Tests that the crop margin grows a box on every side but stops at the frame's edges."""
+    assert expand_box((40, 60, 60, 40), 0.5, (100, 100)) == (30, 70, 70, 30)
+    assert expand_box((10, 60, 50, 2), 0.5, (100, 100)) == (0, 89, 70, 0)
+    assert expand_box((60, 95, 95, 70), 0.5, (100, 100)) == (43, 100, 100, 58)
+
+def test_detect_crops_each_face_with_its_location_in_the_crop():
+    """Tests that faces come back largest first, with crops cut from the full frame around their boxes."""
+    frame = _frame()
+    # Locations on the quarter-size frame: a small face near the corner and a larger one in the middle
+    with patch('src.face_detection.face_recognition.face_locations', return_value=[(2, 8, 6, 1), (10, 40, 30, 20)]) as locate:
+        faces = FaceDetector(scale=0.25, margin=0.2).detect(frame)
+    assert locate.call_count == 1
+    assert locate.call_args[0][0].shape == (50, 75, 3)
+    assert [face.box for face in faces] == [(40, 160, 120, 80), (8, 32, 24, 4)]
+
+    face = faces[0]
+    top, right, bottom, left = face.location_in_crop
+    assert face.crop.shape == (112, 112, 3)
+    # The face's own pixels sit at location_in_crop within the crop
+    assert face.crop[top, left, 0] == 40 and face.crop[top, left, 1] == 80
+    assert face.crop[bottom - 1, right - 1, 0] == 119 and face.crop[bottom - 1, right - 1, 1] == 159
+    # The corner face's margin is clamped to the frame
+    assert faces[1].crop.shape == (22, 37, 3)
+
+def test_one_detection_pass_feeds_recognition_and_emotion():
+    """Tests that the vision system detects faces once per frame and hands the same crops to every face task."""
+    frame = _frame()
+    faces = [SimpleNamespace(box=(40, 160, 120, 80))]
+    detector = MagicMock()
+    detector.detect.return_value = faces
+    recognition, emotions = MagicMock(), MagicMock()
+    vision = SimpleNamespace(worker_pool=None, face_detector=detector, face_tasks=[recognition, emotions], detected_faces=[])
+
+    VisionSystem._process_faces(vision, frame)
+    detector.detect.assert_called_once_with(frame)
+    recognition.assert_called_once_with(faces)
+    emotions.assert_called_once_with(faces)
+    assert vision.detected_faces is faces
+
+def test_worker_results_give_the_same_faces_as_the_in_process_pass():
+    """Tests that the boxes sent back by the face worker are cropped like a local detection."""
+    frame = _frame()
+    detector = FaceDetector(scale=0.25, margin=0.2)
+    with patch('src.face_detection.face_recognition.face_locations', return_value=[(2, 8, 6, 1), (10, 40, 30, 20)]):
+        local = detector.detect(frame)
+    recognition, emotions, other = MagicMock(), MagicMock(), MagicMock()
+    vision = SimpleNamespace(face_detector=detector, known_face_encodings=[], detected_faces=[], detected_emotion=None,
+                             _process_recognition=recognition, _process_emotions=emotions, face_tasks=[recognition, emotions, other])
+
+    VisionSystem._apply_face_results(vision, frame, {"boxes": [face.box for face in local], "encodings": [], "emotion": "happy"})
+    assert [face.box for face in vision.detected_faces] == [face.box for face in local]
+    assert all(np.array_equal(a.crop, b.crop) for a, b in zip(vision.detected_faces, local))
+    assert vision.detected_emotion == "happy"
+    # The worker already ran recognition and emotion; other face tasks still get the crops
+    recognition.assert_not_called()
+    emotions.assert_not_called()
+    other.assert_called_once_with(vision.detected_faces)
@@ -0,0 +1,83 @@
+import pytest
+import time
+import numpy as np
+import cv2
+import context
+from src.camera_capture import CameraCapture
+from src.frame_source import open_frame_source, ImageFolderSource, ReplaySource, VideoFileSource
+
+def _frame(value):
+    return np.full((24, 32, 3), value, dtype=np.uint8)
+
+def _replay_all(source):
+    values, sequence = [], 0
+    while True:
+        frame, _, sequence = source.wait_for_frame(sequence)
+        if frame is None:
+            return values
+        values.append(int(frame[0, 0, 0]))
+
+def test_open_frame_source_picks_source_type(tmp_path):
+    """Tests that camera indexes, directories and files map to the right source."""
+    assert isinstance(open_frame_source(0), CameraCapture)
+    assert isinstance(open_frame_source("1"), CameraCapture)
+    assert isinstance(open_frame_source(str(tmp_path)), ImageFolderSource)
+    assert isinstance(open_frame_source(str(tmp_path / "clip.avi")), VideoFileSource)
+
+def test_camera_index_in_camera_settings_names_the_camera(tmp_path):
+    """Tests that camera settings written for CameraCapture, index included, open that camera."""
+    camera = open_frame_source(0, index=2, width=640)
+    assert isinstance(camera, CameraCapture)
+    assert (camera.index, camera.width) == (2, 640)
+    with pytest.raises(ValueError):
+        open_frame_source(str(tmp_path), index=2)
+
+def test_image_folder_replays_every_image_in_order(tmp_path):
+    """Tests that images are delivered once each, sorted by name, then the source ends."""
+    for i, value in enumerate([30, 10, 20]):
+        cv2.imwrite(str(tmp_path / f"frame_{i}.png"), _frame(value))
+    (tmp_path / "notes.txt").write_text("not an image")
+
+    source = open_frame_source(str(tmp_path))
+    assert source.open()
+    assert _replay_all(source) == [30, 10, 20]
+    assert source.finished
+
+def test_video_file_can_loop(tmp_path):
+    """Tests that a looping video source starts again after its last frame."""
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (32, 24))
+    for _ in range(3):
+        writer.write(_frame(128))
+    writer.release()
+
+    source = VideoFileSource(path, loop=True)
+    assert source.open()
+    sequence = 0
+    for _ in range(7):
+        frame, _, sequence = source.wait_for_frame(sequence)
+        assert frame is not None
+    assert sequence == 7
+    source.release()
+
+def test_replay_source_is_abstract():
+    """Tests that the base class can't be used without a recording to read."""
+    with pytest.raises(TypeError):
+        ReplaySource()
+
+def test_realtime_source_times_out_before_the_next_frame_is_due(tmp_path):
+    """Tests that a realtime source waits at most timeout for its next frame, which is then still delivered."""
+    for i in range(2):
+        cv2.imwrite(str(tmp_path / f"frame_{i}.png"), _frame(i))
+    source = ImageFolderSource(str(tmp_path), realtime=True, fps=2.0)
+    assert source.open()
+    frame, _, sequence = source.wait_for_frame(0)
+    assert frame is not None
+
+    started = time.time()
+    frame, _, after = source.wait_for_frame(sequence, timeout=0.05)
+    assert frame is None and after == sequence
+    assert time.time() - started < 0.3
+    assert not source.finished
+    frame, _, sequence = source.wait_for_frame(sequence, timeout=1.0)
+    assert int(frame[0, 0, 0]) == 1
@@ -0,0 +1,65 @@
+import pytest
+import time
+from unittest.mock import patch
+import cv2
+import numpy as np
+import context
+from src.frame_source import ImageFolderSource
+from src.gesture_engine import GestureDebouncer, GestureEngine
+
+def _feed(debouncer, gestures):
+    return [debouncer.update(g, t) for t, g in enumerate(gestures)]
+
+def test_gesture_fires_after_consecutive_sightings():
+    """Tests that a gesture is only confirmed after on_frames frames in a row."""
+    debouncer = GestureDebouncer(on_frames=3, off_frames=2)
+    fired = _feed(debouncer, ["open_palm", None, "open_palm", "open_palm", "open_palm"])
+    assert fired == [None, None, None, None, "open_palm"]
+    assert debouncer.onset_timestamp == 2
+
+def test_active_gesture_survives_brief_dropouts():
+    """Tests that a short gap doesn't re-fire the gesture, but a long one releases it."""
+    debouncer = GestureDebouncer(on_frames=2, off_frames=3)
+    fired = _feed(debouncer, ["open_palm", "open_palm", None, None, "open_palm", "open_palm"])
+    assert fired.count("open_palm") == 1
+
+    fired = _feed(debouncer, [None, None, None, "open_palm", "open_palm"])
+    assert fired[-1] == "open_palm"
+
+class StalledCamera:
+    """An open camera that never delivers a frame, counting how often it is asked."""
+    finished = False
+
+    def __init__(self):
+        self.calls = 0
+
+    def isOpened(self):
+        return True
+
+    def wait_for_frame(self, after_sequence=0, timeout=1.0):
+        self.calls += 1
+        return None, 0.0, after_sequence
+
+def test_engine_confirms_gestures_and_stops_when_the_recording_ends(tmp_path):
+    """Tests the engine's loop on a replayed recording: one event, then the thread exits."""
+    for i in range(4):
+        cv2.imwrite(str(tmp_path / f"frame_{i}.png"), np.zeros((24, 32, 3), dtype=np.uint8))
+    source = ImageFolderSource(str(tmp_path))
+    assert source.open()
+    events = []
+    engine = GestureEngine(source, events.append, rate=100.0, on_frames=2)
+    with patch.object(engine, "_detect", return_value="open_palm"):
+        engine.start()
+        engine._thread.join(timeout=5)
+    assert not engine._thread.is_alive()
+    assert [event.name for event in events] == ["open_palm"]
+    assert not engine._running
+
+def test_engine_backs_off_while_no_frames_arrive():
+    """Tests that a camera without frames is polled at the engine's rate, not in a busy loop."""
+    camera = StalledCamera()
+    engine = GestureEngine(camera, lambda event: None, rate=20.0)
+    engine.start()
+    time.sleep(0.5)
+    engine.stop()
+    assert camera.calls <= 15
@@ -0,0 +1,45 @@
+import context
+from src.html_extraction import detect_encoding, extract_main_text
+
+PAGE = """<html><head><title>Title</title><script>var tracking = 1;</script><style>p { color: red; }</style></head>
+<body class="has-sidebar">
+<header><p>Site name</p></header>
+<nav><p>Home</p></nav>
+<div class="site-menu"><p>Menu</p></div>
+<div id="content"><p>First   paragraph.</p><!-- a comment --><p>Second <b>bold</b> one.</p>
+<div class="share-buttons"><p>Share</p></div></div>
+<aside><p>Related links</p></aside>
+<footer><p>Copyright</p></footer>
+</body></html>"""
+
+def test_boilerplate_is_stripped():
+    assert extract_main_text(PAGE) == "First paragraph. Second bold one."
+
+def test_wrappers_named_like_boilerplate_keep_their_content():
+    article = "<p>" + " ".join(["The article text goes on."] * 20) + "</p>"
+    html = f"<body><div class='layout has-sidebar'><div class='content'>{article}</div><div class='sidebar'><p>Ads.</p></div></div></body>"
+    assert extract_main_text(html).startswith("The article text goes on.")
+    assert "Ads." not in extract_main_text(html)
+    assert extract_main_text(f"<body><div id='page-header'><article>{article}</article></div></body>").startswith("The article")
+    # A long list of links named like a menu is still dropped
+    menu = "".join(f"<li><a href='/{i}'>Section number {i}</a></li>" for i in range(40))
+    assert extract_main_text(f"<body><ul class='menu'>{menu}</ul><div>{article}</div></body>").startswith("The article")
+    assert "Section" not in extract_main_text(f"<body><ul class='menu'>{menu}</ul><div>{article}</div></body>")
+
+def test_main_content_is_preferred():
+    html = "<body><div><p>Teaser.</p></div><article><p>Short.</p></article><article><p>The longer article.</p></article></body>"
+    assert extract_main_text(html) == "The longer article."
+    assert extract_main_text("<body><p>Outside.</p><main><p>Inside.</p></main></body>") == "Inside."
+
+def test_pages_without_paragraphs_keep_their_text():
+    assert extract_main_text("<body><div>Just <span>some</span> text</div></body>") == "Just some text"
+
+def test_empty_pages():
+    assert extract_main_text(b"") == "" and extract_main_text(b"  \n ") == ""
+
+def test_declared_encodings_are_used():
+    html = "<html><head><meta charset='windows-1252'></head><body><p>café</p></body></html>".encode("cp1252")
+    assert extract_main_text(html) == "café"
+    assert extract_main_text("<p>café</p>".encode("utf-8")) == "café" # UTF-8 when nothing is declared
+    assert extract_main_text("<p>café</p>".encode("latin-1"), "text/html; charset=ISO-8859-1") == "café"
+    assert detect_encoding(b"<meta charset='no-such-codec'>") == "utf-8"
@@ -0,0 +1,119 @@
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+import context
+from src.http_client import HttpClient, freshness_lifetime, parse_cache_control
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves a few pages with different caching headers, recording every request."""
+    protocol_version = "HTTP/1.1" # Keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status, body, **headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers, self.client_address))
+        if self.path == "/fresh":
+            self.send_body(200, b"fresh page", Cache_Control="max-age=60")
+        elif self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_body(304, b"", ETag='"v1"')
+            else:
+                self.send_body(200, b"etag page", ETag='"v1"', Cache_Control="no-cache")
+        elif self.path == "/modified":
+            stamp = "Mon, 05 Oct 2026 10:00:00 GMT"
+            if self.headers.get("If-Modified-Since") == stamp:
+                self.send_body(304, b"")
+            else:
+                self.send_body(200, b"modified page", Last_Modified=stamp, Cache_Control="max-age=0")
+        elif self.path == "/private":
+            self.send_body(200, b"secret", Cache_Control="no-store")
+        elif self.path == "/gzip":
+            self.send_body(200, gzip.compress(b"compressed page" * 100), Content_Encoding="gzip")
+        elif self.path == "/big":
+            self.send_body(200, b"x" * 1000000, Cache_Control="max-age=60")
+        elif self.path == "/slow":
+            time.sleep(1)
+            self.send_body(200, b"late")
+        else:
+            self.send_body(404, b"missing")
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def client(tmp_path):
+    client = HttpClient(cache_dir=str(tmp_path / "cache"))
+    yield client
+    client.close()
+
+def test_fresh_responses_are_served_from_disk(server, client, tmp_path):
+    assert client.get(server.url + "/fresh").text == "fresh page"
+    again = HttpClient(cache_dir=str(tmp_path / "cache")).get(server.url + "/fresh")
+    assert again.text == "fresh page" and again.from_cache
+    assert len(server.requests) == 1
+
+def test_stale_responses_are_revalidated_by_etag(server, client):
+    assert client.get(server.url + "/etag").text == "etag page"
+    response = client.get(server.url + "/etag")
+    assert response.status_code == 200 and response.text == "etag page" and response.from_cache
+    assert server.requests[-1][1].get("If-None-Match") == '"v1"'
+
+def test_stale_responses_are_revalidated_by_last_modified(server, client):
+    client.get(server.url + "/modified")
+    response = client.get(server.url + "/modified")
+    assert response.text == "modified page" and response.from_cache
+    assert server.requests[-1][1].get("If-Modified-Since") == "Mon, 05 Oct 2026 10:00:00 GMT"
+
+def test_no_store_is_not_cached(server, client):
+    client.get(server.url + "/private")
+    assert not client.get(server.url + "/private").from_cache
+    assert len(server.requests) == 2 and len(client.cache) == 0
+
+def test_compressed_bodies_are_decoded(server, client):
+    assert client.get(server.url + "/gzip").text == "compressed page" * 100
+    assert "gzip" in server.requests[-1][1]["Accept-Encoding"]
+
+def test_connections_are_reused(server, client):
+    for path in ("/private", "/gzip", "/missing"):
+        client.get(server.url + path)
+    assert len({address for _, _, address in server.requests}) == 1
+
+def test_slow_servers_time_out(server, tmp_path):
+    client = HttpClient(cache_dir=None, timeout=0.2)
+    with pytest.raises(requests.Timeout):
+        client.get(server.url + "/slow")
+
+def test_long_bodies_are_cut_short_and_not_cached(server, client):
+    response = client.get(server.url + "/big", max_bytes=1000)
+    assert response.content == b"x" * 1000 and response.truncated
+    assert len(client.cache) == 0
+    response = client.get(server.url + "/fresh", max_bytes=1000)
+    assert response.text == "fresh page" and not response.truncated and len(client.cache) == 1
+
+def test_freshness_lifetime():
+    assert freshness_lifetime({"Cache-Control": "public, max-age=300"}) == 300
+    assert freshness_lifetime({"Cache-Control": "no-store"}) is None
+    assert freshness_lifetime({"Cache-Control": "no-cache", "ETag": '"x"'}) == 0
+    assert freshness_lifetime({"Date": "Mon, 05 Oct 2026 10:00:00 GMT", "Expires": "Mon, 05 Oct 2026 10:05:00 GMT"}) == 300
+    assert freshness_lifetime({"Date": "Mon, 05 Oct 2026 10:00:00 GMT", "Last-Modified": "Sun, 04 Oct 2026 10:00:00 GMT"}) == 8640
+    assert parse_cache_control('max-age="60", private') == {"max-age": "60", "private": None}
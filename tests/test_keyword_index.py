@@ -0,0 +1,50 @@
+import numpy as np
+import context
+from src.keyword_index import KeywordIndex, tokenize
+
+def test_tokenize():
+    """Tests that words are lowercased, deduplicated and single characters dropped."""
+    assert tokenize("User: Open Chrome, open it's a tab") == {"user", "open", "chrome", "it's", "tab"}
+
+def test_lookup_all_and_any_words():
+    index = KeywordIndex()
+    index.add(1, "book a flight to Paris")
+    index.add(2, "Paris weather")
+    index.add(3, "book club")
+    assert index.lookup(["paris"]).tolist() == [1, 2]
+    assert index.lookup(["book", "paris"]).tolist() == [1]
+    assert index.lookup(["book", "weather"], match_all=False).tolist() == [1, 2, 3]
+    assert index.lookup(["missing"]).tolist() == []
+
+def test_distinctive_words_are_rare_but_present():
+    index = KeywordIndex()
+    for i in range(10):
+        index.add(i, f"note {i}")
+    index.add(10, "note zebra")
+    assert index.distinctive_words("zebra note unicorn", max_frequency=2) == ["zebra"]
+
+def test_prune_drops_removed_entries():
+    """Tests that pruning removes dead ids and empty words but keeps the rest appendable."""
+    index = KeywordIndex()
+    index.add(1, "alpha beta")
+    index.add(2, "beta")
+    index.remove(1)
+    index.prune(lambda ids: ids != 1)
+    assert index.stale == 0
+    assert index.lookup(["beta"]).tolist() == [2]
+    assert index.frequency("alpha") == 0
+    index.add(3, "beta")
+    assert index.lookup(["beta"]).tolist() == [2, 3]
+
+def test_state_round_trip():
+    """Tests that an index rebuilt from its saved arrays finds the same entries and keeps its stale count."""
+    index = KeywordIndex()
+    index.add(1, "book a flight to Paris")
+    index.add(2, "Paris weather")
+    index.remove(1)
+    restored = KeywordIndex.from_state(index.state())
+    assert restored.lookup(["paris"]).tolist() == [1, 2]
+    assert restored.lookup(["weather"]).tolist() == [2]
+    assert restored.stale == 1
+    restored.add(3, "weather report")
+    assert restored.frequency("weather") == 2
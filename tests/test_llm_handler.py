@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import context
+from src import llm_handler
+from src.llm_handler import LLMClient
+
+REPLY = ["The document ", "explains ", "caching."]
+
+class ChatCompletionsHandler(BaseHTTPRequestHandler):
+    """A stand-in for an OpenAI-compatible /v1/chat/completions endpoint."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, body, **headers):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((request, self.headers, self.client_address))
+        if self.headers.get("Authorization") != "Bearer test-key":
+            return self.send_json(401, {"error": {"message": "Incorrect API key"}})
+        if self.server.failures:
+            self.server.failures -= 1
+            return self.send_json(503, {"error": {"message": "Overloaded"}}, Retry_After="0")
+        time.sleep(self.server.delay)
+        if not request["stream"]:
+            return self.send_json(200, {"choices": [{"message": {"role": "assistant", "content": "".join(REPLY) + "\n"}}]})
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = [{"choices": [{"delta": {"role": "assistant"}}]}] + [{"choices": [{"delta": {"content": piece}}]} for piece in REPLY]
+        for event in [f"data: {json.dumps(event)}\n\n" for event in events] + ["data: [DONE]\n\n"]:
+            data = event.encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ChatCompletionsHandler)
+    server.requests, server.failures, server.delay = [], 0, 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def client(server):
+    client = LLMClient(api_key="test-key", base_url=server.url, model="local-model")
+    yield client
+    client.close()
+
+def test_replies_are_streamed(server, client):
+    pieces = []
+    result = client.explain("Some document.", on_text=pieces.append)
+    assert pieces == REPLY and result == {"status": "success", "explanation": "The document explains caching."}
+    request = server.requests[0][0]
+    assert request["model"] == "local-model" and request["stream"] and "Some document." in request["messages"][1]["content"]
+
+def test_whole_replies(client):
+    assert client.chat([{"role": "user", "content": "Hi"}]) == "The document explains caching."
+
+def test_connections_are_reused(server, client):
+    for _ in range(3):
+        client.explain("Some document.", on_text=lambda piece: None)
+    assert len({address for _, _, address in server.requests}) == 1
+
+def test_overloaded_servers_are_retried(server, client):
+    server.failures = 2
+    assert client.explain("Some document.")["status"] == "success"
+    assert len(server.requests) == 3
+
+def test_bad_keys_are_reported(server):
+    result = LLMClient(api_key="wrong", base_url=server.url).explain("Some document.")
+    assert result["status"] == "error" and "Authentication failed" in result["message"]
+
+def test_slow_servers_time_out(server):
+    server.delay = 1
+    result = LLMClient(api_key="test-key", base_url=server.url, timeout=0.2).explain("Some document.")
+    assert result["status"] == "error" and len(server.requests) == 1 # A timed-out generation isn't retried
+
+def test_a_missing_key_is_not_configured(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.delenv("OPENAI_BASE_URL", raising=False)
+    client = LLMClient.from_settings({})
+    assert not client.configured and llm_handler.get_llm_explanation("text", client=client)["status"] == "not_configured"
+    assert LLMClient.from_settings({"base_url": "http://localhost:8000/v1"}).configured # A local server needs no key
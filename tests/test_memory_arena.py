@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import context
+from src.memory_arena import EntryArena
+
+def test_entries_round_trip():
+    """Tests that texts, including non-ASCII ones, come back exactly as stored."""
+    arena = EntryArena(capacity=2)
+    for i, text in enumerate(["hello", "café ☕", "", "third"]):
+        arena.append(i, text, 100.0 + i, importance=1.0 + i)
+    assert len(arena) == 4
+    assert arena.texts() == ["hello", "café ☕", "", "third"]
+    assert arena.text(1) == "café ☕"
+    assert arena.get(3) == {"id": 3, "text": "third", "time": 103.0, "importance": 4.0, "speaker": None}
+    assert 5 not in arena and arena.get(5) is None
+
+def test_ids_must_increase():
+    """Tests that ids out of order are rejected, since lookups rely on them being sorted."""
+    arena = EntryArena()
+    arena.append(5, "a", 0.0)
+    with pytest.raises(ValueError):
+        arena.append(5, "b", 0.0)
+
+def test_removed_entries_disappear_and_holes_are_compacted():
+    """Tests removal and that compaction keeps the survivors intact."""
+    arena = EntryArena()
+    for i in range(3000):
+        arena.append(i * 2, f"entry {i}", float(i))
+    arena.remove(np.arange(0, 4000, 2))
+    assert len(arena) == 1000
+    assert 0 not in arena
+    assert arena.text(4000) == "entry 2000"
+    assert arena.texts()[-1] == "entry 2999"
+    ids, times, importance = arena.columns()
+    assert ids[0] == 4000 and times[0] == 2000.0 and len(importance) == 1000
+    arena.append(6000, "after compaction", 0.0)
+    assert arena.text(6000) == "after compaction"
+
+def test_arena_is_smaller_than_python_objects():
+    """Tests that the arena undercuts a dict of entries by a wide margin."""
+    arena = EntryArena()
+    for i in range(10000):
+        arena.append(i, f"User: message number {i}", float(i))
+    assert arena.nbytes / len(arena) < 100
+
+def test_select_filters_by_speaker_and_time():
+    """Tests selecting live entries by speaker and an open or closed time range."""
+    arena = EntryArena()
+    for i in range(6):
+        arena.append(i, f"turn {i}", float(i), speaker="User" if i % 2 == 0 else "Nora")
+    arena.remove([4])
+    assert arena.select(speaker="user").tolist() == [0, 2]
+    assert arena.select(speaker="Nora", since=2.0).tolist() == [3, 5]
+    assert arena.select(since=1.0, until=3.0).tolist() == [1, 2, 3]
+    assert arena.select(speaker="nobody").tolist() == []
+    assert arena.contains([0, 4, 5, 9]).tolist() == [True, False, True, False]
+
+def test_state_round_trip_keeps_live_entries_up_to_max_id():
+    """Tests that an arena rebuilt from its saved arrays holds the same live entries and can keep growing."""
+    arena = EntryArena()
+    for i in range(5):
+        arena.append(i, f"turn {i} ☕", float(i), importance=1.0 + i, speaker="Nora" if i % 2 else None)
+    arena.remove([1])
+    restored = EntryArena.from_state(arena.state(max_id=3))
+    assert restored.texts() == ["turn 0 ☕", "turn 2 ☕", "turn 3 ☕"]
+    assert restored.get(3) == {"id": 3, "text": "turn 3 ☕", "time": 3.0, "importance": 4.0, "speaker": "Nora"}
+    restored.append(7, "later", 7.0, speaker="Nora")
+    assert restored.select(speaker="nora").tolist() == [3, 7]
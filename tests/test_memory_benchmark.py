@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+import context
+from benchmarks.memory_benchmark import recall_at_k, synthetic_embeddings
+
+def test_recall_at_k():
+    """Tests that recall counts the reference neighbours found, regardless of order."""
+    reference = np.array([[1, 2, 3, 4], [5, 6, 7, 8]])
+    assert recall_at_k(reference, reference) == 1.0
+    assert recall_at_k(reference, np.array([[4, 3, 2, 1], [5, 6, 0, 0]])) == pytest.approx(0.75)
+
+def test_synthetic_embeddings_are_unit_vectors():
+    """Tests that the synthetic memory looks like normalised sentence embeddings."""
+    vectors = synthetic_embeddings(500, 16, clusters=10)
+    assert vectors.shape == (500, 16) and vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
@@ -0,0 +1,427 @@
+import atexit
+import json
+import zlib
+import faiss
+import threading
+import time
+import pytest
+import numpy as np
+from unittest.mock import patch
+import context
+from src import memory_manager
+
+class FakeEncoder:
+    """A tiny bag-of-words encoder standing in for SentenceTransformer."""
+    def __init__(self, *args, **kwargs):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_sentence_embedding_dimension(self):
+        return 32
+
+    def encode(self, texts):
+        self.release.wait()
+        self.batches.append(list(texts))
+        vectors = np.zeros((len(texts), 32), dtype='float32')
+        for row, text in enumerate(texts):
+            for word in text.lower().replace(".", "").replace("?", "").split():
+                vectors[row, zlib.crc32(word.encode()) % 32] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-6)
+
+@pytest.fixture
+def memory():
+    with patch('src.memory_manager.SentenceTransformer', FakeEncoder):
+        yield memory_manager.MemoryManager(batch_window=0.2)
+
+def test_add_to_memory_returns_before_encoding(memory):
+    """Tests that adding text doesn't wait for the model."""
+    memory.model.release.clear()
+    memory.add_to_memory("User: open chrome")
+    assert memory.conversation_history == ["User: open chrome"]
+    assert not memory.flush(timeout=0.1)
+    memory.model.release.set()
+    assert memory.flush(timeout=5)
+
+def test_pending_texts_are_encoded_in_one_batch(memory):
+    """Tests that texts added close together share a single encode call."""
+    for i in range(5):
+        memory.add_to_memory(f"message number {i}")
+    memory.flush()
+    assert [len(b) for b in memory.model.batches] == [5]
+
+def test_queries_see_everything_added_before_them(memory):
+    """Tests that a query issued right after an add still finds that text."""
+    memory.add_to_memory("I'm planning a trip to Paris.")
+    memory.add_to_memory("The weather there is usually mild in the spring.")
+    memory.add_to_memory("I need to book a flight.")
+    assert memory.find_relevant_context("what is the weather there") == "The weather there is usually mild in the spring."
+
+def make_persistent(directory, **kwargs):
+    with patch('src.memory_manager.SentenceTransformer', FakeEncoder):
+        return memory_manager.MemoryManager(batch_window=0.01, storage_dir=str(directory), **kwargs)
+
+def test_failed_batch_does_not_stall_later_searches(tmp_path):
+    """Tests that an error while storing a batch drops it but leaves the worker and searches running."""
+    memory = make_persistent(tmp_path)
+    with patch.object(memory.store, 'append', side_effect=OSError("disk full")):
+        memory.add_to_memory("lost to a full disk")
+        assert memory.flush(timeout=5)
+    assert memory.conversation_history == []
+    memory.add_to_memory("written once there is room")
+    assert memory.find_relevant_context("room") == "written once there is room"
+    memory.close()
+
+def test_search_stops_waiting_for_a_stuck_worker():
+    """Tests that a search goes ahead with what is indexed once search_timeout has passed."""
+    with patch('src.memory_manager.SentenceTransformer', FakeEncoder):
+        memory = memory_manager.MemoryManager(batch_window=0.01, search_timeout=0.1)
+    memory.add_to_memory("first note")
+    memory.flush()
+    memory.model.release.clear()
+    memory.add_to_memory("second note")
+    start = time.time()
+    assert [hit["text"] for hit in memory.search(["first note"])[0]] == ["first note"]
+    assert time.time() - start < 5
+    memory.model.release.set()
+    assert memory.flush(timeout=5)
+
+def test_memory_survives_restart(tmp_path):
+    """Tests that a restarted manager finds what the previous one stored, without re-encoding it."""
+    memory = make_persistent(tmp_path)
+    memory.add_to_memory("I'm planning a trip to Paris.")
+    memory.add_to_memory("The weather there is usually mild in the spring.")
+    memory.close()
+
+    restored = make_persistent(tmp_path)
+    assert restored.conversation_history == ["I'm planning a trip to Paris.", "The weather there is usually mild in the spring."]
+    assert restored.index.ntotal == 2
+    assert restored.model.batches == []
+    assert restored.find_relevant_context("what is the weather there") == "The weather there is usually mild in the spring."
+    restored.close()
+
+def test_entries_after_the_checkpoint_are_indexed_on_load(tmp_path):
+    """Tests that entries flushed after the last checkpoint are added to the loaded index."""
+    memory = make_persistent(tmp_path, flush_interval=0)
+    memory.add_to_memory("first note")
+    memory.close()
+    memory = make_persistent(tmp_path, flush_interval=0)
+    memory.add_to_memory("second note about paris")
+    memory.flush()
+    # Simulate a crash: the log was flushed but no new checkpoint was written
+    memory.store.close()
+
+    restored = make_persistent(tmp_path)
+    assert restored.conversation_history == ["first note", "second note about paris"]
+    assert restored.index.ntotal == 2
+    assert restored.find_relevant_context("paris") == "second note about paris"
+
+def test_restart_loads_the_saved_state_and_replays_only_the_log_tail(tmp_path):
+    """Tests that entries and keywords come back from the checkpoint's saved state, with only later records parsed."""
+    memory = make_persistent(tmp_path, flush_interval=0, max_entries=4)
+    for text in ("alpha note", "bravo note", "charlie note", "echo note"):
+        memory.add_to_memory(text)
+    memory.close()
+    memory = make_persistent(tmp_path, flush_interval=0, max_entries=4)
+    memory.add_to_memory("alpha note", importance=5.0)
+    memory.flush()
+    memory.add_to_memory("delta note about paris") # Evicts bravo and charlie, the oldest unimportant entries
+    memory.flush()
+    # Simulate a crash: the refresh, entry and eviction were logged after the last checkpoint
+    memory.store.close()
+    atexit.unregister(memory.close)
+
+    with patch('src.memory_store.json.loads', wraps=json.loads) as loads:
+        restored = make_persistent(tmp_path, max_entries=4)
+    lines = [call.args[0] for call in loads.call_args_list if isinstance(call.args[0], bytes)] # Not checkpoint.json
+    assert len(lines) == 3 and not any(b"echo" in line for line in lines)
+    assert restored.conversation_history == ["alpha note", "echo note", "delta note about paris"]
+    assert restored.entries.get(0)["importance"] == 5.0
+    assert restored.index.ntotal == 3
+    assert list(restored.keywords.lookup(["echo"])) == [3]
+    assert restored.find_relevant_context("paris") == "delta note about paris"
+    restored.close()
+    restored = make_persistent(tmp_path, max_entries=4)
+    assert restored.conversation_history == ["alpha note", "echo note", "delta note about paris"]
+    restored.close()
+
+def test_torn_tail_is_dropped_on_load(tmp_path):
+    """Tests that a half-written entry from a crash is discarded rather than misaligning the index."""
+    memory = make_persistent(tmp_path)
+    memory.add_to_memory("a complete entry")
+    memory.close()
+    with open(tmp_path / "entries.jsonl", "a") as f:
+        f.write('{"text": "half wri')
+    with open(tmp_path / "vectors.f32", "ab") as f:
+        f.write(b"\x00" * 10)
+
+    restored = make_persistent(tmp_path)
+    assert restored.conversation_history == ["a complete entry"]
+    assert restored.index.ntotal == 1
+    restored.add_to_memory("written after recovery")
+    restored.close()
+    assert make_persistent(tmp_path).conversation_history == ["a complete entry", "written after recovery"]
+
+def test_least_valuable_memories_are_evicted_at_capacity():
+    """Tests that a full memory drops old, unimportant entries first and keeps important ones."""
+    with patch('src.memory_manager.SentenceTransformer', FakeEncoder):
+        memory = memory_manager.MemoryManager(batch_window=0.01, max_entries=10, half_life_days=1)
+    memory.add_to_memory("remember my passport number", importance=5.0)
+    for i in range(10):
+        memory.add_to_memory(f"small talk {i}")
+    memory.flush()
+    assert len(memory.entries) == 9
+    assert memory.index.ntotal == 9
+    assert memory.conversation_history[0] == "remember my passport number"
+    assert "small talk 0" not in memory.conversation_history
+    assert memory.find_relevant_context("passport") == "remember my passport number"
+
+def wait_for_approximate_index(memory, timeout=10):
+    """The index is rebuilt in the background after the batch that crossed the threshold is searchable."""
+    deadline = time.time() + timeout
+    while faiss.try_extract_index_ivf(memory.index) is None and time.time() < deadline:
+        time.sleep(0.01)
+    assert faiss.try_extract_index_ivf(memory.index) is not None
+    memory.flush()
+
+def test_large_memory_switches_to_an_approximate_index():
+    """Tests that crossing the threshold rebuilds the index as IVF without losing entries."""
+    with patch('src.memory_manager.SentenceTransformer', FakeEncoder):
+        memory = memory_manager.MemoryManager(batch_window=0.01, ann_threshold=200, nprobe=64)
+    for i in range(250):
+        memory.add_to_memory(f"note {i}")
+    memory.add_to_memory("the spare key is under the mat")
+    wait_for_approximate_index(memory)
+    assert memory.index.ntotal == 251
+    assert memory.find_relevant_context("where is the spare key") == "the spare key is under the mat"
+
+def test_evictions_persist_across_restarts(tmp_path):
+    """Tests that evicted entries stay gone after a restart."""
+    memory = make_persistent(tmp_path, max_entries=4)
+    for i in range(5):
+        memory.add_to_memory(f"entry {i}")
+    memory.flush()
+    memory.close()
+
+    restored = make_persistent(tmp_path, max_entries=4)
+    assert restored.conversation_history == ["entry 2", "entry 3", "entry 4"]
+    assert restored.index.ntotal == 3
+    restored.add_to_memory("entry 5")
+    assert restored.find_relevant_context("entry 5") == "entry 5"
+
+def test_mostly_evicted_log_is_compacted_at_checkpoint(tmp_path):
+    """Tests that a checkpoint rewrites a log that is mostly evicted entries, and the memory restores from it."""
+    memory = make_persistent(tmp_path, max_entries=4)
+    for i in range(12):
+        memory.add_to_memory(f"entry {i}")
+        memory.flush()
+    history = memory.conversation_history
+    memory.close()
+
+    assert sorted(path.name for path in tmp_path.iterdir() if not path.name.startswith("index-")) == [
+        "checkpoint.json", "entries-1.jsonl", "state-4-g1.npz", "vectors-1.f32"]
+    assert (tmp_path / "vectors-1.f32").stat().st_size == len(history) * 32 * 4
+    restored = make_persistent(tmp_path, max_entries=4)
+    assert restored.conversation_history == history
+    assert restored.index.ntotal == len(history)
+    assert restored.model.batches == []
+    restored.add_to_memory("entry 12")
+    assert restored.find_relevant_context("entry 12") == "entry 12"
+    history = restored.conversation_history
+    restored.close()
+    assert make_persistent(tmp_path).conversation_history == history
+
+@pytest.mark.parametrize("quantization", ["sq8", "pq"])
+def test_quantized_memory_finds_the_same_context(quantization):
+    """Tests that quantized vectors still retrieve the right memory, before and after the approximate index."""
+    with patch('src.memory_manager.SentenceTransformer', FakeEncoder):
+        memory = memory_manager.MemoryManager(batch_window=0.01, quantization=quantization, ann_threshold=300, nprobe=64)
+    memory.add_to_memory("the spare key is under the mat")
+    assert memory.find_relevant_context("where is the spare key") == "the spare key is under the mat"
+    assert memory_manager.index_quantization(memory.index) == "sq8"
+    for i in range(300):
+        memory.add_to_memory(f"note {i}")
+    wait_for_approximate_index(memory)
+    assert memory_manager.index_quantization(memory.index) == quantization
+    assert memory.find_relevant_context("where is the spare key") == "the spare key is under the mat"
+
+def test_small_memories_get_product_quantized():
+    """Tests that a memory with fewer entries than a full codebook still builds its PQ index."""
+    with patch('src.memory_manager.SentenceTransformer', FakeEncoder):
+        memory = memory_manager.MemoryManager(batch_window=0.01, quantization="pq", ann_threshold=50, nprobe=64)
+    for i in range(60):
+        memory.add_to_memory(f"note {i}")
+    memory.add_to_memory("the spare key is under the mat")
+    wait_for_approximate_index(memory)
+    assert memory_manager.index_quantization(memory.index) == "pq"
+    assert memory.find_relevant_context("where is the spare key") == "the spare key is under the mat"
+
+def test_memory_keeps_working_while_the_approximate_index_is_built():
+    """Tests that additions, evictions and searches carry on during a slow build, and none are lost by the swap."""
+    building, release = threading.Event(), threading.Event()
+    build = memory_manager.build_ivf_index
+    def slow_build(*args, **kwargs):
+        building.set()
+        release.wait()
+        return build(*args, **kwargs)
+
+    with patch('src.memory_manager.SentenceTransformer', FakeEncoder):
+        memory = memory_manager.MemoryManager(batch_window=0.01, ann_threshold=50, max_entries=100, nprobe=64)
+    with patch('src.memory_manager.build_ivf_index', side_effect=slow_build):
+        for i in range(60):
+            memory.add_to_memory(f"note {i}")
+        assert building.wait(timeout=10)
+        for i in range(60, 120):
+            memory.add_to_memory(f"note {i}")
+        memory.add_to_memory("the spare key is under the mat", importance=5.0)
+        assert memory.flush(timeout=10)
+        assert faiss.try_extract_index_ivf(memory.index) is None
+        assert memory.find_relevant_context("where is the spare key") == "the spare key is under the mat"
+        assert len(memory.entries) < 121 # Evicted during the build
+        release.set()
+        wait_for_approximate_index(memory)
+    assert memory.index.ntotal == len(memory.entries)
+    assert memory.find_relevant_context("where is the spare key") == "the spare key is under the mat"
+
+def test_failed_index_build_keeps_the_exact_index():
+    """Tests that the worker survives an approximate index that can't be built, and keeps serving searches."""
+    with patch('src.memory_manager.SentenceTransformer', FakeEncoder):
+        memory = memory_manager.MemoryManager(batch_window=0.01, ann_threshold=50)
+    with patch('src.memory_manager.build_ivf_index', side_effect=RuntimeError("training failed")):
+        for i in range(60):
+            memory.add_to_memory(f"note {i}")
+        deadline = time.time() + 10
+        while memory.ann_threshold is not None and time.time() < deadline:
+            time.sleep(0.01)
+    assert memory.ann_threshold is None and faiss.try_extract_index_ivf(memory.index) is None
+    memory.add_to_memory("the spare key is under the mat")
+    assert memory.find_relevant_context("where is the spare key") == "the spare key is under the mat"
+
+def test_changing_quantization_rebuilds_the_index_on_load(tmp_path):
+    """Tests that a checkpoint with other settings is rebuilt from the stored vectors."""
+    memory = make_persistent(tmp_path)
+    memory.add_to_memory("the spare key is under the mat")
+    memory.close()
+    restored = make_persistent(tmp_path, quantization="sq8")
+    assert memory_manager.index_quantization(restored.index) == "sq8"
+    assert restored.index.ntotal == 1
+    assert restored.find_relevant_context("spare key") == "the spare key is under the mat"
+
+def test_unknown_quantization_is_rejected():
+    with patch('src.memory_manager.SentenceTransformer', FakeEncoder):
+        with pytest.raises(ValueError):
+            memory_manager.MemoryManager(quantization="int4")
+
+def test_embedding_cache_evicts_least_recently_used():
+    """Tests the cache's LRU bound and hit-rate counters."""
+    cache = memory_manager.EmbeddingCache(max_entries=2)
+    cache.put("yes", np.ones(4))
+    cache.put("no", np.zeros(4))
+    assert cache.get("yes")[0] is not None # "no" is now the least recently used
+    cache.put("open chrome", np.ones(4), entry_id=7)
+    assert cache.get("no") == (None, None)
+    assert cache.get("open chrome")[1] == 7
+    assert cache.stats() == {"hits": 2, "misses": 1, "hit_rate": 2 / 3, "size": 2}
+
+def test_repeated_texts_are_encoded_once_and_stored_once(memory):
+    """Tests that repeating a text refreshes its entry instead of encoding and storing it again."""
+    memory.add_to_memory("User: yes")
+    memory.flush()
+    first_time = memory.entries.get(0)["time"]
+    memory.add_to_memory("User: yes")
+    memory.add_to_memory("User: yes")
+    memory.flush()
+    assert memory.conversation_history == ["User: yes"]
+    assert memory.index.ntotal == 1
+    assert memory.duplicate_count == 2
+    assert sum(batch.count("User: yes") for batch in memory.model.batches) == 1
+    assert memory.entries.get(0)["time"] > first_time
+
+def test_queries_reuse_cached_embeddings(memory):
+    """Tests that querying a text already seen doesn't call the model."""
+    memory.add_to_memory("open chrome")
+    memory.flush()
+    encodes = len(memory.model.batches)
+    assert memory.find_relevant_context("open chrome") == "open chrome"
+    assert memory.find_relevant_context("open chrome") == "open chrome"
+    assert len(memory.model.batches) == encodes
+    assert memory.cache.hits == 2
+
+def test_duplicates_in_one_batch_share_one_encode(memory):
+    """Tests that a text repeated before its first copy is embedded is still encoded only once."""
+    memory.model.release.clear()
+    memory.add_to_memory("no")
+    memory.add_to_memory("no")
+    memory.model.release.set()
+    memory.flush()
+    assert memory.model.batches == [["no"]]
+
+def test_refreshes_and_deduplication_survive_restarts(tmp_path):
+    """Tests that a refreshed importance is restored and repeats after a restart are still recognised."""
+    memory = make_persistent(tmp_path)
+    memory.add_to_memory("my passport is in the drawer")
+    memory.flush()
+    memory.add_to_memory("my passport is in the drawer", importance=5.0)
+    memory.close()
+
+    restored = make_persistent(tmp_path)
+    assert restored.entries.get(0)["importance"] == 5.0
+    restored.add_to_memory("my passport is in the drawer")
+    restored.flush()
+    assert restored.conversation_history == ["my passport is in the drawer"]
+    assert restored.model.batches == []
+    restored.close()
+
+def test_batch_search_encodes_all_queries_in_one_call(memory):
+    """Tests that several queries share one encode call and each get their own top-k."""
+    for text in ["User: book a flight to Paris", "User: play some jazz", "Nora: the weather is sunny"]:
+        memory.add_to_memory(text)
+    memory.flush()
+    encodes = len(memory.model.batches)
+    results = memory.search(["flight to paris", "jazz music", "weather sunny"], k=2)
+    assert len(memory.model.batches) == encodes + 1
+    assert [r[0]["text"] for r in results] == ["User: book a flight to Paris", "User: play some jazz", "Nora: the weather is sunny"]
+    assert all(len(r) == 2 for r in results)
+    assert results[0][0]["distance"] <= results[0][1]["distance"]
+
+def test_search_filters_by_speaker_time_and_keywords(memory):
+    """Tests metadata and keyword filters narrowing the results."""
+    memory.add_to_memory("User: remind me about the dentist")
+    memory.add_to_memory("Nora: I will remind you about the dentist")
+    memory.flush()
+    cutoff = time.time()
+    time.sleep(0.01)
+    memory.add_to_memory("User: cancel the dentist reminder")
+    memory.flush()
+
+    assert memory.entries.get(0)["speaker"] == "User"
+    said_by_nora = memory.search(["dentist"], k=5, speaker="nora")[0]
+    assert [r["text"] for r in said_by_nora] == ["Nora: I will remind you about the dentist"]
+    recent = memory.search(["dentist"], k=5, since=cutoff)[0]
+    assert [r["text"] for r in recent] == ["User: cancel the dentist reminder"]
+    with_keyword = memory.search(["dentist"], k=5, keywords=["cancel"])[0]
+    assert [r["text"] for r in with_keyword] == ["User: cancel the dentist reminder"]
+    assert memory.search(["dentist"], k=5, speaker="Nobody") == [[]]
+
+def test_rare_query_words_skip_the_full_search():
+    """Tests that a query with a distinctive word is answered from the entries containing it."""
+    with patch('src.memory_manager.SentenceTransformer', FakeEncoder):
+        memory = memory_manager.MemoryManager(batch_window=0.01, keyword_fraction=0.1)
+    for i in range(30):
+        memory.add_to_memory(f"User: note number {i}")
+    memory.add_to_memory("User: the zebra crossing is closed")
+    memory.flush()
+    with patch.object(memory, '_search_index', side_effect=AssertionError("searched everything")):
+        assert memory.find_relevant_context("is the zebra crossing open") == "User: the zebra crossing is closed"
+
+def test_filtered_search_on_the_approximate_index_finds_allowed_entries():
+    """Tests that a filter still returns results when the nearest clusters hold none of the allowed entries."""
+    with patch('src.memory_manager.SentenceTransformer', FakeEncoder), patch('src.memory_manager.EXACT_SEARCH_LIMIT', 0):
+        memory = memory_manager.MemoryManager(batch_window=0.01, ann_threshold=200, nprobe=1)
+    for i in range(300):
+        memory.add_to_memory(f"{'User' if i % 2 else 'Nora'}: note {i}")
+    wait_for_approximate_index(memory)
+    results = memory.search(["note"], k=3, speaker="User")[0]
+    assert len(results) == 3
+    assert all(r["speaker"] == "User" for r in results)
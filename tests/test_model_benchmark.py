@@ -0,0 +1,9 @@
+import pytest
+import context
+from benchmarks.model_benchmark import similarity
+
+def test_similarity():
+    """Tests that similarity rewards matching tokens and counts exact matches separately."""
+    assert similarity([[1, 2, 3, 4]], [[1, 2, 3, 4]]) == (1.0, 1.0)
+    ratio, exact = similarity([[1, 2, 3, 4], [5, 6]], [[1, 2, 3, 9], [5, 6]])
+    assert ratio == pytest.approx((0.75 + 1.0) / 2) and exact == 0.5
@@ -0,0 +1,35 @@
+import pytest
+import torch
+from transformers import GPT2Config, GPT2LMHeadModel
+import context
+from src import model_optimization
+
+def tiny_gpt2():
+    torch.manual_seed(0)
+    return GPT2LMHeadModel(GPT2Config(vocab_size=128, n_positions=64, n_embd=64, n_layer=2, n_head=2)).eval()
+
+def test_int8_quantizes_every_projection():
+    """Tests that GPT-2's Conv1D layers are quantized too, not just its output head."""
+    model = model_optimization.optimize_model(tiny_gpt2(), "int8")
+    assert not any(isinstance(m, torch.nn.Linear) or type(m).__name__ == "Conv1D" for m in model.modules())
+    assert sum(isinstance(m, torch.ao.nn.quantized.dynamic.Linear) for m in model.modules()) == 2 * 4 + 1
+
+def test_int8_stays_close_to_float32():
+    reference = tiny_gpt2()
+    input_ids = torch.randint(0, 128, (1, 16), generator=torch.Generator().manual_seed(1))
+    with torch.inference_mode():
+        expected = reference(input_ids).logits
+        actual = model_optimization.optimize_model(tiny_gpt2(), "int8")(input_ids).logits
+    assert torch.nn.functional.cosine_similarity(expected.flatten(), actual.flatten(), dim=0) > 0.99
+
+def test_conv1d_to_linear_is_exact():
+    """Tests that swapping Conv1D for Linear alone doesn't change the model's output."""
+    reference, converted = tiny_gpt2(), tiny_gpt2()
+    model_optimization._replace_conv1d(converted)
+    input_ids = torch.arange(10)[None, :]
+    with torch.inference_mode():
+        assert torch.allclose(reference(input_ids).logits, converted(input_ids).logits, atol=1e-5)
+
+def test_unknown_optimization_is_rejected():
+    with pytest.raises(ValueError):
+        model_optimization.optimize_model(tiny_gpt2(), "fp4")
@@ -0,0 +1,66 @@
+import pytest
+import numpy as np
+import cv2
+from unittest.mock import patch
+import context
+from src import ocr_pipeline
+
+def _page(text_rows=("HELLO WORLD", "SECOND LINE"), top=80, scale=1.2, thickness=3):
+    """Renders dark text on a light page, standing in for a camera frame."""
+    page = np.full((240, 480, 3), 230, dtype=np.uint8)
+    for i, row in enumerate(text_rows):
+        cv2.putText(page, row, (30, top + i * 60), cv2.FONT_HERSHEY_SIMPLEX, scale, (20, 20, 20), thickness)
+    return page
+
+def test_sharpness_prefers_focused_frames():
+    """Tests that blurring a frame lowers its variance-of-Laplacian score."""
+    page = _page()
+    assert ocr_pipeline.sharpness(page) > ocr_pipeline.sharpness(cv2.GaussianBlur(page, (9, 9), 0))
+
+def test_perceptual_hash_tolerates_noise_but_not_new_pages():
+    """Tests that a noisy copy hashes close to the original and a different page does not."""
+    page = _page()
+    noise = np.random.default_rng(0).integers(-8, 8, page.shape)
+    noisy = np.clip(page.astype(int) + noise, 0, 255).astype(np.uint8)
+    other = _page(("A DIFFERENT", "PAGE ENTIRELY", "WITH MORE TEXT"))
+    original_hash = ocr_pipeline.perceptual_hash(page)
+    assert ocr_pipeline.hamming_distance(original_hash, ocr_pipeline.perceptual_hash(noisy)) <= 6
+    assert ocr_pipeline.hamming_distance(original_hash, ocr_pipeline.perceptual_hash(other)) > 6
+
+def test_find_text_regions_locates_text_blocks():
+    """Tests that the text lines are found and deskewed into wide, short crops."""
+    gray = cv2.cvtColor(_page(), cv2.COLOR_BGR2GRAY)
+    regions = ocr_pipeline.find_text_regions(gray)
+    assert regions
+    crop = ocr_pipeline.deskew_region(gray, regions[0])
+    assert crop.shape[1] > crop.shape[0]
+
+@patch('src.ocr_pipeline.pytesseract.image_to_string')
+def test_read_text_caches_repeated_pages(mock_image_to_string):
+    """Tests that reading the same page again is served from the cache."""
+    mock_image_to_string.return_value = "HELLO WORLD"
+    pipeline = ocr_pipeline.OCRPipeline(workers=2)
+    page = _page()
+
+    first = pipeline.read_text(page)
+    calls = mock_image_to_string.call_count
+    assert calls >= 1
+    assert pipeline.read_text(page.copy()) == first
+    assert mock_image_to_string.call_count == calls
+
+@patch('src.ocr_pipeline.pytesseract.image_to_string')
+def test_pages_sharing_a_layout_are_not_confused(mock_image_to_string):
+    """Tests that a page whose hash is near a cached page's is read again when its text differs."""
+    invoice = _page(("INVOICE 2024 TOTAL 450", "PAY BY MONDAY", "THANK YOU"), top=60, scale=1.0, thickness=2)
+    receipt = _page(("RECEIPT 1999 SUM 120", "DUE ON FRIDAY", "GOODBYE ALL"), top=60, scale=1.0, thickness=2)
+    assert ocr_pipeline.hamming_distance(ocr_pipeline.perceptual_hash(invoice), ocr_pipeline.perceptual_hash(receipt)) <= 6
+
+    pipeline = ocr_pipeline.OCRPipeline(workers=1)
+    mock_image_to_string.return_value = "INVOICE"
+    assert pipeline.read_text(invoice).startswith("INVOICE")
+    mock_image_to_string.return_value = "RECEIPT"
+    assert pipeline.read_text(receipt).startswith("RECEIPT")
+    # A slightly moved, noisier view of the first page still comes from the cache
+    moved = np.roll(np.roll(invoice, 5, axis=1), 3, axis=0)
+    noisy = np.clip(moved.astype(int) + np.random.default_rng(1).integers(-8, 8, moved.shape), 0, 255).astype(np.uint8)
+    assert pipeline.read_text(noisy).startswith("INVOICE")
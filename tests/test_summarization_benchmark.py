@@ -0,0 +1,12 @@
+import context
+from benchmarks.summarization_benchmark import synthetic_document, word_tokenizer
+
+def test_synthetic_document_has_the_requested_words():
+    document = synthetic_document(1000, ["alpha", "beta", "gamma"])
+    assert len(document.split()) == 1000 and document.endswith(".")
+
+def test_word_tokenizer_matches_the_model_vocabulary():
+    """Tests that every id an untrained model can emit decodes, and every word is one token."""
+    tokenizer, words = word_tokenizer(50264)
+    assert len(tokenizer) == 50264
+    assert tokenizer(f"{words[0]} {words[-1]}.", add_special_tokens=False)["input_ids"] == [4, 50263]
@@ -0,0 +1,154 @@
+import pytest
+import torch
+from unittest.mock import patch
+from tokenizers import Tokenizer, models, pre_tokenizers, processors
+from transformers import BartConfig, BartForConditionalGeneration, PreTrainedTokenizerFast
+import context
+from src import summarizer
+from src.summary_cache import SummaryCache
+
+WORDS = ["the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog", "and", "runs", "away", "home", "today"]
+SPECIALS = ["<s>", "<pad>", "</s>", "<unk>"]
+
+def word_tokenizer(max_length=64):
+    """A real fast tokenizer with one token per word (with or without a full stop), built without downloading."""
+    vocab = {token: i for i, token in enumerate(SPECIALS + WORDS + [word + "." for word in WORDS])}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+    tokenizer.post_processor = processors.TemplateProcessing(single="<s> $A </s>", special_tokens=[("<s>", 0), ("</s>", 2)])
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer, bos_token="<s>", pad_token="<pad>", eos_token="</s>",
+                                   unk_token="<unk>", model_max_length=max_length)
+
+class CountingBart(BartForConditionalGeneration):
+    def generate(self, *args, **kwargs):
+        self.batches.append(kwargs["input_ids"].shape[0])
+        return super().generate(*args, **kwargs)
+
+def tiny_bart():
+    torch.manual_seed(0)
+    model = CountingBart(BartConfig(vocab_size=len(SPECIALS) + 2 * len(WORDS), d_model=16, encoder_layers=1, decoder_layers=1,
+                                    encoder_attention_heads=2, decoder_attention_heads=2, encoder_ffn_dim=32,
+                                    decoder_ffn_dim=32, max_position_embeddings=64, pad_token_id=1, bos_token_id=0,
+                                    eos_token_id=2, decoder_start_token_id=2, forced_eos_token_id=None))
+    with torch.no_grad():
+        # Untrained, the model favours ending at once; a blank eos embedding (tied to the output) makes it write
+        model.model.shared.weight[2].zero_()
+    model.batches = []
+    return model
+
+def make_summarizer(**kwargs):
+    return summarizer.Summarizer(model=tiny_bart(), tokenizer=word_tokenizer(), **kwargs)
+
+def sentences(count):
+    return " ".join(f"the quick brown fox jumps over the lazy dog {i % 2 and 'today.' or 'home.'}" for i in range(count))
+
+def test_split_sentences():
+    assert summarizer.split_sentences("Hi there. How are you?  I said \"fine.\" And then") == \
+        ["Hi there.", "How are you?", "I said \"fine.\"", "And then"]
+
+def test_chunks_fit_the_model_and_end_on_sentences():
+    model = make_summarizer()
+    model._load()
+    chunks = model._chunks(summarizer.split_sentences(sentences(30)))
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(model.tokenizer(chunk)["input_ids"]) <= 64
+        assert chunk.endswith(".")
+
+def test_unpunctuated_text_is_cut_between_words():
+    model = make_summarizer()
+    model._load()
+    chunks = model._chunks([" ".join(["fox"] * 300)])
+    assert len(chunks) > 1 and all(len(model.tokenizer(chunk)["input_ids"]) <= 64 for chunk in chunks)
+
+def test_long_text_is_summarized_in_batches_then_reduced():
+    """Tests that chunks are summarized several per generate() call, finishing with one final pass."""
+    model = make_summarizer(batch_size=4)
+    summary = model.summarize(sentences(60), max_length=20, min_length=5)
+    assert isinstance(summary, str)
+    assert max(model.model.batches) == 4
+    assert model.model.batches[-1] == 1
+
+def test_short_text_takes_one_pass():
+    model = make_summarizer()
+    model.summarize(sentences(2), max_length=20, min_length=5)
+    assert model.model.batches == [1]
+
+def test_summary_streams_as_it_is_generated():
+    model = make_summarizer()
+    pieces = []
+    summary = model.summarize(sentences(3), max_length=12, min_length=8, on_text=pieces.append)
+    assert len(pieces) > 1
+    assert "".join(pieces).strip() == summary
+
+def test_configured_beam_width_is_kept_when_streaming():
+    """Tests that a beam width set above 1 is used for a streamed summary, which then arrives in one piece."""
+    model = make_summarizer(num_beams=3)
+    pieces = []
+    with patch.object(model.model, 'generate', wraps=model.model.generate) as generate:
+        summary = model.summarize(sentences(3), max_length=12, min_length=8, on_text=pieces.append)
+    assert generate.call_args.kwargs["num_beams"] == 3 and "streamer" not in generate.call_args.kwargs
+    assert pieces == [summary]
+
+def test_model_is_loaded_once():
+    with patch('src.summarizer.AutoTokenizer.from_pretrained', return_value=word_tokenizer()) as load_tokenizer, \
+         patch('src.summarizer.AutoModelForSeq2SeqLM.from_pretrained', return_value=tiny_bart()) as load_model:
+        model = summarizer.Summarizer()
+        assert not load_model.called # Not until it is needed
+        model.summarize(sentences(2), max_length=10, min_length=2)
+        model.summarize(sentences(3), max_length=10, min_length=2)
+    assert load_model.call_count == 1 and load_tokenizer.call_count == 1
+
+COUNCIL = ("The council met on Tuesday to discuss transport. Bus routes will be extended to the northern suburbs. "
+           "The weather was sunny. Residents raised concerns about the cost of the transport plan. "
+           "The council will vote on the transport plan next month. A cat sat on a mat.")
+
+def test_extractive_summary_keeps_central_sentences_in_order():
+    assert summarizer.extractive_summary(COUNCIL, 2) == \
+        "The council met on Tuesday to discuss transport. The council will vote on the transport plan next month."
+
+def test_extractive_summary_of_short_text_is_the_text():
+    assert summarizer.extractive_summary("Just one sentence here.", 3) == "Just one sentence here."
+
+def test_extractive_summary_can_use_embeddings():
+    """Tests that given an encoder, sentences are ranked by its embeddings instead of by their words."""
+    def embed(sentences):
+        return torch.tensor([[1.0, 0.0] if "cat" in s or "weather" in s else [0.0, 1.0] for s in sentences]) + 0.01
+    summary = summarizer.extractive_summary(COUNCIL, 1, embed=lambda sentences: embed(sentences).numpy())
+    assert "cat" not in summary and "weather" not in summary
+
+def test_extractive_summary_of_long_text_is_narrowed_first():
+    text = " ".join(f"Sentence {i} mentions the transport plan." for i in range(summarizer.MAX_RANKED_SENTENCES + 500))
+    assert len(summarizer.split_sentences(summarizer.extractive_summary(text, 3))) == 3
+
+def test_extractive_mode_never_loads_the_model():
+    with patch('src.summarizer.AutoModelForSeq2SeqLM.from_pretrained', side_effect=AssertionError("loaded")):
+        model = summarizer.Summarizer(mode="extractive")
+        pieces = []
+        summary = model.summarize(COUNCIL, on_text=pieces.append)
+    assert pieces == [summary] and len(summarizer.split_sentences(summary)) == 3
+
+def test_mode_can_be_chosen_per_call():
+    model = make_summarizer()
+    assert model.summarize(COUNCIL, mode="extractive") == summarizer.extractive_summary(COUNCIL, 3)
+    assert model.model.batches == []
+
+def test_requested_mode():
+    assert summarizer.requested_mode("yes, quickly") == "extractive"
+    assert summarizer.requested_mode("summarize it in detail") == "abstractive"
+    assert summarizer.requested_mode("yes") is None
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        summarizer.Summarizer(mode="poetic")
+
+def test_repeated_summaries_come_from_the_cache(tmp_path):
+    model = make_summarizer(cache=SummaryCache(str(tmp_path)))
+    first = model.summarize(sentences(3), max_length=12, min_length=4)
+    assert model.summarize(sentences(3), max_length=12, min_length=4) == first
+    assert model.model.batches == [1]
+    # A streamed summary decodes differently, so it is kept apart
+    pieces = []
+    streamed = model.summarize(sentences(3), max_length=12, min_length=4, on_text=pieces.append)
+    assert model.summarize(sentences(3), max_length=12, min_length=4, on_text=pieces.append) == streamed
+    assert model.model.batches == [1, 1] and pieces[-1] == streamed
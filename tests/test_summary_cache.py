@@ -0,0 +1,44 @@
+import os
+import context
+from src.summary_cache import SummaryCache
+
+def test_summaries_survive_a_restart(tmp_path):
+    cache = SummaryCache(str(tmp_path))
+    key = cache.key("Some page text.", model_name="m", max_length=150)
+    assert cache.get(key) is None
+    cache.put(key, "A summary.")
+    reopened = SummaryCache(str(tmp_path))
+    assert reopened.get(key) == "A summary."
+    assert reopened.stats()["hits"] == 1 and len(reopened) == 1
+
+def test_key_ignores_whitespace_but_not_parameters():
+    key = SummaryCache.key("Some  page\n text.", model_name="m", max_length=150)
+    assert key == SummaryCache.key(" Some page text. ", model_name="m", max_length=150)
+    assert key != SummaryCache.key("Some page text.", model_name="m", max_length=60)
+    assert key != SummaryCache.key("Some page text.", model_name="other", max_length=150)
+
+def test_least_recently_used_is_evicted(tmp_path):
+    cache = SummaryCache(str(tmp_path), max_bytes=25)
+    cache.put("a", "a" * 10)
+    cache.put("b", "b" * 10)
+    cache.get("a")
+    cache.put("c", "c" * 10)
+    assert cache.get("b") is None and cache.get("a") == "a" * 10 and cache.get("c") == "c" * 10
+    assert cache.total_bytes == 20 and sorted(os.listdir(tmp_path)) == ["a.txt", "c.txt"]
+
+def test_recency_is_kept_on_disk(tmp_path):
+    """Tests that use before a restart still decides what is evicted after it."""
+    cache = SummaryCache(str(tmp_path), max_bytes=25)
+    cache.put("a", "a" * 10)
+    cache.put("b", "b" * 10)
+    os.utime(tmp_path / "a.txt", (1000, 1000))
+    os.utime(tmp_path / "b.txt", (2000, 2000))
+    reopened = SummaryCache(str(tmp_path), max_bytes=25)
+    reopened.get("a")
+    reopened.put("c", "c" * 10)
+    assert sorted(os.listdir(tmp_path)) == ["a.txt", "c.txt"]
+
+def test_unfinished_writes_are_cleaned_up(tmp_path):
+    (tmp_path / "a.txt.tmp").write_text("half a sum")
+    cache = SummaryCache(str(tmp_path))
+    assert len(cache) == 0 and os.listdir(tmp_path) == []
@@ -0,0 +1,44 @@
+from unittest.mock import patch
+import context
+from src.task_planner import TaskPlanner
+
+class ReportAssistant:
+    """Records what the planner asks the assistant to do."""
+    def __init__(self):
+        self.said, self.commands, self.summarized = [], [], []
+
+    def speak(self, text):
+        self.said.append(text)
+
+    def process_command(self, command, from_plan=False):
+        self.commands.append((command, from_plan))
+
+    def summarize_pages(self, urls, from_plan=False, mode=None):
+        self.summarized.append((urls, from_plan, mode))
+
+def test_report_plan_summarizes_its_sources_together():
+    assistant = ReportAssistant()
+    planner = TaskPlanner(assistant)
+    plan = planner.create_plan("create a report on solar power")
+    with patch('src.web_interaction.wikipedia.search', return_value=["Solar power", "Solar panel", "Photovoltaics"]) as search:
+        planner.execute_plan(plan)
+    search.assert_called_once_with("solar power", results=3)
+    urls, from_plan, _ = assistant.summarized[0]
+    assert len(assistant.summarized) == 1 and from_plan
+    assert urls == ["https://en.wikipedia.org/wiki/Solar_power", "https://en.wikipedia.org/wiki/Solar_panel",
+                    "https://en.wikipedia.org/wiki/Photovoltaics"]
+    assert assistant.commands == [("search for solar power", True), ("create document about solar power", True)]
+
+def test_report_without_sources_says_so():
+    assistant = ReportAssistant()
+    planner = TaskPlanner(assistant)
+    with patch('src.web_interaction.wikipedia.search', return_value=[]):
+        planner.execute_plan(planner.create_plan("create a report on nothing at all"))
+    assert assistant.summarized == [] and "I couldn't find any sources about nothing at all." in assistant.said
+
+def test_plan_steps_summarize_in_the_planner_mode():
+    assistant = ReportAssistant()
+    with patch('src.web_interaction.wikipedia.search', return_value=["Solar power"]):
+        TaskPlanner(assistant).summarize_sources("solar power")
+        TaskPlanner(assistant, summary_mode="abstractive").summarize_sources("solar power")
+    assert [mode for _, _, mode in assistant.summarized] == ["extractive", "abstractive"]
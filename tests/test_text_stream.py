@@ -0,0 +1,21 @@
+import context
+from src.text_stream import SentenceSplitter
+
+def test_sentences_are_released_once_complete():
+    splitter = SentenceSplitter()
+    assert splitter.feed("The weather in Paris is") == []
+    assert splitter.feed(" mild today.") == [] # The sentence might still continue ("today...")
+    assert splitter.feed(" Bring a") == ["The weather in Paris is mild today."]
+    assert splitter.feed(" jacket!\n") == ["Bring a jacket!"]
+    assert splitter.flush() is None
+
+def test_short_sentences_wait_for_the_next():
+    splitter = SentenceSplitter()
+    assert splitter.feed("Hi. ") == []
+    assert splitter.feed("How are you doing today? ") == ["Hi. How are you doing today?"]
+
+def test_flush_returns_the_unfinished_rest():
+    splitter = SentenceSplitter()
+    splitter.feed("It was \"great.\" And then")
+    assert splitter.flush() == "And then"
+    assert splitter.flush() is None
@@ -0,0 +1,97 @@
+import pytest
+import numpy as np
+import os
+import threading
+import time
+import context
+from src.vision_workers import SharedFrameRing, VisionWorkerPool
+
+def load_mean_worker():
+    """A lightweight stand-in for a model loader, run inside the worker process."""
+    def handle(frame, extra):
+        return {"mean": float(frame.mean()), "shape": frame.shape, "extra": extra}
+    return handle
+
+def test_shared_frame_ring_is_visible_when_attached_by_name():
+    """Tests that a frame written by the owner is readable through a second attachment."""
+    ring = SharedFrameRing((4, 6, 3), slots=2)
+    try:
+        frame = np.arange(4 * 6 * 3, dtype=np.uint8).reshape(4, 6, 3)
+        ring.write(1, frame)
+        attached = SharedFrameRing((4, 6, 3), slots=2, name=ring.name)
+        assert np.array_equal(attached.read(1), frame)
+        attached.close()
+    finally:
+        ring.close()
+
+def test_worker_pool_returns_compact_results():
+    """Tests that a worker process reads the shared frame and sends back its result."""
+    pool = VisionWorkerPool({"mean": load_mean_worker}, slots=2)
+    try:
+        done = threading.Event()
+        results = []
+        def on_result(result):
+            results.append(result)
+            done.set()
+
+        frame = np.full((8, 8, 3), 7, dtype=np.uint8)
+        assert pool.submit("mean", frame, on_result, extra="tag")
+        # A second frame for the same task is dropped while the first is in flight
+        assert not pool.submit("mean", frame, on_result)
+        assert done.wait(timeout=60)
+        assert results == [{"mean": 7.0, "shape": (8, 8, 3), "extra": "tag"}]
+    finally:
+        pool.close()
+
+def load_failing_worker():
+    raise RuntimeError("no model file")
+
+def load_crashing_worker():
+    """A handler that kills its process when asked to, like a crash in native model code."""
+    def handle(frame, extra):
+        if extra == "crash":
+            os._exit(1)
+        return extra
+    return handle
+
+def _wait_until(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+def test_task_whose_model_fails_to_load_is_disabled():
+    """Tests that a loader error is reported back and the task stops accepting frames."""
+    pool = VisionWorkerPool({"broken": load_failing_worker, "mean": load_mean_worker}, slots=2)
+    try:
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        pool.submit("broken", frame, lambda result: None)
+        assert _wait_until(lambda: "broken" in pool.disabled)
+        assert not pool.submit("broken", frame, lambda result: None)
+        assert not pool._pending
+        results = []
+        assert pool.submit("mean", frame, results.append)
+        assert _wait_until(lambda: results)
+    finally:
+        pool.close()
+
+def test_dead_worker_is_restarted_then_its_task_disabled():
+    """Tests that a crashed worker's frame is given up, the worker restarted, and a repeat offender disabled."""
+    pool = VisionWorkerPool({"crashy": load_crashing_worker}, slots=2, max_restarts=1)
+    try:
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        assert pool.submit("crashy", frame, lambda result: None, extra="crash")
+        assert _wait_until(lambda: pool._restarts["crashy"] == 1 and not pool._pending)
+
+        results = []
+        assert pool.submit("crashy", frame, results.append, extra="fine")
+        assert _wait_until(lambda: results == ["fine"])
+
+        assert pool.submit("crashy", frame, lambda result: None, extra="crash")
+        assert _wait_until(lambda: "crashy" in pool.disabled)
+        assert not pool._pending
+        assert sorted(pool._free_slots) == [0, 1]
+    finally:
+        pool.close()
@@ -0,0 +1,124 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+import pytest
+import requests
+import wikipedia
+import context
+from src import web_interaction
+from src.answer_cache import AnswerCache, LeadSnapshot
+from src.http_client import HttpClient
+
+def test_failed_summary_reports_it():
+    with patch('src.web_interaction.Summarizer.summarize', side_effect=OSError("no model")):
+        assert web_interaction.summarize_text("some text") == "Could not summarize the content."
+
+def test_default_summarizer_is_shared():
+    with patch('src.web_interaction.Summarizer.summarize', return_value="short") as summarize:
+        web_interaction.summarize_text("some text")
+        first = web_interaction.default_summarizer
+        web_interaction.summarize_text("more text")
+    assert web_interaction.default_summarizer is first and summarize.call_count == 2
+
+class PageHandler(BaseHTTPRequestHandler):
+    """Serves /<seconds> as a page that takes that long, tracking how many requests are in flight."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.active += 1
+            self.server.most_active = max(self.server.most_active, self.server.active)
+        time.sleep(float(self.path.split("?")[0].strip("/")))
+        with self.server.lock:
+            self.server.active -= 1
+        body = f"<html><body><nav>Menu</nav><p>Page {self.path}</p></body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    server.block_on_close = False # Don't wait out pages the tests gave up on
+    server.handle_error = lambda request, client_address: None # Nor report their broken pipes
+    server.lock, server.active, server.most_active = threading.Lock(), 0, 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def client():
+    client = HttpClient(cache_dir=None, retries=0)
+    yield client
+    client.close()
+
+def test_pages_are_fetched_concurrently_and_yielded_as_they_arrive(server, client):
+    urls = [server.url + path for path in ("/0.6", "/0.1", "/0.3")]
+    start = time.perf_counter()
+    results = list(web_interaction.fetch_many(urls, client=client, max_per_host=3))
+    assert time.perf_counter() - start < 1.0 # Not the 1 s the pages take one after another
+    assert [url for url, _ in results] == [urls[1], urls[2], urls[0]]
+    assert results[0][1] == "Page /0.1"
+
+def test_requests_to_one_host_are_limited(server, client):
+    urls = [f"{server.url}/0.2?page={i}" for i in range(6)]
+    results = list(web_interaction.fetch_many(urls, client=client, max_per_host=2))
+    assert len(results) == 6 and server.most_active == 2
+
+def test_pages_missing_the_deadline_are_given_up(server, client):
+    urls = [server.url + "/0.1", server.url + "/3"]
+    start = time.perf_counter()
+    results = dict(web_interaction.fetch_many(urls, client=client, deadline=0.5))
+    assert time.perf_counter() - start < 1.0
+    assert results == {urls[0]: "Page /0.1", urls[1]: None}
+
+def test_failed_pages_are_reported_as_none(server, client):
+    results = dict(web_interaction.fetch_many(["http://127.0.0.1:9/", server.url + "/0"], client=client))
+    assert results == {"http://127.0.0.1:9/": None, server.url + "/0": "Page /0"}
+
+def test_pages_that_fail_to_extract_are_reported_as_none(server, client):
+    urls = [server.url + "/0", server.url + "/0.1"]
+    real_extract = web_interaction.extract_main_text
+    def extract(content, content_type):
+        if b"/0.1" in content:
+            raise UnicodeDecodeError("utf-8", content, 0, 1, "invalid start byte")
+        return real_extract(content, content_type)
+    with patch('src.web_interaction.extract_main_text', side_effect=extract):
+        results = dict(web_interaction.fetch_many(urls, client=client))
+    assert results == {urls[0]: "Page /0", urls[1]: None}
+
+def test_answers_are_cached(tmp_path):
+    cache = AnswerCache(str(tmp_path))
+    with patch('src.web_interaction.wikipedia.summary', return_value="A tower in Paris.") as summary:
+        assert web_interaction.get_instant_answer("Eiffel Tower", cache=cache) == "A tower in Paris."
+        assert web_interaction.get_instant_answer("the eiffel tower", cache=cache) == "A tower in Paris."
+    assert summary.call_count == 1
+
+def test_missing_pages_are_cached(tmp_path):
+    cache = AnswerCache(str(tmp_path))
+    with patch('src.web_interaction.wikipedia.summary', side_effect=wikipedia.exceptions.PageError("Nowhere")) as summary:
+        assert web_interaction.get_instant_answer("Nowhere", cache=cache) is None
+        assert web_interaction.get_instant_answer("Nowhere", cache=cache) is None
+    assert summary.call_count == 1
+
+def test_expired_answers_are_given_offline(tmp_path):
+    cache = AnswerCache(str(tmp_path), ttl=0)
+    with patch('src.web_interaction.wikipedia.summary', return_value="A tower in Paris."):
+        web_interaction.get_instant_answer("Eiffel Tower", cache=cache)
+    with patch('src.web_interaction.wikipedia.summary', side_effect=requests.ConnectionError("offline")) as summary:
+        assert web_interaction.get_instant_answer("Eiffel Tower", cache=cache) == "A tower in Paris."
+    assert summary.call_count == 1 # Expired, so Wikipedia was tried first
+
+def test_snapshot_answers_without_going_online(tmp_path):
+    snapshot = LeadSnapshot(str(tmp_path / "leads.db"))
+    snapshot.add("Eiffel Tower", "A tower in Paris.")
+    with patch('src.web_interaction.wikipedia.summary') as summary:
+        assert web_interaction.get_instant_answer("the Eiffel Tower", snapshot=snapshot) == "A tower in Paris."
+    summary.assert_not_called()